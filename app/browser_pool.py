@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional
+
+
+def _descendant_rss_mb() -> Optional[float]:
+    """Total resident memory of this process' descendants (the Playwright driver and
+    the browsers it spawned), read from /proc. Returns None where /proc is unavailable."""
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    rss_pages = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{entry}/statm") as f:
+                rss_pages[int(entry)] = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    total_pages = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        total_pages += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class _BrowserSlot:
+    """A long-lived browser and the number of pages it has rendered since launch."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.pages_served = 0
+
+
+class BrowserPool:
+    """
+    A fixed number of long-lived Playwright browsers shared by the scrapers.
+
+    Every job gets a fresh browser context (isolated cookies and storage) on one of
+    the pooled browsers. A browser is recycled after `max_pages` pages, or when the
+    browsers together use more than `max_memory_mb` per browser. The browsers live on
+    a dedicated event loop thread so the pool can be used from the scraper threads
+    as well as from asyncio code.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        max_memory_mb: Optional[int] = None,
+        headless: bool = True,
+        navigation_timeout: float = 30,
+    ):
+        self.size = size if size is not None else int(os.getenv("BROWSER_POOL_SIZE", 2))
+        self.max_pages = max_pages or int(os.getenv("BROWSER_POOL_MAX_PAGES", 50))
+        self.max_memory_mb = max_memory_mb or int(os.getenv("BROWSER_POOL_MAX_MEMORY_MB", 512))
+        self.headless = headless
+        self.navigation_timeout = navigation_timeout
+        self.stats = {"pages_rendered": 0, "browser_launches": 0, "browser_recycles": 0, "errors": 0}
+        self.logger = logging.getLogger(__name__)
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._slots = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+            self._thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+            except BaseException:
+                # e.g. Playwright missing: leave nothing behind, so the next render tries again
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop, self._thread, self._slots = None, None, None
+                raise
+
+    async def _start(self):
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._slots = asyncio.Queue()
+        for index in range(self.size):
+            self._slots.put_nowait(_BrowserSlot(index))
+        self.logger.info(f"Browser pool started with {self.size} browsers")
+
+    async def _launch(self, slot: _BrowserSlot):
+        slot.browser = await self._playwright.chromium.launch(headless=self.headless)
+        slot.pages_served = 0
+        self.stats["browser_launches"] += 1
+        self.logger.info(f"Launched pooled browser {slot.index}")
+
+    async def _recycle(self, slot: _BrowserSlot, reason: str):
+        self.logger.info(f"Recycling pooled browser {slot.index} after {slot.pages_served} pages ({reason})")
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            self.logger.warning(f"Error closing pooled browser {slot.index}: {e}")
+        slot.browser = None
+        self.stats["browser_recycles"] += 1
+
+    async def _render(self, url: str, timeout: float) -> str:
+        slot = await self._slots.get()
+        try:
+            # The wait for a free browser does not count against the render's timeout
+            return await asyncio.wait_for(self._render_on(slot, url), timeout)
+        except Exception:
+            self.stats["errors"] += 1
+            if slot.browser is not None and not slot.browser.is_connected():
+                slot.browser = None
+            raise
+        finally:
+            self._slots.put_nowait(slot)
+
+    async def _render_on(self, slot: _BrowserSlot, url: str) -> str:
+        if slot.browser is None or not slot.browser.is_connected():
+            await self._launch(slot)
+
+        context = await slot.browser.new_context()
+        try:
+            page = await context.new_page()
+            await page.goto(url, wait_until="domcontentloaded", timeout=self.navigation_timeout * 1000)
+            html = await page.content()
+        finally:
+            await context.close()
+
+        slot.pages_served += 1
+        self.stats["pages_rendered"] += 1
+
+        if slot.pages_served >= self.max_pages:
+            await self._recycle(slot, "page limit")
+        else:
+            memory_mb = _descendant_rss_mb()
+            if memory_mb is not None and memory_mb > self.max_memory_mb * self.size:
+                await self._recycle(slot, f"{memory_mb:.0f} MB in use")
+        return html
+
+    def render(self, url: str, timeout: Optional[float] = None) -> str:
+        """
+        Render `url` on a pooled browser and return the page HTML (blocking).
+
+        The `timeout` (default twice the navigation timeout) starts once a browser is free.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._render(url, timeout or self.navigation_timeout * 2), self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            # If the caller gives up first, stop the render so it hands its browser back
+            future.cancel()
+            raise
+
+    async def render_async(self, url: str, timeout: Optional[float] = None) -> str:
+        """Awaitable version of render() for use from another event loop."""
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._render(url, timeout or self.navigation_timeout * 2), self._loop)
+        # Cancelling the awaiting task cancels the render on the pool loop too
+        return await asyncio.wrap_future(future)
+
+    async def _close(self):
+        while self._slots is not None and not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot.browser is not None:
+                await slot.browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+
+    def close(self):
+        """Close all browsers and stop the pool thread."""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = None
+            self.logger.info("Browser pool closed")
+
+
+browser_pool = BrowserPool()
@@ -0,0 +1,104 @@
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+from .image_store import image_store, remove_image_files
+from .near_duplicates import near_duplicate_index
+from .search import search_index
+
+
+class BulkDeleter:
+    """
+    Deletes the rows of a table matching a condition in chunks, without loading them.
+
+    Each chunk is one transaction: a projection of the ids and image URLs of the
+    next BULK_DELETE_CHUNK_SIZE rows (default 1000) in index order, one
+    `DELETE ... WHERE id IN (...)` and the release of their image references in
+    the image store. Image files released by a chunk are unlinked by a background
+    pool of BULK_DELETE_FILE_WORKERS threads (default 4) once it is committed.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, file_workers: Optional[int] = None):
+        self.chunk_size = chunk_size or int(os.getenv("BULK_DELETE_CHUNK_SIZE", 1000))
+        self.file_workers = file_workers or int(os.getenv("BULK_DELETE_FILE_WORKERS", 4))
+        self._executor = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.file_workers, thread_name_prefix="bulk-delete")
+        return self._executor
+
+    def _remove_files(self, paths):
+        try:
+            remove_image_files(paths)
+        except Exception as e:
+            self.logger.error(f"Could not remove image files: {str(e)}")
+
+    def delete(self, db: Session, model, *criteria, order_by=None) -> dict:
+        """
+        Delete the rows of `model` matching `criteria` (all rows without any).
+
+        `order_by` lists the columns of the index that serves `criteria`, so each
+        chunk is read from it; it defaults to the primary key. Returns the counts
+        and the time taken.
+        """
+        start = time.perf_counter()
+        order_by = order_by or [model.id]
+        deleted = chunks = images_released = files_removed = 0
+
+        while True:
+            rows = (
+                db.query(model.id, model.image_url)
+                .filter(*criteria)
+                .order_by(*order_by)
+                .limit(self.chunk_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            ids = [id for id, _ in rows]
+            references = Counter(image_url for _, image_url in rows if image_url)
+            result = db.execute(
+                delete(model).where(model.id.in_(ids), *criteria).execution_options(synchronize_session=False)
+            )
+            paths = image_store.release_many(db, references)
+            near_duplicate_index.remove(db, model, ids)
+            db.commit()
+            search_index.remove(model, ids)
+
+            deleted += result.rowcount
+            chunks += 1
+            images_released += sum(references.values())
+            files_removed += len(paths)
+            if paths:
+                self._get_executor().submit(self._remove_files, paths)
+            if len(rows) < self.chunk_size:
+                break
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.logger.info(
+            f"Deleted {deleted} rows from {model.__tablename__} in {chunks} chunks ({elapsed_ms:.1f} ms), "
+            f"{files_removed} image files queued for removal"
+        )
+        return {
+            "deleted": deleted,
+            "chunks": chunks,
+            "images_released": images_released,
+            "image_files_removed": files_removed,
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+
+    def close(self):
+        """Wait for queued file removals to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+bulk_deleter = BulkDeleter()
@@ -0,0 +1,308 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class CacheBackend:
+    """
+    Key/value store behind the response cache, shared by all API workers.
+
+    Values are bytes. `ttl` is in seconds; None keeps the value until it is deleted
+    or evicted. Counters created with incr() are never evicted, since a counter
+    read back as missing would make old entries look current again.
+    Implementations must be safe to use from several threads.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        """Atomically add `amount` to an integer counter, creating it at `amount`."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Per-process LRU store. Only suitable when the API runs a single worker.
+
+    Counters are kept apart from the LRU entries and never evicted.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+                self._counters.pop(key, None)
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    File-backed store that every worker on the same host can open.
+
+    Expired rows are purged, and the oldest rows beyond `max_entries` evicted,
+    every `prune_interval` writes. Counters live in their own table, which is
+    never pruned.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, prune_interval: int = 500):
+        self.path = path
+        self.max_entries = max_entries
+        self.prune_interval = prune_interval
+        self._writes = 0
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_updated_at ON cache_entries (updated_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            counter = conn.execute("SELECT value FROM cache_counters WHERE key = ?", (key,)).fetchone()
+            return str(counter[0]).encode() if counter else None
+        if row[1] is not None and row[1] < time.time():
+            return None
+        return row[0].encode() if isinstance(row[0], str) else row[0]
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+            (key, value, now + ttl if ttl else None, now),
+        )
+        self._writes += 1
+        if self._writes % self.prune_interval == 0:
+            self.prune()
+
+    def delete(self, *keys):
+        if keys:
+            placeholders = ",".join("?" * len(keys))
+            conn = self._connection()
+            conn.execute(f"DELETE FROM cache_entries WHERE key IN ({placeholders})", keys)
+            conn.execute(f"DELETE FROM cache_counters WHERE key IN ({placeholders})", keys)
+
+    def incr(self, key, amount=1):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO cache_counters (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, amount),
+            )
+            value = conn.execute("SELECT value FROM cache_counters WHERE key = ?", (key,)).fetchone()[0]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return int(value)
+
+    def prune(self):
+        conn = self._connection()
+        conn.execute("DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            "SELECT key FROM cache_entries ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Minimal client for servers speaking the Redis protocol (RESP2).
+
+    Only the handful of commands used here are implemented, so no Redis client
+    library is needed. Each thread keeps its own connection. Counters are stored
+    without a TTL, so a server using a volatile-* maxmemory policy never evicts
+    them.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 5):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.password:
+            self._command("AUTH", self.password)
+        if self.db:
+            self._command("SELECT", str(self.db))
+
+    def _command(self, *args):
+        if getattr(self._local, "sock", None) is None:
+            self._connect()
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        try:
+            self._local.sock.sendall(b"".join(parts))
+            return self._read_reply()
+        except (OSError, ConnectionError):
+            self._drop_connection()
+            raise
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by the cache server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload
+        if prefix == b"-":
+            raise RedisError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._local.reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            return None if count == -1 else [self._read_reply() for _ in range(count)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+        self._local.sock = None
+
+    def get(self, key):
+        return self._command("GET", key)
+
+    def get_many(self, keys):
+        return self._command("MGET", *keys) if keys else []
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self._command("SET", key, value, "PX", int(ttl * 1000))
+        else:
+            self._command("SET", key, value)
+
+    def delete(self, *keys):
+        if keys:
+            self._command("DEL", *keys)
+
+    def incr(self, key, amount=1):
+        return self._command("INCRBY", key, amount)
+
+    def close(self):
+        self._drop_connection()
+
+
+def create_backend(url: Optional[str] = None, max_entries: int = 10000) -> CacheBackend:
+    """
+    Build a backend from a URL: memory://, sqlite:///path/to/cache.db or
+    redis://[:password@]host:port/db. Defaults to the CACHE_BACKEND_URL
+    environment variable, then memory://. `max_entries` bounds the memory and
+    SQLite backends; a Redis server applies its own eviction policy.
+    """
+    url = url or os.getenv("CACHE_BACKEND_URL", "memory://")
+    parsed = urlparse(url)
+    if parsed.scheme == "memory":
+        backend = MemoryBackend(max_entries=max_entries)
+    elif parsed.scheme == "sqlite":
+        path = parsed.path[1:] if parsed.path.startswith("//") else parsed.path.lstrip("/")
+        backend = SQLiteBackend(path or "cache.db", max_entries=max_entries)
+    elif parsed.scheme == "redis":
+        backend = RedisBackend(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=parsed.password,
+        )
+    else:
+        raise ValueError(f"Unsupported cache backend URL: {url}")
+    logging.getLogger(__name__).info(f"Using {type(backend).__name__} for shared cache state")
+    return backend
+
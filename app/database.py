@@ -1,6 +1,230 @@
-from sqlalchemy.orm import Session
-from .models import SessionLocal
 import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+from dotenv import load_dotenv
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+from .models import Base
+
+# Load environment variables
+load_dotenv()
+
+
+def default_url() -> str:
+    """DATABASE_URL if set (e.g. a SQLite URL for local benchmarks), else the MySQL database of the MYSQL_* variables."""
+    return os.getenv("DATABASE_URL") or (
+        f"mysql+pymysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}"
+        f"@{os.getenv('MYSQL_HOST', 'localhost')}:3306/{os.getenv('MYSQL_DB')}"
+    )
+
+
+class PoolStats:
+    """Checkouts, timeouts, invalidated connections and the wait for a connection of one pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidated = 0
+        self.waits = deque(maxlen=1000)
+        self._lock = threading.Lock()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.waits.append(seconds)
+
+    def record_invalidated(self, *args):
+        with self._lock:
+            self.invalidated += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self.waits)
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidated": self.invalidated,
+                "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 2) if waits else 0.0,
+                "wait_p95_ms": round(waits[int(len(waits) * 0.95)] * 1000, 2) if waits else 0.0,
+                "wait_max_ms": round(waits[-1] * 1000, 2) if waits else 0.0,
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """A QueuePool recording how long each checkout waited for a connection, opening it included."""
+
+    pool_stats: Optional[PoolStats] = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.pool_stats:
+                self.pool_stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.pool_stats:
+            self.pool_stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool; the new one keeps counting in the same stats
+        pool = super().recreate()
+        pool.pool_stats = self.pool_stats
+        return pool
+
+
+class RoutingSession(Session):
+    """
+    A session whose statements go to the engines of the Database in its `info`:
+    those of a read-only session to the replica, unless they write or are part
+    of a flush, everything else to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        database = self.info["database"]
+        if self.info.get("read_only") and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+            return database.replica_engine
+        return database.engine
+
+
+class Database:
+    """
+    The engines of the primary database and of an optional read replica.
+
+    Neither is created before a session first needs it, so importing the models
+    opens no connection. The primary gets a pool of DATABASE_POOL_SIZE
+    connections (default 10) plus DATABASE_MAX_OVERFLOW (default 20) opened on
+    demand; a checkout waits up to DATABASE_POOL_TIMEOUT seconds (default 30).
+    Connections are pinged before use (DATABASE_POOL_PRE_PING=0 turns it off) and
+    replaced after DATABASE_POOL_RECYCLE seconds (default 1800), below MySQL's
+    wait_timeout, so a connection dropped by the server or a proxy is not handed
+    out. The replica at DATABASE_REPLICA_URL gets a pool of the same size; without
+    one, read-only sessions use the primary. create_all() creates the missing
+    tables on the primary; the API calls it on start-up unless
+    DATABASE_CREATE_TABLES=0 (e.g. when the schema is only managed with alembic),
+    so no request pays for DDL.
+    """
+
+    def __init__(
+        self,
+        url: str = None,
+        replica_url: str = None,
+        pool_size: int = None,
+        max_overflow: int = None,
+        pool_recycle: int = None,
+        pool_timeout: float = None,
+        pre_ping: bool = None,
+        create_tables: bool = None,
+    ):
+        self.url = url or default_url()
+        self.replica_url = replica_url or os.getenv("DATABASE_REPLICA_URL") or None
+        self.pool_size = pool_size or int(os.getenv("DATABASE_POOL_SIZE", 10))
+        self.max_overflow = max_overflow if max_overflow is not None else int(os.getenv("DATABASE_MAX_OVERFLOW", 20))
+        self.pool_recycle = pool_recycle or int(os.getenv("DATABASE_POOL_RECYCLE", 1800))
+        self.pool_timeout = pool_timeout or float(os.getenv("DATABASE_POOL_TIMEOUT", 30))
+        self.pre_ping = pre_ping if pre_ping is not None else os.getenv("DATABASE_POOL_PRE_PING", "1") != "0"
+        self.create_tables = create_tables if create_tables is not None else os.getenv("DATABASE_CREATE_TABLES", "1") != "0"
+        self.session = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, info={"database": self})
+        self.read_session = sessionmaker(
+            class_=RoutingSession, autocommit=False, autoflush=False, info={"database": self, "read_only": True}
+        )
+        self._engines = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def _create_engine(self, role: str, url: str) -> Engine:
+        parsed = make_url(url)
+        if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+            # Every connection to an in-memory database would see an empty one; keep SQLAlchemy's single connection
+            return create_engine(url)
+        stats = self._stats.setdefault(role, PoolStats())
+        engine = create_engine(
+            url,
+            poolclass=TimedQueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.max_overflow,
+            pool_recycle=self.pool_recycle,
+            pool_timeout=self.pool_timeout,
+            pool_pre_ping=self.pre_ping,
+        )
+        engine.pool.pool_stats = stats
+        event.listen(engine, "invalidate", stats.record_invalidated)
+        event.listen(engine, "soft_invalidate", stats.record_invalidated)
+        self.logger.info(f"Created the {role} database engine ({parsed.get_backend_name()}, pool of {self.pool_size}+{self.max_overflow})")
+        return engine
+
+    def _get_engine(self, role: str, url: str) -> Engine:
+        engine = self._engines.get(role)
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get(role)
+                if engine is None:
+                    engine = self._create_engine(role, url)
+                    self._engines[role] = engine
+        return engine
+
+    @property
+    def engine(self) -> Engine:
+        """The engine of the primary database, built on first use."""
+        return self._get_engine("primary", self.url)
+
+    @property
+    def replica_engine(self) -> Engine:
+        """The engine of the read replica, or the primary's when there is no replica."""
+        if not self.replica_url:
+            return self.engine
+        return self._get_engine("replica", self.replica_url)
+
+    def create_all(self):
+        """Create the tables missing on the primary."""
+        Base.metadata.create_all(bind=self.engine)
+
+    def dispose(self):
+        """Close the pooled connections; the engines are built again on next use."""
+        with self._lock:
+            engines, self._engines = self._engines, {}
+        for engine in engines.values():
+            engine.dispose()
+
+    def stats(self) -> dict:
+        """Size and use of the pool of each engine built so far."""
+        result = {}
+        for role, engine in list(self._engines.items()):
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                result[role] = {"pool": type(pool).__name__}
+                continue
+            result[role] = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": self.max_overflow,
+                **self._stats[role].snapshot(),
+            }
+        return result
+
+
+database = Database()
+SessionLocal = database.session
+# Sessions of the read endpoints, sent to the read replica when there is one
+ReadSessionLocal = database.read_session
+
+
+def use_primary(db: Session):
+    """Send the statements a read-only session runs from now on to the primary, e.g. just after a write."""
+    db.info["read_only"] = False
 
 
 # Dependency to get DB session
@@ -11,3 +235,12 @@ def get_db():
         logging.info("Database connection successful")
     finally:
         db.close()
+
+
+# Dependency to get a DB session for endpoints that only read
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
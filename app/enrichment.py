@@ -0,0 +1,344 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import httpx
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import Scholarship
+from .html_reducer import estimate_tokens, reduce_html
+from .page_fetcher import fetch_page
+from .queue_manager import queue_manager
+from .response_cache import response_cache
+from .search import search_index
+
+DEGREE_LEVELS = ("bachelor", "master", "doctorate")
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+
+INSTRUCTIONS = (
+    "You fill in missing details of scholarships from the text of their web pages. "
+    "Each item below has an id, the fields to extract and the page text. "
+    "Respond strictly with a JSON object of the form "
+    "{\"items\": [{\"id\": 1, \"description\": \"string\", \"requirements\": [\"string\"], \"degree_level\": \"string\"}]}, "
+    "with one entry per item and only the fields asked for that item. "
+    "'degree_level' must be 'bachelor', 'master' or 'doctorate'; if the degree level is not explicitly mentioned, "
+    "infer it from the text, and default to 'bachelor' if that is not possible. "
+    "Use null for a field the text does not give. Do not add any extra text, explanations, or comments."
+)
+
+
+@dataclass
+class EnrichmentItem:
+    scholarship_id: int
+    url: str
+    null_fields: List[str]
+    text: str = ""
+    tokens: int = 0
+
+
+@dataclass
+class EnrichmentReport:
+    items: int = 0
+    fetched: int = 0
+    batches: int = 0
+    enriched: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        tokens = self.prompt_tokens + self.completion_tokens
+        return {
+            **vars(self),
+            "tokens_per_enriched_row": round(tokens / self.enriched, 1) if self.enriched else None,
+            "rows_per_minute": round(self.enriched / self.seconds * 60, 1) if self.seconds else None,
+        }
+
+
+class EnrichmentLLM:
+    """Chat model answering one packed extraction request. Returns (text, prompt tokens, completion tokens)."""
+
+    name = "base"
+    upstream: Optional[str] = None
+
+    def complete(self, instructions: str, content: str) -> Tuple[str, int, int]:
+        raise NotImplementedError
+
+
+class OpenAIChatLLM(EnrichmentLLM):
+    """OpenAI chat completions in JSON mode, rate limited by RATE_LIMIT_OPENAI."""
+
+    name = "openai"
+    upstream = "openai"
+
+    def __init__(self, model: Optional[str] = None, timeout: float = 120):
+        self.model = model or os.getenv("ENRICH_MODEL", "gpt-3.5-turbo")
+        self.client = httpx.Client(timeout=httpx.Timeout(timeout, connect=10))
+
+    def complete(self, instructions: str, content: str) -> Tuple[str, int, int]:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise Exception("OPENAI_API_KEY environment variable is not set")
+        response = self.client.post(
+            OPENAI_CHAT_URL,
+            headers={"Authorization": f"Bearer {api_key}"},
+            json={
+                "model": self.model,
+                "temperature": 0,
+                "response_format": {"type": "json_object"},
+                "messages": [
+                    {"role": "system", "content": instructions},
+                    {"role": "user", "content": content},
+                ],
+            },
+        )
+        if response.status_code != 200:
+            raise Exception(f"LLM request failed ({response.status_code}): {response.text}")
+        body = response.json()
+        usage = body.get("usage", {})
+        return (
+            body["choices"][0]["message"]["content"],
+            usage.get("prompt_tokens", estimate_tokens(instructions + content)),
+            usage.get("completion_tokens", 0),
+        )
+
+
+class StubLLM(EnrichmentLLM):
+    """
+    Local stand-in for the chat model: waits `latency` seconds per call plus
+    `per_token_ms` per prompt token and answers every item with placeholder values.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency: float = 1.0, per_token_ms: float = 0.0):
+        self.latency = latency
+        self.per_token_ms = per_token_ms
+
+    def complete(self, instructions: str, content: str) -> Tuple[str, int, int]:
+        prompt_tokens = estimate_tokens(instructions + content)
+        time.sleep(self.latency + prompt_tokens * self.per_token_ms / 1000)
+        items = []
+        for match in re.finditer(r"^### Item (\d+)\nFields: (.*)$", content, re.MULTILINE):
+            item = {"id": int(match.group(1))}
+            for name in match.group(2).split(", "):
+                item[name] = {"description": "Stub description.", "requirements": ["Stub requirement"],
+                              "degree_level": "bachelor"}[name]
+            items.append(item)
+        answer = json.dumps({"items": items})
+        return answer, prompt_tokens, estimate_tokens(answer)
+
+
+def create_llm(name: Optional[str] = None) -> EnrichmentLLM:
+    """Build the model named by `name`, or by ENRICH_LLM (default openai)."""
+    name = name or os.getenv("ENRICH_LLM", "openai")
+    if name == "openai":
+        return OpenAIChatLLM()
+    if name == "stub":
+        return StubLLM(latency=float(os.getenv("ENRICH_STUB_LATENCY", 1)))
+    raise ValueError(f"Unknown enrichment LLM '{name}', expected openai or stub")
+
+
+class BatchEnricher:
+    """
+    Fills in missing scholarship fields with few LLM calls.
+
+    Detail pages are fetched concurrently (ENRICH_FETCH_CONCURRENCY, default 8)
+    with a plain GET and reduced to their text, each cut to ENRICH_MAX_ITEM_TOKENS
+    (default 1500). The texts are packed into as few extraction requests as fit
+    ENRICH_TOKEN_BUDGET tokens (default 8000, prompt and expected answer together),
+    at most ENRICH_MAX_BATCH_ITEMS items each (default 20), and all the answers
+    are written back in a single transaction. Items whose page cannot be fetched
+    or that the model gives nothing for count an update all the same, so the
+    endpoint stops picking them after three tries instead of retrying them on
+    every run; items of a request that failed as a whole are not counted.
+    """
+
+    # Tokens reserved in the budget for each item's part of the answer
+    ANSWER_TOKENS_PER_ITEM = 200
+
+    def __init__(
+        self,
+        llm: Optional[EnrichmentLLM] = None,
+        token_budget: Optional[int] = None,
+        max_item_tokens: Optional[int] = None,
+        max_batch_items: Optional[int] = None,
+        fetch_concurrency: Optional[int] = None,
+        fetch: Callable[[str], dict] = fetch_page,
+        session_factory=SessionLocal,
+    ):
+        self._llm = llm
+        self.token_budget = token_budget or int(os.getenv("ENRICH_TOKEN_BUDGET", 8000))
+        self.max_item_tokens = max_item_tokens or int(os.getenv("ENRICH_MAX_ITEM_TOKENS", 1500))
+        self.max_batch_items = max_batch_items or int(os.getenv("ENRICH_MAX_BATCH_ITEMS", 20))
+        self.fetch_concurrency = fetch_concurrency or int(os.getenv("ENRICH_FETCH_CONCURRENCY", 8))
+        self.fetch = fetch
+        self.session_factory = session_factory
+        self.last_report: Optional[Dict] = None
+        self._lock = threading.Lock()
+        self.totals = {"runs": 0, "batches": 0, "enriched": 0, "prompt_tokens": 0, "completion_tokens": 0}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def llm(self) -> EnrichmentLLM:
+        # Built on first use, so importing the module needs no API key
+        if self._llm is None:
+            self._llm = create_llm()
+        return self._llm
+
+    def _load_text(self, item: EnrichmentItem) -> EnrichmentItem:
+        text = reduce_html(self.fetch(item.url)["html"], base_url=item.url).text
+        # Keep the start of long pages: the details usually come first
+        item.text = text[: self.max_item_tokens * 4]
+        item.tokens = estimate_tokens(item.text)
+        return item
+
+    def fetch_texts(self, items: List[EnrichmentItem], report: EnrichmentReport) -> List[EnrichmentItem]:
+        """Fetch the detail pages concurrently; items whose page cannot be fetched are left out."""
+        loaded = []
+        with ThreadPoolExecutor(max_workers=self.fetch_concurrency) as executor:
+            futures = [(item, executor.submit(self._load_text, item)) for item in items]
+            for item, future in futures:
+                try:
+                    loaded.append(future.result())
+                except Exception as e:
+                    report.errors.append(f"{item.url}: {e}")
+                    self.logger.warning(f"Could not fetch {item.url} for enrichment: {e}")
+        report.fetched = len(loaded)
+        return loaded
+
+    @staticmethod
+    def format_item(item: EnrichmentItem) -> str:
+        return f"### Item {item.scholarship_id}\nFields: {', '.join(item.null_fields)}\nText:\n{item.text}\n"
+
+    def pack(self, items: List[EnrichmentItem]) -> List[List[EnrichmentItem]]:
+        """Split items into batches whose prompt and answer fit the token budget."""
+        overhead = estimate_tokens(INSTRUCTIONS)
+        batches, batch, used = [], [], overhead
+        for item in items:
+            cost = estimate_tokens(self.format_item(item)) + self.ANSWER_TOKENS_PER_ITEM
+            if batch and (used + cost > self.token_budget or len(batch) >= self.max_batch_items):
+                batches.append(batch)
+                batch, used = [], overhead
+            batch.append(item)
+            used += cost
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def extract(self, batch: List[EnrichmentItem], report: EnrichmentReport) -> Dict[int, dict]:
+        """Send one packed request and return the answers by scholarship id."""
+        if self.llm.upstream and queue_manager.is_limited(self.llm.upstream):
+            queue_manager.acquire_blocking(self.llm.upstream)
+        content = "\n".join(self.format_item(item) for item in batch)
+        answer, prompt_tokens, completion_tokens = self.llm.complete(INSTRUCTIONS, content)
+        report.batches += 1
+        report.prompt_tokens += prompt_tokens
+        report.completion_tokens += completion_tokens
+
+        results = {}
+        for entry in json.loads(answer).get("items", []):
+            if isinstance(entry, dict) and isinstance(entry.get("id"), int):
+                results[entry["id"]] = entry
+        return results
+
+    @staticmethod
+    def updates_for(item: EnrichmentItem, answer: dict) -> dict:
+        """Column values to write for one item, keeping the rules of fetch_null_fields."""
+        values = {}
+        if "description" in item.null_fields and isinstance(answer.get("description"), str) and answer["description"].strip():
+            values[Scholarship.description] = answer["description"].strip()
+        if "requirements" in item.null_fields and isinstance(answer.get("requirements"), list):
+            values[Scholarship.requirements] = answer["requirements"]
+        if "degree_level" in item.null_fields:
+            degree_level = answer.get("degree_level") or "bachelor"
+            if degree_level in DEGREE_LEVELS:
+                values[Scholarship.degree_level] = degree_level
+        return values
+
+    def run(self, items: List[EnrichmentItem]) -> Dict:
+        """Enrich the items and return the run report."""
+        report = EnrichmentReport(items=len(items))
+        started = time.perf_counter()
+
+        answers = {}
+        attempted = {item.scholarship_id for item in items}
+        loaded = self.fetch_texts(items, report)
+        for batch in self.pack(loaded):
+            try:
+                results = self.extract(batch, report)
+            except Exception as e:
+                report.errors.append(str(e))
+                self.logger.error(f"Enrichment request for {len(batch)} scholarships failed: {e}")
+                # The model never saw these items; an outage must not use up their tries
+                attempted.difference_update(item.scholarship_id for item in batch)
+                continue
+            for item in batch:
+                if item.scholarship_id in results:
+                    answers[item.scholarship_id] = (item, results[item.scholarship_id])
+
+        db = self.session_factory()
+        try:
+            enriched = self.write(db, answers.values(), attempted)
+            if enriched:
+                search_index.refresh(db, Scholarship, enriched)
+        finally:
+            db.close()
+        report.enriched = len(enriched)
+        report.seconds = time.perf_counter() - started
+        if enriched:
+            response_cache.invalidate("scholarships", enriched)
+
+        result = report.to_dict()
+        self.last_report = result
+        with self._lock:
+            self.totals["runs"] += 1
+            for name in ("batches", "enriched", "prompt_tokens", "completion_tokens"):
+                self.totals[name] += result[name]
+        self.logger.info(
+            f"Enriched {report.enriched}/{report.items} scholarships with {report.batches} LLM calls, "
+            f"{result['tokens_per_enriched_row']} tokens per row"
+        )
+        return result
+
+    def write(self, db: Session, answers, attempted: Iterable[int] = ()) -> List[int]:
+        """
+        Write every answer back in one transaction; returns the ids of the updated scholarships.
+
+        The `attempted` ids left without an answer to write only get their times_updated counted.
+        """
+        enriched = []
+        for item, answer in answers:
+            values = self.updates_for(item, answer)
+            if not values:
+                continue
+            values[Scholarship.times_updated] = func.coalesce(Scholarship.times_updated, 0) + 1
+            db.query(Scholarship).filter(Scholarship.id == item.scholarship_id).update(
+                values, synchronize_session=False
+            )
+            enriched.append(item.scholarship_id)
+        missed = set(attempted).difference(enriched)
+        if missed:
+            db.query(Scholarship).filter(Scholarship.id.in_(missed)).update(
+                {Scholarship.times_updated: func.coalesce(Scholarship.times_updated, 0) + 1}, synchronize_session=False
+            )
+            self.logger.info(f"Nothing to write for {len(missed)} scholarships, counted as tried")
+        db.commit()
+        return enriched
+
+    def stats(self) -> dict:
+        with self._lock:
+            totals = dict(self.totals)
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        totals["tokens_per_enriched_row"] = round(tokens / totals["enriched"], 1) if totals["enriched"] else None
+        return {**totals, "last_run": self.last_report}
+
+
+batch_enricher = BatchEnricher()
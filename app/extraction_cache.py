@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import ExtractionCacheEntry
+
+
+class ExtractionCache:
+    """
+    Persistent cache of LLM extraction results.
+
+    Entries are keyed by (URL, normalized page content hash, prompt hash, model), so a
+    hit means the exact same prompt already ran against the exact same page content.
+    Entries expire after `ttl_seconds` and the least recently used ones are evicted
+    once the table holds more than `max_entries` rows.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl = timedelta(seconds=ttl_seconds or int(os.getenv("EXTRACTION_CACHE_TTL", 7 * 24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", 5000))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def make_key(url: str, page_hash: str, prompt: str, model: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = "\n".join([url, page_hash, prompt_hash, model])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, attribute: str, amount: int = 1):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + amount)
+
+    def get(self, db: Session, key: str):
+        """Return the cached result for `key`, or None on a miss or an expired entry."""
+        entry = db.query(ExtractionCacheEntry).filter(ExtractionCacheEntry.cache_key == key).first()
+        now = datetime.now()
+        if entry and entry.created_at + self.ttl < now:
+            db.delete(entry)
+            db.commit()
+            entry = None
+
+        if not entry:
+            self._count("misses")
+            return None
+
+        entry.last_used_at = now
+        entry.hits += 1
+        db.commit()
+        self._count("hits")
+        self.logger.info(f"Extraction cache hit for {entry.url}")
+        return entry.result
+
+    def put(self, db: Session, key: str, url: str, result):
+        """Store an extraction result and evict expired and overflowing entries."""
+        now = datetime.now()
+        entry = db.query(ExtractionCacheEntry).filter(ExtractionCacheEntry.cache_key == key).first()
+        if entry:
+            entry.result = result
+            entry.created_at = now
+            entry.last_used_at = now
+        else:
+            db.add(ExtractionCacheEntry(
+                cache_key=key, url=url, result=result, created_at=now, last_used_at=now, hits=0
+            ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent scrape of the same page stored the key first; overwrite its result instead
+            db.rollback()
+            db.query(ExtractionCacheEntry).filter(ExtractionCacheEntry.cache_key == key).update(
+                {"result": result, "created_at": now, "last_used_at": now}, synchronize_session=False
+            )
+            db.commit()
+        self.evict(db)
+
+    def evict(self, db: Session) -> int:
+        """Delete expired entries, then the least recently used ones above max_entries."""
+        evicted = db.query(ExtractionCacheEntry).filter(
+            ExtractionCacheEntry.created_at < datetime.now() - self.ttl
+        ).delete(synchronize_session=False)
+
+        overflow = db.query(ExtractionCacheEntry).count() - self.max_entries
+        if overflow > 0:
+            stale_ids = [
+                entry_id for (entry_id,) in db.query(ExtractionCacheEntry.id)
+                .order_by(ExtractionCacheEntry.last_used_at)
+                .limit(overflow)
+            ]
+            evicted += db.query(ExtractionCacheEntry).filter(
+                ExtractionCacheEntry.id.in_(stale_ids)
+            ).delete(synchronize_session=False)
+
+        db.commit()
+        if evicted:
+            self._count("evictions", evicted)
+            self.logger.info(f"Evicted {evicted} extraction cache entries")
+        return evicted
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+extraction_cache = ExtractionCache()
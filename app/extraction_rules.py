@@ -0,0 +1,236 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from .ingestion import VALID_DEGREE_LEVELS
+from .models import ScrapeSource
+
+# Fields a rule can fill, per source kind, as returned by the LLM extraction
+FIELDS = {
+    "scholarships": ("program_title", "funded_by", "degree_level", "url", "deadline", "requirements"),
+    "news": ("title", "description", "published_at", "source", "url", "category"),
+}
+REQUIRED_FIELDS = {
+    "scholarships": ("program_title", "url"),
+    "news": ("title", "url"),
+}
+DATE_FIELDS = ("deadline", "published_at")
+# Fields holding a list, the only ones a `many` spec can fill
+LIST_FIELDS = ("requirements",)
+
+
+class RuleError(ValueError):
+    """The rules of a source did not produce valid items; the LLM extraction takes over."""
+
+
+def _field_spec(spec) -> dict:
+    return {"selector": spec} if isinstance(spec, str) else spec
+
+
+def validate_rules(rules: dict, kind: str) -> dict:
+    """
+    Check a rule set for a source of `kind`, raising ValueError if it cannot be used.
+
+    A rule set has an `item` selector matching each scholarship or article, a
+    `fields` mapping from field name to a selector relative to the item (or a
+    spec with `selector`, `attr`, `pattern`, `many`, `date_format` or a constant
+    `value`) and an optional `min_items` (default 1). Only list fields take `many`
+    and only date fields take a `date_format`.
+    """
+    if not rules.get("item"):
+        raise ValueError("rules need an 'item' selector")
+    fields = rules.get("fields") or {}
+    unknown = set(fields) - set(FIELDS[kind])
+    if unknown:
+        raise ValueError(f"unknown fields for {kind}: {', '.join(sorted(unknown))}")
+    missing = [name for name in REQUIRED_FIELDS[kind] if name not in fields]
+    if missing:
+        raise ValueError(f"rules for {kind} must extract {', '.join(missing)}")
+
+    selectors = [rules["item"]]
+    for name, spec in fields.items():
+        spec = _field_spec(spec)
+        if spec.get("value") is None and not spec.get("selector"):
+            raise ValueError(f"field '{name}' needs a selector or a value")
+        if spec.get("value") is not None and not isinstance(spec["value"], str):
+            raise ValueError(f"the value of field '{name}' must be a string")
+        if spec.get("many") and name not in LIST_FIELDS:
+            raise ValueError(f"field '{name}' holds a single value and cannot use 'many'")
+        if spec.get("date_format") and name not in DATE_FIELDS:
+            raise ValueError(f"field '{name}' is not a date and cannot use 'date_format'")
+        if spec.get("selector"):
+            selectors.append(spec["selector"])
+        if spec.get("pattern"):
+            try:
+                re.compile(spec["pattern"])
+            except re.error as e:
+                raise ValueError(f"invalid pattern for '{name}': {e}")
+    for selector in selectors:
+        try:
+            soupsieve.compile(selector)
+        except soupsieve.SelectorSyntaxError as e:
+            raise ValueError(f"invalid selector '{selector}': {e}")
+    return rules
+
+
+def _value(element: Tag, spec: dict, base_url: str) -> Optional[str]:
+    value = element.get(spec["attr"]) if spec.get("attr") else element.get_text(" ")
+    if value is None:
+        return None
+    value = " ".join(str(value).split())
+    if spec.get("pattern"):
+        match = re.search(spec["pattern"], value)
+        if not match:
+            return None
+        value = match.group(1) if match.groups() else match.group(0)
+        if value is None:
+            # An optional group that matched nothing
+            return None
+    if spec.get("date_format"):
+        try:
+            value = datetime.strptime(value, spec["date_format"]).strftime("%Y-%m-%d")
+        except ValueError:
+            return None
+    if spec.get("attr") in ("href", "src"):
+        value = urljoin(base_url, value)
+    return value or None
+
+
+def _check(item: dict, kind: str, number: int):
+    for name in REQUIRED_FIELDS[kind]:
+        if not item.get(name):
+            raise RuleError(f"item {number} has no {name}")
+    if not isinstance(item["url"], str) or not item["url"].startswith(("http://", "https://")):
+        raise RuleError(f"item {number} has an invalid url: {item['url']}")
+    for name in DATE_FIELDS:
+        if item.get(name):
+            try:
+                datetime.strptime(item[name], "%Y-%m-%d")
+            except (TypeError, ValueError):
+                raise RuleError(f"item {number} has an invalid {name}: {item[name]}")
+    if item.get("degree_level"):
+        if isinstance(item["degree_level"], str):
+            item["degree_level"] = item["degree_level"].lower()
+        if item["degree_level"] not in VALID_DEGREE_LEVELS:
+            raise RuleError(f"item {number} has an invalid degree_level: {item['degree_level']}")
+
+
+def apply_rules(rules: dict, page_html: str, base_url: str, kind: str) -> List[dict]:
+    """
+    Extract the items of a page with the rules of its source.
+
+    Raises RuleError when fewer than `min_items` items are found or when any item
+    fails validation (a required field missing, a malformed URL, date or degree
+    level), which usually means the page layout changed.
+    """
+    soup = BeautifulSoup(page_html, "html.parser")
+    elements = soup.select(rules["item"])
+    if len(elements) < rules.get("min_items", 1):
+        raise RuleError(f"{len(elements)} items matched '{rules['item']}'")
+
+    items = []
+    for number, element in enumerate(elements, start=1):
+        item = {}
+        for name, spec in rules["fields"].items():
+            spec = _field_spec(spec)
+            if spec.get("value") is not None:
+                item[name] = spec["value"]
+            elif spec.get("many"):
+                values = [_value(match, spec, base_url) for match in element.select(spec["selector"])]
+                item[name] = [value for value in values if value]
+            else:
+                match = element.select_one(spec["selector"])
+                item[name] = _value(match, spec, base_url) if match is not None else None
+        _check(item, kind, number)
+        items.append(item)
+    return items
+
+
+class RuleEngine:
+    """
+    Extracts items with the CSS selector rules of a registered source, without a browser or an LLM.
+
+    The rules are stored on the source in `scrape_sources.extraction_rules`. Each
+    use counts as a hit or, when the rules fail validation or find no items, as a
+    fallback to the LLM extraction, per source.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = 0.0
+        self.extractions = 0
+        self.logger = logging.getLogger(__name__)
+
+    def rules_for(self, db: Session, url: str, kind: str) -> Optional[ScrapeSource]:
+        """
+        The source registered for `url` as a listing of `kind` ('scholarships' or
+        'news'), if it has extraction rules. The rules extract that listing only, so
+        they are looked up for the listing prompt of the kind and no other.
+        """
+        return (
+            db.query(ScrapeSource)
+            .filter(ScrapeSource.url == url, ScrapeSource.kind == kind, ScrapeSource.extraction_rules != None)
+            .first()
+        )
+
+    def set_rules(self, db: Session, source: ScrapeSource, rules: Optional[dict]) -> ScrapeSource:
+        """Replace the rules of a source (None removes them) and restart its hit and fallback counts."""
+        source.extraction_rules = validate_rules(rules, source.kind) if rules is not None else None
+        source.rule_hits = 0
+        source.rule_fallbacks = 0
+        source.last_fallback_reason = None
+        db.commit()
+        return source
+
+    def extract(self, db: Session, source: ScrapeSource, page_html: str) -> Optional[List[dict]]:
+        """Items of the page extracted by the source's rules, or None to fall back to the LLM."""
+        started = time.perf_counter()
+        try:
+            items = apply_rules(source.extraction_rules, page_html, source.url, source.kind)
+            error = None
+        except RuleError as e:
+            items, error = None, str(e)
+        except Exception as e:
+            # Rules stored before a check was added can still fail on a page; the LLM takes over all the same
+            items, error = None, f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.extractions += 1
+            self.seconds += elapsed
+
+        if error is None:
+            values = {ScrapeSource.rule_hits: ScrapeSource.rule_hits + 1}
+            self.logger.info(f"Extracted {len(items)} items from {source.url} with rules in {elapsed * 1000:.1f} ms")
+        else:
+            values = {ScrapeSource.rule_fallbacks: ScrapeSource.rule_fallbacks + 1, ScrapeSource.last_fallback_reason: error}
+            self.logger.warning(f"Extraction rules for {source.url} failed, falling back to the LLM: {error}")
+        db.query(ScrapeSource).filter(ScrapeSource.id == source.id).update(values, synchronize_session=False)
+        db.commit()
+        return items
+
+    def stats(self, db: Session) -> Dict:
+        sources, hits, fallbacks = db.query(
+            func.count(ScrapeSource.id),
+            func.coalesce(func.sum(ScrapeSource.rule_hits), 0),
+            func.coalesce(func.sum(ScrapeSource.rule_fallbacks), 0),
+        ).filter(ScrapeSource.extraction_rules != None).one()
+        hits, fallbacks = int(hits), int(fallbacks)
+        with self._lock:
+            ms = self.seconds * 1000 / self.extractions if self.extractions else 0.0
+        return {
+            "sources_with_rules": sources,
+            "hits": hits,
+            "fallbacks": fallbacks,
+            "hit_rate": round(hits / (hits + fallbacks), 3) if hits + fallbacks else 0.0,
+            "ms_per_page": round(ms, 2),
+        }
+
+
+rule_engine = RuleEngine()
@@ -0,0 +1,240 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import List, Optional
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Comment, Tag
+
+# Elements that never carry content worth extracting
+DROPPED_TAGS = [
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas",
+    "button", "input", "select", "textarea", "link", "meta", "nav", "aside",
+]
+# Kept for their content without the element: ASP.NET WebForms and many CMS pages wrap the whole body in a form
+UNWRAPPED_TAGS = ["form"]
+# Page chrome, dropped unless it sits inside the main content (an article header holds its title)
+CHROME_TAGS = ["header", "footer"]
+BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search"}
+_BOILERPLATE_NAME = re.compile(
+    r"(^|[-_])(nav|navbar|menu|footer|sidebar|cookies?|consent|share|social|newsletter|subscribe|"
+    r"breadcrumbs?|banner|related|advert|ads|promo|popup|modal|pagination)([-_]|$)",
+    re.IGNORECASE,
+)
+BLOCK_TAGS = [
+    "address", "article", "blockquote", "dd", "div", "dl", "dt", "figcaption", "figure",
+    "h1", "h2", "h3", "h4", "h5", "h6", "li", "main", "ol", "p", "pre", "section",
+    "table", "tr", "ul", "time", "header", "footer", "br",
+]
+# Fewest repeated siblings that make a listing
+MIN_CARDS = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text for budgeting (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class ReducedPage:
+    """Compact text of a page: the page-level text and one chunk per listing card."""
+    title: str
+    text: str
+    chunks: List[str] = field(default_factory=list)
+    cards: int = 0
+    duplicates_removed: int = 0
+    original_tokens: int = 0
+    tokens: int = 0
+
+    @property
+    def reduction(self) -> float:
+        """Share of the original tokens removed, between 0 and 1."""
+        if not self.original_tokens:
+            return 0.0
+        return max(0.0, 1 - self.tokens / self.original_tokens)
+
+
+def _is_boilerplate(element: Tag) -> bool:
+    if element.get("role") in BOILERPLATE_ROLES or element.get("aria-hidden") == "true":
+        return True
+    names = list(element.get("class") or [])
+    if element.get("id"):
+        names.append(element["id"])
+    return any(_BOILERPLATE_NAME.search(name) for name in names)
+
+
+def _strip(soup: BeautifulSoup):
+    for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
+        comment.extract()
+    for element in soup.find_all(DROPPED_TAGS):
+        element.decompose()
+    for element in soup.find_all(UNWRAPPED_TAGS):
+        element.unwrap()
+    for element in soup.find_all(CHROME_TAGS):
+        if not element.decomposed and not element.find_parent(["article", "main"]):
+            element.decompose()
+    # Collected first: decomposing while iterating would skip siblings
+    for element in [element for element in soup.find_all(True) if _is_boilerplate(element)]:
+        if not element.decomposed:
+            element.decompose()
+
+
+def _content_root(soup: BeautifulSoup) -> Tag:
+    main = soup.find("main") or soup.find(attrs={"role": "main"})
+    if main is not None:
+        return main
+    articles = soup.find_all("article")
+    if len(articles) == 1:
+        return articles[0]
+    return soup.body or soup
+
+
+def _signature(element: Tag):
+    return element.name, tuple(sorted(element.get("class") or []))
+
+
+def find_cards(root: Tag) -> List[Tag]:
+    """
+    The repeated siblings that make up a listing (cards, rows, articles), if any.
+
+    Siblings sharing a tag and class list are grouped, leaf elements such as the
+    items of a plain list are ignored, and the group with the most text wins.
+    """
+    best, best_length = [], 0
+    for parent in [root, *root.find_all(True)]:
+        groups = defaultdict(list)
+        for child in parent.find_all(True, recursive=False):
+            if child.find(True) is not None:
+                groups[_signature(child)].append(child)
+        for members in groups.values():
+            if len(members) < MIN_CARDS:
+                continue
+            length = sum(len(member.get_text()) for member in members)
+            if length > best_length:
+                best, best_length = members, length
+    return best
+
+
+def _annotate_links(root: Tag, base_url: Optional[str]):
+    """Keep link targets next to their text, since URLs are extracted too."""
+    for link in root.find_all("a", href=True):
+        href = link["href"].strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:", "tel:")):
+            continue
+        link.append(f" <{urljoin(base_url, href) if base_url else href}>")
+
+
+def _lines(element: Tag) -> List[str]:
+    for block in element.find_all(BLOCK_TAGS):
+        if block.name == "li":
+            block.insert(0, "- ")
+        block.insert_before("\n")
+        block.insert_after("\n")
+    text = element.get_text()
+    return [line for line in (" ".join(raw.split()) for raw in text.splitlines()) if line]
+
+
+def _dedupe(lines: List[str], seen: set) -> List[str]:
+    kept = []
+    for line in lines:
+        if line not in seen:
+            seen.add(line)
+            kept.append(line)
+    return kept
+
+
+def reduce_html(page_html: str, base_url: Optional[str] = None) -> ReducedPage:
+    """
+    Reduce a page to the compact text an LLM needs to extract from it.
+
+    Scripts, styles, navigation, headers, footers, sidebars and elements named as
+    boilerplate (cookie banners, share bars, newsletters, related links...) are
+    dropped. Links keep their absolute target. A listing is split into one chunk
+    per card, after the text of the page around it; repeated cards and lines
+    repeated outside the cards are kept once.
+    """
+    soup = BeautifulSoup(page_html, "html.parser")
+    title = " ".join(soup.title.get_text().split()) if soup.title else ""
+    _strip(soup)
+    root = _content_root(soup)
+    _annotate_links(root, base_url)
+
+    cards = find_cards(root)
+    chunks, digests, duplicates = [], set(), 0
+    for card in cards:
+        chunk = "\n".join(_lines(card.extract()))
+        digest = hashlib.sha1(chunk.encode("utf-8")).digest()
+        if not chunk or digest in digests:
+            duplicates += 1
+            continue
+        digests.add(digest)
+        chunks.append(chunk)
+
+    seen = {title}
+    page_lines = _lines(root)
+    text_lines = _dedupe(page_lines, seen)
+    duplicates += len(page_lines) - len(text_lines)
+
+    parts = [f"Page: {title}"] if title else []
+    if text_lines:
+        parts.append("\n".join(text_lines))
+    parts.extend(f"[{number}]\n{chunk}" for number, chunk in enumerate(chunks, start=1))
+    text = "\n\n".join(parts)
+    return ReducedPage(
+        title=title,
+        text=text,
+        chunks=chunks,
+        cards=len(cards),
+        duplicates_removed=duplicates,
+        original_tokens=estimate_tokens(page_html),
+        tokens=estimate_tokens(text),
+    )
+
+
+class ReducerStats:
+    """Thread-safe totals of the pages reduced before extraction."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pages = 0
+        self.original_tokens = 0
+        self.tokens = 0
+        self.seconds = 0.0
+
+    def record(self, page: ReducedPage, seconds: float):
+        with self._lock:
+            self.pages += 1
+            self.original_tokens += page.original_tokens
+            self.tokens += page.tokens
+            self.seconds += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": reducer_enabled(),
+                "pages": self.pages,
+                "original_tokens": self.original_tokens,
+                "tokens": self.tokens,
+                "reduction": round(1 - self.tokens / self.original_tokens, 3) if self.original_tokens else 0.0,
+                "ms_per_page": round(self.seconds * 1000 / self.pages, 2) if self.pages else 0.0,
+            }
+
+
+reducer_stats = ReducerStats()
+
+
+def reducer_enabled() -> bool:
+    return os.getenv("HTML_REDUCER_ENABLED", "1") == "1"
+
+
+def reduce_for_extraction(page_html: str, base_url: Optional[str] = None) -> str:
+    """The text to hand to the LLM for a page: reduced unless HTML_REDUCER_ENABLED=0."""
+    if not reducer_enabled():
+        return page_html
+    started = time.perf_counter()
+    page = reduce_html(page_html, base_url)
+    reducer_stats.record(page, time.perf_counter() - started)
+    return page.text
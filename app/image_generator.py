@@ -1,51 +1,50 @@
-import requests
+import asyncio
+import hashlib
 import os
-import time
+import uuid
 from PIL import Image
 import io
-import logging
+from .image_providers import ImageProvider, create_provider
 
-def generate_image(prompt: str, scholarship_id: int) -> str:
-    """Generate image and return the URL path"""
+image_provider = create_provider()
+
+IMAGES_DIR = "static/images"
+
+
+async def generate_image(prompt: str, name: str, provider: ImageProvider = None) -> str:
+    """
+    Generate image, save it as <name>-<content hash>.png and return the URL path.
+
+    The content hash makes the URL immutable: a regenerated image gets a new URL
+    instead of replacing the file behind the old one.
+    """
     # Create images directory if it doesn't exist
-    images_dir = "static/images"
-    os.makedirs(images_dir, exist_ok=True)
-    
-    # Define the image path and URL
-    filename = f"scholarship_{scholarship_id}.png"
+    os.makedirs(IMAGES_DIR, exist_ok=True)
+
+    content = await (provider or image_provider).render(prompt)
+    # Decoding and encoding the image is CPU work, keep it off the event loop
+    filename = await asyncio.to_thread(_save_image, content, IMAGES_DIR, name)
+    return f"/static/images/{filename}"
+
+
+def content_filename(name: str, png: bytes) -> str:
+    """<first 16 characters of name>-<first 16 hex digits of the content's sha256>.png"""
+    return f"{name[:16]}-{hashlib.sha256(png).hexdigest()[:16]}.png"
+
+
+def _save_image(content: bytes, images_dir: str, name: str) -> str:
+    """
+    Re-encode the image as PNG under its content-hashed name and return the file name.
+    It is written to a temporary file first, so a cancelled job never leaves half an image.
+    """
+    buffer = io.BytesIO()
+    Image.open(io.BytesIO(content)).save(buffer, format="PNG")
+    png = buffer.getvalue()
+
+    filename = content_filename(name, png)
     output_path = os.path.join(images_dir, filename)
-    url_path = f"/static/images/{filename}"
-    
-    api_token = os.getenv("HF_API_TOKEN")
-    if not api_token:
-        raise Exception("HF_API_TOKEN environment variable is not set")
-    
-    API_URL = "https://api-inference.huggingface.co/models/CompVis/stable-diffusion-v1-4"
-    headers = {
-        "Authorization": f"Bearer {api_token}",
-        "Content-Type": "application/json"
-    }
-    
-    try:
-        response = requests.post(
-            API_URL,
-            headers=headers,
-            json={"inputs": prompt},
-            timeout=30
-        )
-        
-        logging.info(f"API Response Status: {response.status_code}")
-        
-        if response.status_code == 200:
-            image = Image.open(io.BytesIO(response.content))
-            image.save(output_path)
-            return url_path
-        elif response.status_code == 429:
-            raise Exception("Max requests total reached")
-        else:
-            logging.error(f"API Error Response: {response.text}")
-            raise Exception(f"Error generating image: {response.text}")
-            
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Request failed: {str(e)}")
-        raise Exception(f"Request failed: {str(e)}") 
\ No newline at end of file
+    tmp_path = f"{output_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(png)
+    os.replace(tmp_path, output_path)
+    return filename
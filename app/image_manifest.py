@@ -0,0 +1,116 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Optional
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import Scholarship, News
+
+MANIFEST_PATH = "static/manifest.json"
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(content)
+    os.replace(tmp_path, path)
+
+
+def build_manifest(db: Session) -> dict:
+    """Current image and thumbnail URL of every scholarship and news article that has an image."""
+    manifest = {}
+    for name, model in (("scholarships", Scholarship), ("news", News)):
+        rows = (
+            db.query(model.id, model.image_url, model.image_variants)
+            .filter(model.image_url != None)
+            .order_by(model.id)
+            .all()
+        )
+        manifest[name] = {
+            str(id): {
+                "image_url": image_url,
+                "thumbnail_url": variants["thumbnail"]["url"] if variants else None,
+            }
+            for id, image_url, variants in rows
+        }
+    return manifest
+
+
+class ImageManifest:
+    """
+    Keeps static/manifest.json, mapping entities to their current image URLs, in
+    step with the database, next to a gzipped copy for clients accepting gzip.
+
+    Image URLs are immutable, so clients and CDNs cache the images themselves for
+    good and only revalidate this one file. Changes mark the manifest dirty; it is
+    rewritten at most every IMAGE_MANIFEST_INTERVAL seconds (default 5), and only
+    when its content changed.
+    """
+
+    def __init__(self, path: str = MANIFEST_PATH, session_factory=SessionLocal, interval: Optional[float] = None):
+        self.path = path
+        self.session_factory = session_factory
+        self.interval = interval if interval is not None else float(os.getenv("IMAGE_MANIFEST_INTERVAL", 5))
+        self.digest = None
+        self._dirty = True
+        self._task = None
+        self.logger = logging.getLogger(__name__)
+
+    def mark_dirty(self):
+        """Rewrite the manifest on the next round, e.g. after images were generated or deleted."""
+        self._dirty = True
+
+    def write(self) -> bool:
+        """Rebuild the manifest from the database; returns whether the file changed."""
+        db = self.session_factory()
+        try:
+            manifest = build_manifest(db)
+        finally:
+            db.close()
+
+        content = json.dumps(manifest, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == self.digest and os.path.exists(self.path):
+            return False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # The gzipped copy first, so it is never older than the file it stands for
+        _write_atomic(f"{self.path}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+        _write_atomic(self.path, content)
+        self.digest = digest
+        self.logger.info(f"Wrote image manifest {self.path} ({len(content)} bytes)")
+        return True
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        # Catch up with changes made since the last round
+        await self._flush()
+
+    async def _flush(self):
+        if not self._dirty:
+            return
+        self._dirty = False
+        try:
+            await asyncio.to_thread(self.write)
+        except Exception as e:
+            self._dirty = True
+            self.logger.error(f"Could not write image manifest: {str(e)}")
+
+    async def _loop(self):
+        while True:
+            await self._flush()
+            await asyncio.sleep(self.interval)
+
+
+image_manifest = ImageManifest()
@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from typing import Optional
+import httpx
+from PIL import Image, ImageDraw
+
+HF_API_URL = "https://api-inference.huggingface.co/models/CompVis/stable-diffusion-v1-4"
+
+
+def _png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ImageProvider:
+    """
+    Backend that turns a prompt into image bytes.
+
+    `upstream` names the rate limit (see QueueManager) that applies to the provider,
+    or None when it has none.
+    """
+
+    name = "base"
+    upstream: Optional[str] = None
+
+    async def render(self, prompt: str) -> bytes:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class HuggingFaceProvider(ImageProvider):
+    """
+    Hugging Face inference API.
+
+    One pooled HTTP/2 connection pool with keep-alive is shared by all image jobs
+    of the event loop, so requests never block the loop and do not pay for a new
+    TLS handshake each time. Cancelling the calling task aborts the request.
+    """
+
+    name = "huggingface"
+    upstream = "huggingface"
+
+    def __init__(self, api_url: str = None, timeout: float = None, max_connections: int = None):
+        self.api_url = api_url or os.getenv("HF_API_URL", HF_API_URL)
+        self.timeout = httpx.Timeout(timeout or float(os.getenv("IMAGE_API_TIMEOUT", 60)), connect=10)
+        max_connections = max_connections or int(os.getenv("IMAGE_API_MAX_CONNECTIONS", 10))
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        self._client = None
+        self._loop = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # An AsyncClient is bound to the event loop it was first used on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(http2=True, timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._client
+
+    async def render(self, prompt: str) -> bytes:
+        api_token = os.getenv("HF_API_TOKEN")
+        if not api_token:
+            raise Exception("HF_API_TOKEN environment variable is not set")
+
+        headers = {
+            "Authorization": f"Bearer {api_token}",
+            "Content-Type": "application/json"
+        }
+
+        try:
+            response = await self._get_client().post(self.api_url, headers=headers, json={"inputs": prompt})
+        except httpx.HTTPError as e:
+            self.logger.error(f"Request failed: {str(e)}")
+            raise Exception(f"Request failed: {str(e)}")
+
+        self.logger.info(f"API Response Status: {response.status_code} ({response.http_version})")
+
+        if response.status_code == 200:
+            return response.content
+        elif response.status_code == 429:
+            raise Exception("Max requests total reached")
+        else:
+            self.logger.error(f"API Error Response: {response.text}")
+            raise Exception(f"Error generating image: {response.text}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class StubProvider(ImageProvider):
+    """
+    Local stand-in for a remote model: waits `latency` seconds, then returns a small
+    solid image. Rate limited like a real upstream (RATE_LIMIT_STUB), for load tests.
+    """
+
+    name = "stub"
+    upstream = "stub"
+
+    def __init__(self, latency: float = None, size: int = 64):
+        self.latency = latency if latency is not None else float(os.getenv("IMAGE_STUB_LATENCY", 1))
+        self.image = _png(Image.new("RGB", (size, size), (40, 90, 160)))
+
+    async def render(self, prompt: str) -> bytes:
+        await asyncio.sleep(self.latency)
+        return self.image
+
+
+class PlaceholderProvider(ImageProvider):
+    """
+    Renders a deterministic placeholder locally: a two-colour gradient derived from
+    the prompt, so the same title always gets the same image. No upstream, no limit.
+    """
+
+    name = "placeholder"
+
+    def __init__(self, width: int = 512, height: int = 512):
+        self.width = width
+        self.height = height
+
+    def _draw(self, prompt: str) -> bytes:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        start, end = digest[:3], digest[3:6]
+        image = Image.new("RGB", (self.width, self.height))
+        draw = ImageDraw.Draw(image)
+        for y in range(self.height):
+            t = y / max(self.height - 1, 1)
+            color = tuple(int(a + (b - a) * t) for a, b in zip(start, end))
+            draw.line([(0, y), (self.width, y)], fill=color)
+        return _png(image)
+
+    async def render(self, prompt: str) -> bytes:
+        return await asyncio.to_thread(self._draw, prompt)
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (HuggingFaceProvider, StubProvider, PlaceholderProvider)
+}
+
+
+def create_provider(name: Optional[str] = None) -> ImageProvider:
+    """Build the provider named by `name`, or by IMAGE_PROVIDER (default huggingface)."""
+    name = name or os.getenv("IMAGE_PROVIDER", "huggingface")
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown image provider '{name}', expected one of {', '.join(PROVIDERS)}")
+    return PROVIDERS[name]()
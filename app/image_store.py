@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .models import StoredImage
+from .image_variants import variant_encoder
+
+# Years and academic-year ranges: "2025", "2025-2026", "2025/26"
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}(?:\s*[-/–]\s*(?:(?:19|20)?\d{2}))?\b")
+_NON_WORD_RE = re.compile(r"[^\w]+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Reduce a prompt to the words that matter for the picture: case-folded, without
+    years or academic-year ranges, punctuation collapsed to single spaces. "Global
+    Leaders Scholarship 2025" and "Global Leaders Scholarship 2026/27" become equal.
+    """
+    text = _YEAR_RE.sub(" ", prompt.casefold())
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+def image_file_path(image_url: str) -> str:
+    """Map an image URL like /static/images/x.png to its path on disk."""
+    return image_url.lstrip("/")
+
+
+class ImageStore:
+    """
+    Content-addressed store of generated images, keyed by the hash of the normalized
+    prompt and the provider.
+
+    Rows whose prompts normalize to the same text share one image file instead of
+    each spending a rate-limited generation. Every row using the image holds a
+    reference; the file is only deleted when the last reference is released.
+    `reuses` counts the generations each stored image saved.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def make_key(prompt: str, provider: str) -> str:
+        raw = "\n".join([provider, normalize_prompt(prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, attribute: str):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def reuse(self, db: Session, key: str) -> Optional[Tuple[str, Optional[dict]]]:
+        """
+        Take a reference on the stored image for `key` and return its URL and
+        variants, or None when there is none (or its file has gone missing).
+        """
+        entry = db.query(StoredImage).filter(StoredImage.prompt_key == key).first()
+        if entry and not os.path.exists(image_file_path(entry.image_url)):
+            self.logger.warning(f"Stored image {entry.image_url} is missing, it will be generated again")
+            db.delete(entry)
+            db.commit()
+            entry = None
+
+        if not entry:
+            self._count("misses")
+            return None
+
+        db.query(StoredImage).filter(StoredImage.id == entry.id).update(
+            {
+                StoredImage.ref_count: StoredImage.ref_count + 1,
+                StoredImage.reuses: StoredImage.reuses + 1,
+                StoredImage.last_used_at: datetime.now(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        self._count("hits")
+        self.logger.info(f"Reusing stored image {entry.image_url}")
+        return entry.image_url, entry.variants
+
+    def add(
+        self, db: Session, key: str, prompt: str, provider: str, image_url: str, variants: Optional[dict] = None
+    ) -> Tuple[str, Optional[dict]]:
+        """
+        Record a newly generated image with one reference and return its URL and
+        variants. If another worker stored the same key first, take a reference on
+        that one instead.
+        """
+        now = datetime.now()
+        db.add(StoredImage(
+            prompt_key=key,
+            normalized_prompt=normalize_prompt(prompt),
+            provider=provider,
+            image_url=image_url,
+            variants=variants,
+            ref_count=1,
+            reuses=0,
+            created_at=now,
+            last_used_at=now,
+        ))
+        try:
+            db.commit()
+            return image_url, variants
+        except IntegrityError:
+            db.rollback()
+            return self.reuse(db, key) or (image_url, variants)
+
+    def release(self, db: Session, image_url: Optional[str]) -> Optional[str]:
+        """
+        Drop one reference to `image_url`. Returns the file path to delete once no
+        reference is left, or right away for images not managed by the store. The
+        caller commits and deletes the file after the commit.
+        """
+        if not image_url:
+            return None
+        paths = self.release_many(db, {image_url: 1})
+        return paths[0] if paths else None
+
+    def release_many(self, db: Session, references: Dict[str, int]) -> List[str]:
+        """
+        Drop `count` references for each `image_url: count` of `references`, with one
+        query to load the stored images. Returns the file paths to delete, like
+        release(); the caller commits and deletes the files after the commit.
+        """
+        references = {url: count for url, count in references.items() if url and count}
+        if not references:
+            return []
+        # Refresh the rows: earlier releases in the same transaction updated them in SQL
+        entries = {
+            entry.image_url: entry
+            for entry in db.query(StoredImage)
+            .filter(StoredImage.image_url.in_(list(references)))
+            .populate_existing()
+            .all()
+        }
+
+        paths = []
+        for image_url, count in references.items():
+            entry = entries.get(image_url)
+            if entry is None:
+                paths.append(image_file_path(image_url))
+            elif entry.ref_count > count:
+                db.query(StoredImage).filter(StoredImage.id == entry.id).update(
+                    {StoredImage.ref_count: StoredImage.ref_count - count}, synchronize_session=False
+                )
+            else:
+                db.delete(entry)
+                paths.append(image_file_path(image_url))
+        return paths
+
+    def stats(self, db: Session) -> dict:
+        """Generations saved by the images still stored, and this process' hit/miss counters."""
+        images, references, reuses = db.query(
+            func.count(StoredImage.id),
+            func.coalesce(func.sum(StoredImage.ref_count), 0),
+            func.coalesce(func.sum(StoredImage.reuses), 0),
+        ).one()
+        with self._lock:
+            return {
+                "images": images,
+                "references": int(references),
+                "generations_saved": int(reuses),
+                "reuses_since_start": self.hits,
+                "misses_since_start": self.misses,
+            }
+
+
+def remove_image_files(paths):
+    """
+    Delete image files released by ImageStore.release along with their WebP/AVIF
+    variants, ignoring ones already gone.
+    """
+    for path in paths:
+        if not path:
+            continue
+        for file_path in [path, *variant_encoder.variant_paths(path)]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+
+image_store = ImageStore()
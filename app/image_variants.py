@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Sequence
+from PIL import Image, ImageOps, features
+
+VARIANT_WIDTHS = (320, 640, 1024)
+THUMBNAIL_SIZE = 160
+QUALITY = {"webp": 80, "avif": 60}
+
+
+def variant_formats() -> tuple:
+    """WebP always; AVIF as well when IMAGE_AVIF=1 and Pillow was built with it."""
+    if os.getenv("IMAGE_AVIF", "0") == "1" and features.check("avif"):
+        return ("webp", "avif")
+    return ("webp",)
+
+
+def _save(image: Image.Image, path: str, format: str):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    image.save(tmp_path, format=format.upper(), quality=QUALITY[format])
+    os.replace(tmp_path, path)
+
+
+def encode_variants(
+    source_path: str,
+    widths: Sequence[int] = VARIANT_WIDTHS,
+    thumbnail_size: int = THUMBNAIL_SIZE,
+    formats: Sequence[str] = ("webp",),
+) -> dict:
+    """
+    Write the variants of the image at `source_path` next to it and describe them.
+
+    For "static/images/<name>.png" that is <name>.<format> at full size,
+    <name>-<width>.<format> for each width smaller than the image and a square
+    <name>-thumb.<format>, in every format. The description lists the paths of the
+    first format. Runs in the encoder processes, so it only touches files.
+    """
+    stem = os.path.splitext(source_path)[0]
+    with Image.open(source_path) as image:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    def write(variant: Image.Image, suffix: str) -> dict:
+        for format in formats:
+            _save(variant, f"{stem}{suffix}.{format}", format)
+        return {"width": variant.width, "height": variant.height, "path": f"{stem}{suffix}.{formats[0]}"}
+
+    sizes = []
+    for width in sorted(w for w in set(widths) if w < image.width):
+        height = max(1, round(image.height * width / image.width))
+        sizes.append(write(image.resize((width, height), Image.LANCZOS), f"-{width}"))
+    sizes.append(write(image, ""))
+
+    thumbnail = ImageOps.fit(image, (thumbnail_size, thumbnail_size), Image.LANCZOS)
+    return {"thumbnail": write(thumbnail, "-thumb"), "sizes": sizes, "formats": list(formats)}
+
+
+def variant_paths(image_path: str, widths: Sequence[int] = VARIANT_WIDTHS) -> list:
+    """Paths of the variant files encode_variants may have written for `image_path`."""
+    stem = os.path.splitext(image_path)[0]
+    suffixes = ["", "-thumb", *(f"-{width}" for width in widths)]
+    return [f"{stem}{suffix}.{format}" for suffix in suffixes for format in QUALITY]
+
+
+class VariantEncoder:
+    """
+    Encodes the WebP/AVIF variants of generated images in a pool of processes, so
+    resizing and compressing never competes with the event loop for the GIL.
+
+    IMAGE_ENCODE_WORKERS sets the pool size (default: one per CPU). The pool is
+    started on first use.
+    """
+
+    def __init__(self, workers: Optional[int] = None, widths: Optional[Sequence[int]] = None):
+        self.workers = workers or int(os.getenv("IMAGE_ENCODE_WORKERS", os.cpu_count() or 1))
+        widths = widths or os.getenv("IMAGE_VARIANT_WIDTHS")
+        if isinstance(widths, str):
+            widths = [int(width) for width in widths.split(",") if width.strip()]
+        self.widths = tuple(widths or VARIANT_WIDTHS)
+        self.thumbnail_size = int(os.getenv("IMAGE_THUMBNAIL_SIZE", THUMBNAIL_SIZE))
+        self.formats = variant_formats()
+        self._executor = None
+        self.logger = logging.getLogger(__name__)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Fresh interpreters rather than forks of a process running threads and a loop
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def encode(self, image_url: str) -> Optional[dict]:
+        """
+        Encode the variants of a stored image and return them with URLs, or None if
+        encoding failed: the original image stays usable without them.
+        """
+        # Absolute, since the encoder processes need not share this process's working directory
+        root = os.getcwd()
+        source_path = os.path.join(root, image_url.lstrip("/"))
+        loop = asyncio.get_running_loop()
+        try:
+            variants = await loop.run_in_executor(
+                self._get_executor(), encode_variants, source_path, self.widths, self.thumbnail_size, self.formats
+            )
+        except BrokenProcessPool:
+            self.logger.error(f"Encoder pool broke while encoding {image_url}, restarting it")
+            self._executor = None
+            return None
+        except Exception as e:
+            self.logger.error(f"Could not encode variants of {image_url}: {str(e)}")
+            return None
+
+        for variant in [variants["thumbnail"], *variants["sizes"]]:
+            variant["url"] = "/" + os.path.relpath(variant.pop("path"), root).replace(os.sep, "/")
+        return variants
+
+    def variant_paths(self, image_path: str) -> list:
+        return variant_paths(image_path, sorted(set(self.widths) | set(VARIANT_WIDTHS)))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+variant_encoder = VariantEncoder()
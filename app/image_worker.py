@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import Scholarship, News
+from .job_queue import JobQueue, JobWorker, ClaimedJob, job_queue
+from .image_generator import generate_image, image_provider
+from .image_providers import ImageProvider
+from .image_store import image_store, image_file_path, remove_image_files
+from .image_variants import variant_encoder
+from .image_manifest import image_manifest
+from .queue_manager import queue_manager
+from .response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+# Generations in progress in this process, by image store key
+_in_flight = {}
+
+
+def build_prompt(type: str, entity) -> str:
+    if type == "scholarship":
+        return (
+            f"An image representing the title \"{entity.program_title}\". "
+            "Images should not contain any text or logos. If the image or title is not relevant, "
+            "you can just generate a random college student or group of students."
+        )
+    return (
+        f"An image representing the title \"{entity.title}\". "
+        "Images should not contain any text or logos. If the image or title is not relevant, "
+        "you can just generate a random news image."
+    )
+
+
+def _in_session(session_factory, work, *args):
+    """Run `work(db, *args)` in a short session of its own, from a worker thread."""
+    db = session_factory()
+    try:
+        return work(db, *args)
+    finally:
+        db.close()
+
+
+def _load_entity(db: Session, type: str, id: int) -> tuple:
+    """The model, image prompt and current image URL of the entity a job is for."""
+    if type == "scholarship":
+        model = Scholarship
+    elif type == "news":
+        model = News
+    else:
+        raise Exception(f"Invalid type '{type}'")
+    entity = db.query(model).filter(model.id == id).first()
+    if not entity:
+        raise Exception(f"{'Scholarship' if type == 'scholarship' else 'News article'} {id} not found")
+    return model, build_prompt(type, entity), entity.image_url
+
+
+def _save_image(db: Session, model, id: int, image_url: str, variants, previous_url: Optional[str]) -> tuple:
+    """
+    Point the entity at its new image. Returns whether the entity still exists and
+    the path of a released image file to delete.
+    """
+    updated = db.query(model).filter(model.id == id).update(
+        {model.image_url: image_url, model.image_variants: variants}, synchronize_session=False
+    )
+    if not updated:
+        # Deleted while its image was generated: drop the reference taken for it
+        released = image_store.release(db, image_url)
+    else:
+        released = image_store.release(db, previous_url) if previous_url and previous_url != image_url else None
+    db.commit()
+    return bool(updated), released
+
+
+async def process_image_generation(job_id: str, type: str, id: int, session_factory, provider: ImageProvider) -> str:
+    """
+    Process image generation for scholarships or news articles.
+
+    The database is only used in short sessions run in worker threads, so no
+    pooled connection is held, nor the event loop blocked, while the image is
+    generated. Returns the URL of the generated image; raises if the job failed.
+    """
+    logger.info(f"Starting image generation process for job {job_id} ({type.capitalize()} {id})")
+
+    try:
+        model, prompt, previous_url = await asyncio.to_thread(_in_session, session_factory, _load_entity, type, id)
+
+        key = image_store.make_key(prompt, provider.name)
+        stored = await asyncio.to_thread(_in_session, session_factory, image_store.reuse, key)
+        if stored is None:
+            stored = await generate_once(key, prompt, session_factory, provider)
+        image_url, variants = stored
+
+        # Update entity with the generated image URL and its variants
+        saved, released = await asyncio.to_thread(
+            _in_session, session_factory, _save_image, model, id, image_url, variants, previous_url
+        )
+        remove_image_files([released])
+        if not saved:
+            logger.warning(f"{type.capitalize()} {id} was deleted while job {job_id} generated its image")
+            return image_url
+        response_cache.invalidate("scholarships" if type == "scholarship" else "news", [id])
+        image_manifest.mark_dirty()
+        logger.info(f"Successfully generated image for {type} {id}")
+        return image_url
+
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {str(e)}")
+        raise
+
+
+async def generate_once(key: str, prompt: str, session_factory, provider: ImageProvider) -> tuple:
+    """
+    Generate the image for `key` and its variants, and store it with one reference.
+    Returns its URL and variants. Jobs of this process asking for the same key
+    meanwhile wait for that generation and reuse it.
+    """
+    while key in _in_flight:
+        await asyncio.shield(_in_flight[key])
+        stored = await asyncio.to_thread(_in_session, session_factory, image_store.reuse, key)
+        if stored is not None:
+            return stored
+
+    done = asyncio.get_running_loop().create_future()
+    _in_flight[key] = done
+    try:
+        # Wait for a request slot on the provider's API
+        if provider.upstream:
+            await queue_manager.acquire(provider.upstream)
+        logger.info(f"Generating image {key} with {provider.name}")
+        image_url = await generate_image(prompt, key, provider)
+        variants = await variant_encoder.encode(image_url)
+        stored = await asyncio.to_thread(
+            _in_session, session_factory, image_store.add, key, prompt, provider.name, image_url, variants
+        )
+        if stored[0] != image_url:
+            # Another process stored this key first; ours is not referenced by anything
+            remove_image_files([image_file_path(image_url)])
+        return stored
+    finally:
+        del _in_flight[key]
+        done.set_result(None)
+
+
+class ImageWorker:
+    """
+    Image generation subsystem: drains image jobs from the job queue in batches and
+    renders them on an ImageProvider, each job opening short DB sessions of its own.
+
+    Parallelism is IMAGE_WORKER_CONCURRENCY, capped at the number of requests the
+    provider's rate limit lets through per period: more jobs in flight would only
+    hold leases while waiting for the limiter.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        provider: Optional[ImageProvider] = None,
+        session_factory=SessionLocal,
+        concurrency: Optional[int] = None,
+    ):
+        self.provider = provider or image_provider
+        self.session_factory = session_factory
+        concurrency = concurrency or int(os.getenv("IMAGE_WORKER_CONCURRENCY", 4))
+        if self.provider.upstream:
+            limiter = queue_manager.limiter(self.provider.upstream)
+            concurrency = max(1, min(concurrency, limiter.limit + limiter.burst - 1))
+        self.worker = JobWorker(queue, self.run_job, concurrency=concurrency)
+
+    async def run_job(self, job: ClaimedJob) -> str:
+        return await process_image_generation(job.id, job.entity_type, job.entity_id, self.session_factory, self.provider)
+
+    def start(self):
+        self.worker.start()
+
+    def notify(self):
+        self.worker.notify()
+
+    async def stop(self):
+        await self.worker.stop()
+        await self.provider.close()
+        await asyncio.to_thread(variant_encoder.close)
+
+    def stats(self) -> dict:
+        return {"provider": self.provider.name, **self.worker.stats()}
+
+
+image_worker = ImageWorker(job_queue)
@@ -0,0 +1,176 @@
+import logging
+from datetime import datetime
+from typing import List
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from .models import Scholarship, News
+from .near_duplicates import near_duplicate_index
+
+# Number of rows sent per IN (...) lookup and per multi-row INSERT
+DEFAULT_BATCH_SIZE = 500
+
+VALID_DEGREE_LEVELS = ['bachelor', 'master', 'doctorate']
+
+
+def parse_date(date_str):
+    """Parse a 'YYYY-MM-DD' string into a date, returning None if it is missing or invalid."""
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError) as e:
+        logging.error(f"Date parsing error: {e}")
+        return None
+
+
+def normalize_title(title) -> str:
+    """Collapse whitespace so that titles differing only in spacing are treated as equal."""
+    if not isinstance(title, str):
+        return ""
+    return " ".join(title.split())
+
+
+def _title_key(title) -> str:
+    # lower() rather than casefold(), to match the LOWER() of the lookup of stored titles
+    return normalize_title(title).lower()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing_title_keys(db: Session, column, keys, batch_size) -> set:
+    """
+    Fetch the title keys already stored, using one IN (...) query per batch.
+
+    Stored titles have their whitespace collapsed (on insert, and by a migration
+    for older rows), so comparing them lowercased matches on the same key as the
+    in-batch deduplication.
+    """
+    existing = set()
+    for chunk in _chunks(keys, batch_size):
+        for (title,) in db.query(column).filter(func.lower(column).in_(chunk)):
+            existing.add(_title_key(title))
+    return existing
+
+
+def _dedupe(items, title_field, site):
+    """Drop malformed items and in-batch duplicates, keeping the first occurrence."""
+    unique = {}
+    for item in items:
+        if not isinstance(item, dict):
+            logging.error(f"Invalid item format from {site}: {item}")
+            continue
+        key = _title_key(item.get(title_field))
+        if not key:
+            logging.warning(f"Skipping item without {title_field} from {site}: {item}")
+            continue
+        if key in unique:
+            logging.info(f"Duplicate in batch: {item.get(title_field)} from {site}")
+            continue
+        unique[key] = item
+    return unique
+
+
+def _bulk_insert(db: Session, model, title_column, rows, batch_size) -> List[int]:
+    """
+    Insert the rows and add them to the near-duplicate index; returns the ids of the
+    inserted rows, so concurrent scrapes committing in any order each index their own.
+    """
+    ids = []
+    if not rows:
+        return ids
+    if db.get_bind().dialect.insert_executemany_returning:
+        for chunk in _chunks(rows, batch_size):
+            ids.extend(db.scalars(insert(model).returning(model.id), chunk))
+    else:
+        # No RETURNING (MySQL): read the rows back by title. Ids are allocated at insert
+        # time, so only those above the highest one seen before the insert can be ours
+        last_id = db.query(func.max(model.id)).scalar() or 0
+        for chunk in _chunks(rows, batch_size):
+            db.execute(insert(model), chunk)
+        titles = [row[title_column.key] for row in rows]
+        for chunk in _chunks(titles, batch_size):
+            ids.extend(id for (id,) in db.query(model.id).filter(model.id > last_id, title_column.in_(chunk)))
+    for chunk in _chunks(ids, batch_size):
+        near_duplicate_index.index(db, model, model.id.in_(chunk))
+    return ids
+
+
+def bulk_insert_scholarships(db: Session, items, site, batch_size=DEFAULT_BATCH_SIZE) -> List[int]:
+    """
+    Insert the scraped scholarships that are not stored yet.
+
+    The batch is deduplicated in memory, existing titles (whatever their case or
+    spacing) are fetched with batched IN (...) queries, near duplicates of stored rows (another title or URL for the
+    same scholarship) are dropped and the new rows are written with multi-row INSERTs.
+    Returns the ids of the inserted rows; the caller is responsible for committing.
+    """
+    unique = _dedupe(items, 'program_title', site)
+    if not unique:
+        return []
+
+    existing = _existing_title_keys(db, Scholarship.program_title, sorted(unique), batch_size)
+
+    rows = []
+    for key, scholarship in unique.items():
+        if key in existing:
+            logging.info(f"Scholarship already exists: {scholarship.get('program_title')} from {site}")
+            continue
+        if not scholarship.get('url'):
+            logging.warning(f"Skipping scholarship without url: {scholarship.get('program_title')} from {site}")
+            continue
+
+        degree_level = scholarship.get('degree_level') or None
+        if degree_level not in VALID_DEGREE_LEVELS + [None]:
+            logging.warning(f"Invalid degree_level value '{degree_level}' for scholarship {scholarship.get('program_title')}")
+            degree_level = None
+
+        rows.append({
+            "program_title": normalize_title(scholarship.get('program_title')),
+            "funded_by": scholarship.get('funded_by'),
+            "degree_level": degree_level,
+            "url": scholarship.get('url'),
+            "deadline": parse_date(scholarship.get('deadline')),
+            "requirements": scholarship.get('requirements'),
+            "times_updated": 0,
+        })
+
+    rows = near_duplicate_index.filter_new(db, Scholarship, rows, site)
+    ids = _bulk_insert(db, Scholarship, Scholarship.program_title, rows, batch_size)
+    logging.info(f"Added {len(ids)} scholarships from {site} ({len(unique) - len(ids)} skipped)")
+    return ids
+
+
+def bulk_insert_news(db: Session, items, site, batch_size=DEFAULT_BATCH_SIZE) -> List[int]:
+    """
+    Insert the scraped news articles that are not stored yet.
+
+    Same strategy as bulk_insert_scholarships, deduplicating on the article title.
+    """
+    unique = _dedupe(items, 'title', site)
+    if not unique:
+        return []
+
+    existing = _existing_title_keys(db, News.title, sorted(unique), batch_size)
+
+    rows = []
+    for key, article in unique.items():
+        if key in existing:
+            logging.info(f"News already exists: {article.get('title')} from {site}")
+            continue
+        rows.append({
+            "title": normalize_title(article.get('title')),
+            "description": article.get('description'),
+            "published_at": parse_date(article.get('published_at')),
+            "source": article.get('source'),
+            "url": article.get('url'),
+            "category": article.get('category'),
+            "times_updated": 0,
+        })
+
+    rows = near_duplicate_index.filter_new(db, News, rows, site)
+    ids = _bulk_insert(db, News, News.title, rows, batch_size)
+    logging.info(f"Added {len(ids)} news articles from {site} ({len(unique) - len(ids)} skipped)")
+    return ids
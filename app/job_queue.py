@@ -0,0 +1,398 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import and_, or_, update, delete, func
+from .database import SessionLocal
+from .models import ImageJob
+from .queue_manager import JobStatus
+
+ACTIVE_STATUSES = (JobStatus.PENDING.value, JobStatus.PROCESSING.value)
+
+
+@dataclass
+class ClaimedJob:
+    """A job leased to one worker. `lease_token` must be passed back to complete() or fail()."""
+    id: str
+    entity_type: str
+    entity_id: int
+    attempts: int
+    lease_token: str
+
+
+class JobQueue:
+    """
+    Durable queue of image generation jobs stored in the image_jobs table.
+
+    A worker claims jobs by taking a lease on them: the job moves to "processing"
+    with a lease token and an expiry time. If the worker dies, the lease expires and
+    the job becomes claimable again, up to `max_attempts` attempts. Failed attempts
+    are retried after an exponential backoff. Finished jobs are kept for
+    `retention_seconds` so their status can be polled, then compacted away.
+
+    Claiming selects candidates with SELECT ... FOR UPDATE SKIP LOCKED where the
+    database supports it, and only takes a job if a conditional UPDATE still finds
+    it claimable, so concurrent workers never get the same job (also on SQLite,
+    which ignores FOR UPDATE).
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay_seconds: Optional[float] = None,
+        retention_seconds: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.lease = timedelta(seconds=lease_seconds or float(os.getenv("IMAGE_JOB_LEASE_SECONDS", 600)))
+        self.max_attempts = max_attempts or int(os.getenv("IMAGE_JOB_MAX_ATTEMPTS", 3))
+        self.retry_delay = retry_delay_seconds if retry_delay_seconds is not None else float(os.getenv("IMAGE_JOB_RETRY_DELAY", 30))
+        self.retention = timedelta(seconds=retention_seconds or float(os.getenv("IMAGE_JOB_RETENTION", 7 * 24 * 3600)))
+        self.logger = logging.getLogger(__name__)
+
+    def enqueue(self, entity_type: str, entity_ids: List[int]) -> Dict[int, str]:
+        """
+        Queue an image generation job for each entity and return {entity_id: job_id}.
+
+        Entities that already have a pending or processing job keep that job instead
+        of getting a second one.
+        """
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            job_ids = dict(
+                db.query(ImageJob.entity_id, ImageJob.id)
+                .filter(ImageJob.entity_type == entity_type)
+                .filter(ImageJob.entity_id.in_(entity_ids))
+                .filter(ImageJob.status.in_(ACTIVE_STATUSES))
+                .all()
+            ) if entity_ids else {}
+
+            new_jobs = []
+            for entity_id in entity_ids:
+                if entity_id in job_ids:
+                    continue
+                job_ids[entity_id] = str(uuid.uuid4())
+                new_jobs.append({
+                    "id": job_ids[entity_id],
+                    "entity_type": entity_type,
+                    "entity_id": entity_id,
+                    "status": JobStatus.PENDING.value,
+                    "attempts": 0,
+                    "max_attempts": self.max_attempts,
+                    "available_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+            if new_jobs:
+                db.bulk_insert_mappings(ImageJob, new_jobs)
+                db.commit()
+            self.logger.info(f"Queued {len(new_jobs)} {entity_type} image jobs ({len(entity_ids) - len(new_jobs)} already queued)")
+            return job_ids
+        finally:
+            db.close()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        """Pending jobs that are due, and processing jobs whose lease has expired."""
+        return and_(
+            ImageJob.attempts < ImageJob.max_attempts,
+            or_(
+                and_(ImageJob.status == JobStatus.PENDING.value, ImageJob.available_at <= now),
+                and_(ImageJob.status == JobStatus.PROCESSING.value, ImageJob.lease_expires_at < now),
+            ),
+        )
+
+    def claim(self, worker_id: str, limit: int = 1) -> List[ClaimedJob]:
+        """Lease up to `limit` jobs to `worker_id`, oldest first."""
+        now = datetime.now()
+        token = str(uuid.uuid4())
+        db = self.session_factory()
+        try:
+            candidates = [
+                job_id for (job_id,) in db.query(ImageJob.id)
+                .filter(self._claimable(now))
+                .order_by(ImageJob.available_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all()
+            ]
+            if not candidates:
+                db.rollback()
+                return []
+
+            db.execute(
+                update(ImageJob)
+                .where(ImageJob.id.in_(candidates), self._claimable(now))
+                .values(
+                    status=JobStatus.PROCESSING.value,
+                    attempts=ImageJob.attempts + 1,
+                    lease_token=token,
+                    lease_expires_at=now + self.lease,
+                    locked_by=worker_id,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+            claimed = db.query(ImageJob.id, ImageJob.entity_type, ImageJob.entity_id, ImageJob.attempts) \
+                .filter(ImageJob.lease_token == token).all()
+            return [ClaimedJob(*row, lease_token=token) for row in claimed]
+        finally:
+            db.close()
+
+    def _finish(self, job: ClaimedJob, **values) -> bool:
+        """Update a job only while `job`'s lease still holds it. Returns False if the lease was lost."""
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(ImageJob)
+                .where(ImageJob.id == job.id, ImageJob.lease_token == job.lease_token)
+                .values(updated_at=datetime.now(), **values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            if result.rowcount == 0:
+                self.logger.warning(f"Lease on job {job.id} was lost before it finished")
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def extend(self, job: ClaimedJob) -> bool:
+        """Push back the lease expiry of a job that is still being worked on."""
+        return self._finish(job, lease_expires_at=datetime.now() + self.lease)
+
+    def complete(self, job: ClaimedJob, image_path: Optional[str] = None) -> bool:
+        now = datetime.now()
+        self.logger.info(f"Job {job.id} completed - Image: {image_path}")
+        return self._finish(
+            job,
+            status=JobStatus.COMPLETED.value,
+            image_path=image_path,
+            error=None,
+            lease_token=None,
+            lease_expires_at=None,
+            completed_at=now,
+        )
+
+    def fail(self, job: ClaimedJob, error: str) -> bool:
+        """Record a failed attempt: retry after a backoff, or fail the job for good after max_attempts."""
+        now = datetime.now()
+        if job.attempts >= self.max_attempts:
+            self.logger.error(f"Job {job.id} failed after {job.attempts} attempts: {error}")
+            return self._finish(
+                job,
+                status=JobStatus.FAILED.value,
+                error=error,
+                lease_token=None,
+                lease_expires_at=None,
+                completed_at=now,
+            )
+
+        delay = self.retry_delay * 2 ** (job.attempts - 1)
+        self.logger.warning(f"Job {job.id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {error}")
+        return self._finish(
+            job,
+            status=JobStatus.PENDING.value,
+            error=error,
+            lease_token=None,
+            lease_expires_at=None,
+            available_at=now + timedelta(seconds=delay),
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        db = self.session_factory()
+        try:
+            job = db.query(ImageJob).filter(ImageJob.id == job_id).first()
+            if job is None:
+                return None
+            return {
+                "job_id": job.id,
+                f"{job.entity_type}_id": job.entity_id,
+                "status": job.status,
+                "attempts": job.attempts,
+                "created_at": job.created_at,
+                "completed_at": job.completed_at,
+                "error": job.error,
+                "image_path": job.image_path,
+            }
+        finally:
+            db.close()
+
+    def compact(self) -> dict:
+        """
+        Fail jobs whose last attempt's lease expired with no attempts left, and delete
+        finished jobs older than the retention period.
+        """
+        now = datetime.now()
+        db = self.session_factory()
+        try:
+            abandoned = db.execute(
+                update(ImageJob)
+                .where(
+                    ImageJob.status == JobStatus.PROCESSING.value,
+                    ImageJob.lease_expires_at < now,
+                    ImageJob.attempts >= ImageJob.max_attempts,
+                )
+                .values(
+                    status=JobStatus.FAILED.value,
+                    error="Lease expired on the last attempt",
+                    lease_token=None,
+                    lease_expires_at=None,
+                    completed_at=now,
+                    updated_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            deleted = db.execute(
+                delete(ImageJob)
+                .where(
+                    ImageJob.status.in_([JobStatus.COMPLETED.value, JobStatus.FAILED.value]),
+                    ImageJob.completed_at < now - self.retention,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if abandoned or deleted:
+                self.logger.info(f"Compacted image jobs: {abandoned} abandoned, {deleted} deleted")
+            return {"abandoned": abandoned, "deleted": deleted}
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        db = self.session_factory()
+        try:
+            counts = dict(db.query(ImageJob.status, func.count()).group_by(ImageJob.status).all())
+            return {status.value: counts.get(status.value, 0) for status in JobStatus}
+        finally:
+            db.close()
+
+
+class JobWorker:
+    """
+    Asyncio loop that claims jobs from a JobQueue and runs `handler` on each.
+
+    `handler(job)` returns the image path of a finished job and raises on failure.
+    Up to `concurrency` jobs run at once; leases are extended while a job runs, so
+    only a worker that stops responding loses its jobs. Every API process can run
+    its own worker against the same table.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[ClaimedJob], Awaitable[Optional[str]]],
+        concurrency: Optional[int] = None,
+        poll_interval: float = 5,
+        compact_interval: float = 600,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency or int(os.getenv("IMAGE_WORKER_CONCURRENCY", 2))
+        self.poll_interval = poll_interval
+        self.compact_interval = compact_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.logger = logging.getLogger(__name__)
+        self.completed = 0
+        self.failed = 0
+        self._finished_at = deque()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._running = set()
+
+    def notify(self):
+        """Wake the worker up right away, e.g. after jobs were enqueued."""
+        self._wake.set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+        self.logger.info(f"Image job worker {self.worker_id} started")
+
+    async def stop(self):
+        """Stop claiming jobs. Jobs still running are cancelled; their leases expire and they are retried."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        for task in list(self._running):
+            task.cancel()
+        await asyncio.gather(self._task, *self._running, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        last_compact = None
+        while True:
+            if last_compact is None or loop.time() - last_compact > self.compact_interval:
+                try:
+                    await asyncio.to_thread(self.queue.compact)
+                except Exception as e:
+                    self.logger.error(f"Error compacting image jobs: {e}")
+                last_compact = loop.time()
+
+            free = self.concurrency - len(self._running)
+            jobs = []
+            if free > 0:
+                try:
+                    jobs = await asyncio.to_thread(self.queue.claim, self.worker_id, free)
+                except Exception as e:
+                    self.logger.error(f"Error claiming image jobs: {e}")
+            for job in jobs:
+                task = asyncio.create_task(self._run(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            # Poll again right away while there is work and free capacity
+            if jobs and len(self._running) < self.concurrency:
+                continue
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _keep_lease(self, job: ClaimedJob):
+        while True:
+            await asyncio.sleep(self.queue.lease.total_seconds() / 3)
+            await asyncio.to_thread(self.queue.extend, job)
+
+    async def _run(self, job: ClaimedJob):
+        heartbeat = asyncio.create_task(self._keep_lease(job))
+        try:
+            image_path = await self.handler(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            await asyncio.to_thread(self.queue.fail, job, str(e))
+        else:
+            self.completed += 1
+            self._finished_at.append(time.monotonic())
+            await asyncio.to_thread(self.queue.complete, job, image_path)
+        finally:
+            heartbeat.cancel()
+            self._wake.set()
+
+    def stats(self, window: float = 300) -> dict:
+        """Counters of this worker, with its throughput over the last `window` seconds in jobs/minute."""
+        now = time.monotonic()
+        while self._finished_at and self._finished_at[0] < now - window:
+            self._finished_at.popleft()
+        return {
+            "worker_id": self.worker_id,
+            "concurrency": self.concurrency,
+            "running": len(self._running),
+            "completed": self.completed,
+            "failed": self.failed,
+            "per_minute": round(len(self._finished_at) / window * 60, 2),
+        }
+
+
+job_queue = JobQueue()
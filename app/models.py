@@ -1,25 +1,8 @@
-from sqlalchemy import Column, String, Text, DateTime, Integer, JSON, Enum
+from sqlalchemy import Column, String, Text, DateTime, Integer, BigInteger, JSON, Enum, Index, Boolean
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-import os
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Define the MySQL connection string
-MYSQL_USER = os.getenv("MYSQL_USER")
-MYSQL_PASSWORD = os.getenv("MYSQL_PASSWORD")
-MYSQL_HOST = os.getenv("MYSQL_HOST", "localhost")
-MYSQL_DB = os.getenv("MYSQL_DB")
-
-DATABASE_URL = f"mysql+pymysql://{MYSQL_USER}:{MYSQL_PASSWORD}@{MYSQL_HOST}:3306/{MYSQL_DB}"
-
-# Initialize SQLAlchemy
+# Tables are created and sessions opened through app.database, which builds the engine on first use
 Base = declarative_base()
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Define the Scholarship table
 class Scholarship(Base):
@@ -31,10 +14,18 @@ class Scholarship(Base):
     deadline = Column(DateTime, nullable=True)
     requirements = Column(JSON, nullable=True)
     image_url = Column(String(500), nullable=True)
+    image_variants = Column(JSON, nullable=True)
     description = Column(Text, nullable=True)
     degree_level = Column(Enum('bachelor', 'master', 'doctorate', name='degree_level'), nullable=True)
     times_updated = Column(Integer, nullable=True, default=0)
 
+    # Composite indexes backing keyset pagination and filters on the list endpoint
+    __table_args__ = (
+        Index('ix_scholarships_deadline_id', 'deadline', 'id'),
+        Index('ix_scholarships_degree_level_id', 'degree_level', 'id'),
+        Index('ix_scholarships_degree_level_deadline_id', 'degree_level', 'deadline', 'id'),
+    )
+
 
 # Define the News table
 class News(Base):
@@ -45,10 +36,120 @@ class News(Base):
     body = Column(Text, nullable=True)
     published_at = Column(DateTime, nullable=True)
     image_url = Column(String(500), nullable=True)
+    image_variants = Column(JSON, nullable=True)
     source = Column(String(255), nullable=True)
     url = Column(String(500), nullable=True)
     category = Column(Enum('visa', 'blog', name='news_category'), nullable=False)
     times_updated = Column(Integer, nullable=True, default=0)
 
-# Create all tables
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        Index('ix_news_category_id', 'category', 'id'),
+    )
+
+
+# Cached LLM extraction results, keyed by URL, page content, prompt and model
+class ExtractionCacheEntry(Base):
+    __tablename__ = 'extraction_cache'
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    url = Column(String(500), nullable=False)
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False, index=True)
+    hits = Column(Integer, nullable=False, default=0)
+
+
+# HTTP validators of the last fetch of each source URL, used for conditional requests
+class PageValidator(Base):
+    __tablename__ = 'page_validators'
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(500), nullable=False, unique=True, index=True)
+    etag = Column(String(255), nullable=True)
+    last_modified = Column(String(64), nullable=True)
+    content_length = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    checked_at = Column(DateTime, nullable=True)
+    changed_at = Column(DateTime, nullable=True)
+    # Extraction cache key of the listing last stored from this page, see scraper.save_extraction
+    stored_key = Column(String(64), nullable=True)
+
+
+# Durable image generation jobs, claimed by the workers under a lease
+class ImageJob(Base):
+    __tablename__ = 'image_jobs'
+    id = Column(String(36), primary_key=True)
+    entity_type = Column(Enum('scholarship', 'news', name='image_job_entity_type'), nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    status = Column(Enum('pending', 'processing', 'completed', 'failed', name='image_job_status'), nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    available_at = Column(DateTime, nullable=False)
+    lease_expires_at = Column(DateTime, nullable=True)
+    lease_token = Column(String(36), nullable=True)
+    locked_by = Column(String(255), nullable=True)
+    error = Column(Text, nullable=True)
+    image_path = Column(String(500), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index('ix_image_jobs_status_available_at', 'status', 'available_at'),
+        Index('ix_image_jobs_status_lease_expires_at', 'status', 'lease_expires_at'),
+        Index('ix_image_jobs_status_completed_at', 'status', 'completed_at'),
+        Index('ix_image_jobs_entity', 'entity_type', 'entity_id'),
+        Index('ix_image_jobs_lease_token', 'lease_token'),
+    )
+
+# Generated images shared by every row whose normalized prompt has the same hash
+class StoredImage(Base):
+    __tablename__ = 'image_store'
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_key = Column(String(64), nullable=False, unique=True, index=True)
+    normalized_prompt = Column(Text, nullable=False)
+    provider = Column(String(50), nullable=False)
+    image_url = Column(String(500), nullable=False, index=True)
+    variants = Column(JSON, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    reuses = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
+
+# Registry of the sites scraped on a schedule, with each one's adaptive refresh interval
+class ScrapeSource(Base):
+    __tablename__ = 'scrape_sources'
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(500), nullable=False, unique=True, index=True)
+    kind = Column(Enum('scholarships', 'news', name='scrape_source_kind'), nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True)
+    refresh_interval = Column(Integer, nullable=False)
+    next_run_at = Column(DateTime, nullable=False)
+    last_run_at = Column(DateTime, nullable=True)
+    last_success_at = Column(DateTime, nullable=True)
+    last_change_at = Column(DateTime, nullable=True)
+    consecutive_failures = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    runs = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+    # CSS selector rules extracting the items without the LLM, see extraction_rules
+    extraction_rules = Column(JSON(none_as_null=True), nullable=True)
+    rule_hits = Column(Integer, nullable=False, default=0)
+    rule_fallbacks = Column(Integer, nullable=False, default=0)
+    last_fallback_reason = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index('ix_scrape_sources_enabled_next_run_at', 'enabled', 'next_run_at'),
+    )
+
+# LSH buckets of the MinHash signature of each scholarship and news article, see near_duplicates
+class NearDuplicateBucket(Base):
+    __tablename__ = 'near_duplicate_buckets'
+    id = Column(Integer, primary_key=True)
+    kind = Column(Enum('scholarships', 'news', name='near_duplicate_kind'), nullable=False)
+    bucket = Column(BigInteger, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_near_duplicate_buckets_kind_bucket', 'kind', 'bucket'),
+        Index('ix_near_duplicate_buckets_kind_entity_id', 'kind', 'entity_id'),
+    )
@@ -0,0 +1,372 @@
+import hashlib
+import logging
+import os
+import random
+import threading
+from difflib import SequenceMatcher
+import time
+from datetime import date, datetime
+from itertools import combinations, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from .image_store import normalize_prompt
+from .models import NearDuplicateBucket, News, Scholarship
+
+# Columns describing an item: its title, who issues it, where it was found and the details
+# telling items apart when no issuer is named, its date first
+FEATURE_COLUMNS = {
+    Scholarship: ("program_title", "funded_by", "url", "deadline", "degree_level"),
+    News: ("title", "source", "url", "published_at", "category"),
+}
+# 16 bands of 4 values: items with a Jaccard similarity of 0.65 share a band 96% of the time, of 0.3 12%
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+SHINGLE_SIZE = 4
+BATCH_SIZE = 1000
+# Issuers named on both items must share this share of their shingles
+ISSUER_THRESHOLD = 0.5
+# Words only one title has must be spellings of each other ("programme", "program") this close
+SPELLING_THRESHOLD = 0.8
+
+# Only articles and prepositions are left out: award types ("Scholarship", "Bursary") tell items apart
+_STOP_WORDS = frozenset("a an and at for in of on the to".split())
+# Words most issuer names have, which would make two funders look alike; titles keep them
+_ISSUER_NOISE = _STOP_WORDS | frozenset(
+    "foundation fund trust society association council institute university college inc ltd".split()
+)
+# Values taken from a neighbouring bin are shifted by a multiple of this, above any value a bin can hold
+_BIN_SPAN = (1 << 64) // SIGNATURE_SIZE + 1
+# Fixed for every process, so signatures stored by one are comparable with another's
+_BORROW_LEFT = [random.Random(f"near-duplicates-{i}").random() < 0.5 for i in range(SIGNATURE_SIZE)]
+
+
+def _words(text: Optional[str], ignored=_STOP_WORDS) -> List[str]:
+    """
+    Words of a text normalized as for image prompts (so years and punctuation do
+    not count), without the `ignored` words and with plurals made singular.
+    """
+    if not text:
+        return []
+    return [word[:-1] if len(word) > 3 and word.endswith("s") else word
+            for word in normalize_prompt(text).split() if word not in ignored]
+
+
+def _shingles(words: List[str]) -> Set[str]:
+    if not words:
+        return set()
+    text = f" {' '.join(words)} "
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+class Features(NamedTuple):
+    """
+    What is compared between items; the signature is computed from the shingles,
+    those of the title and one for each detail given.
+    """
+
+    title: Optional[str]
+    shingles: Set[str]
+    words: Set[str]
+    host: str
+    issuer: Set[str]
+    details: Tuple[Optional[str], ...]
+
+
+def _detail(value) -> Optional[str]:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    if isinstance(value, str) and value.strip():
+        return value.strip().casefold()
+    return None
+
+
+def features(title: Optional[str], issuer: Optional[str], url: Optional[str], *details) -> Features:
+    words = _words(title)
+    host = urlsplit(url).netloc.lower().removeprefix("www.") if url else ""
+    details = tuple(_detail(value) for value in details)
+    shingles = _shingles(words) | {f"#{index}:{value}" for index, value in enumerate(details) if value}
+    return Features(title, shingles, set(words), host, _shingles(_words(issuer, _ISSUER_NOISE)), details)
+
+
+def same_words(a: Set[str], b: Set[str]) -> bool:
+    """
+    Whether two titles name the same thing: the words one has and the other lacks
+    pair up as spelling variants, so a word added ("Undergraduate") or replaced
+    ("Bursary" for "Scholarship", "Graduate" for "Undergraduate") makes another item.
+    Numbers have no spelling variants: "Award 36" and "Award 396" are two items.
+    """
+    left, right = sorted(a - b), sorted(b - a)
+    if len(left) != len(right) or any(char.isdigit() for word in left + right for char in word):
+        return False
+    for word in left:
+        match = next((other for other in right if SequenceMatcher(None, word, other).ratio() >= SPELLING_THRESHOLD), None)
+        if match is None:
+            return False
+        right.remove(match)
+    return True
+
+
+def same_details(a: Tuple[Optional[str], ...], b: Tuple[Optional[str], ...]) -> bool:
+    """Whether two items give the same date, and agree on every other detail both give."""
+    if not a or not a[0] or a[0] != b[0]:
+        return False
+    return all(x == y for x, y in zip(a[1:], b[1:]) if x and y)
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def signature(shingles: Iterable[str]) -> Optional[List[int]]:
+    """
+    MinHash signature of a set with one permutation: every shingle is hashed once
+    and kept as the minimum of the bin its hash falls in, instead of being hashed
+    SIGNATURE_SIZE times. Empty bins take the value of the nearest filled bin in a
+    fixed direction (densification), so two sets agree on a bin with a probability
+    equal to their Jaccard similarity, as with SIGNATURE_SIZE permutations.
+    """
+    bins = [None] * SIGNATURE_SIZE
+    for shingle in shingles:
+        value, index = divmod(_hash64(shingle), SIGNATURE_SIZE)
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+    if all(value is None for value in bins):
+        return None
+    filled = list(bins)
+    for index, value in enumerate(bins):
+        if value is not None:
+            continue
+        step = -1 if _BORROW_LEFT[index] else 1
+        distance = 1
+        while bins[(index + step * distance) % SIGNATURE_SIZE] is None:
+            distance += 1
+        filled[index] = bins[(index + step * distance) % SIGNATURE_SIZE] + distance * _BIN_SPAN
+    return filled
+
+
+def band_keys(values: List[int]) -> List[int]:
+    """The LSH bucket of each band of a signature, as non-negative 63-bit integers."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(
+            repr((band, values[band * ROWS:(band + 1) * ROWS])).encode("ascii"), digest_size=8
+        ).digest()
+        keys.append(int.from_bytes(digest, "little") >> 1)
+    return keys
+
+
+class NearDuplicateIndex:
+    """
+    Finds scraped items that are the same scholarship or article as a stored one
+    under a slightly different title or URL, e.g. listed by two aggregators.
+
+    Every stored row has the LSH buckets of its MinHash signature in the
+    near_duplicate_buckets table, so a new item is only compared with the rows
+    sharing one of its buckets, found through an index, instead of the whole
+    table. Candidates are confirmed when the Jaccard similarity of their shingles
+    (those of the title and the details) reaches NEAR_DUPLICATE_THRESHOLD (default
+    0.65), their titles differ by no word but spelling variants, and either both
+    name the same issuer, or neither names one and both come from the same host or
+    give the same date (deadline or publication) and agree on the degree level or
+    category when both give it. Buckets shared by more than
+    NEAR_DUPLICATE_MAX_BUCKET rows (default 50) come from what many items have in
+    common, not from copies, and are ignored. NEAR_DUPLICATES_ENABLED=0 leaves
+    ingestion to the exact title match alone.
+    """
+
+    def __init__(self, threshold: float = None, max_bucket: int = None):
+        self.threshold = threshold or float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.65))
+        self.max_bucket = max_bucket or int(os.getenv("NEAR_DUPLICATE_MAX_BUCKET", 50))
+        self.enabled = os.getenv("NEAR_DUPLICATES_ENABLED", "1") != "0"
+        self.checked = 0
+        self.skipped = 0
+        self.last_dedupe = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def same_item(self, a: Features, b: Features) -> bool:
+        """
+        Whether two items' features are close enough to be the same item. A title
+        left empty by the normalization never matches, and an issuer named on one
+        item only is not enough to tell a copy from another item of its issuer.
+        Without issuers, items of two sites (e.g. two aggregators) must give the
+        same details.
+        """
+        if not a.words or not b.words:
+            return False
+        if jaccard(a.shingles, b.shingles) < self.threshold or not same_words(a.words, b.words):
+            return False
+        if a.issuer and b.issuer:
+            return jaccard(a.issuer, b.issuer) >= ISSUER_THRESHOLD
+        if a.issuer or b.issuer:
+            return False
+        return (bool(a.host) and a.host == b.host) or same_details(a.details, b.details)
+
+    def _stored_features(self, db: Session, model, ids: Iterable[int]) -> Dict[int, Features]:
+        columns = [getattr(model, name) for name in FEATURE_COLUMNS[model]]
+        ids = sorted(ids)
+        stored = {}
+        for start in range(0, len(ids), BATCH_SIZE):
+            for id, *values in db.query(model.id, *columns).filter(model.id.in_(ids[start:start + BATCH_SIZE])):
+                stored[id] = features(*values)
+        return stored
+
+    def _bucket_members(self, db: Session, model, keys: Set[int]) -> Dict[int, Set[int]]:
+        kind = model.__tablename__
+        keys = sorted(keys)
+        members = {}
+        for start in range(0, len(keys), BATCH_SIZE):
+            rows = db.query(NearDuplicateBucket.bucket, NearDuplicateBucket.entity_id).filter(
+                NearDuplicateBucket.kind == kind, NearDuplicateBucket.bucket.in_(keys[start:start + BATCH_SIZE])
+            )
+            for bucket, entity_id in rows:
+                members.setdefault(bucket, set()).add(entity_id)
+        return {bucket: ids for bucket, ids in members.items() if len(ids) <= self.max_bucket}
+
+    def filter_new(self, db: Session, model, rows: List[dict], site: str) -> List[dict]:
+        """
+        Drop the rows about to be inserted that nearly duplicate a stored row or an
+        earlier row of the same batch. `rows` use the column names of `model`.
+        """
+        if not self.enabled or not rows:
+            return rows
+        names = FEATURE_COLUMNS[model]
+        prepared = []
+        for row in rows:
+            item = features(*(row.get(name) for name in names))
+            values = signature(item.shingles)
+            prepared.append((row, item, band_keys(values) if values else []))
+
+        members = self._bucket_members(db, model, {key for _, _, keys in prepared for key in keys})
+        stored = self._stored_features(db, model, {id for ids in members.values() for id in ids})
+        kept, batch_members = [], {}
+        for row, item, keys in prepared:
+            candidates = {id for key in keys for id in members.get(key, ())}
+            match = next((id for id in sorted(candidates) if id in stored and self.same_item(item, stored[id])), None)
+            if match is not None:
+                duplicate = f"{model.__tablename__} {match} ({stored[match].title!r}, {stored[match].host})"
+            else:
+                # Crowded buckets of the batch are ignored as those of the table are
+                earlier = {index for key in keys if len(batch_members.get(key, ())) <= self.max_bucket
+                           for index in batch_members.get(key, ())}
+                index = next((index for index in sorted(earlier) if self.same_item(item, kept[index][1])), None)
+                duplicate = None if index is None else f"an earlier item of the batch ({kept[index][1].title!r})"
+            if duplicate is not None:
+                self.logger.warning(
+                    f"Skipped {row.get(names[0])!r} ({item.host}) from {site} as a near duplicate of {duplicate}"
+                )
+                continue
+            for key in keys:
+                batch_members.setdefault(key, []).append(len(kept))
+            kept.append((row, item))
+
+        with self._lock:
+            self.checked += len(rows)
+            self.skipped += len(rows) - len(kept)
+        return [row for row, _ in kept]
+
+    def index(self, db: Session, model, *criteria) -> int:
+        """Store the buckets of the rows of `model` matching `criteria`; the caller commits."""
+        kind = model.__tablename__
+        columns = [getattr(model, name) for name in FEATURE_COLUMNS[model]]
+        statement = select(model.id, *columns).where(*criteria).order_by(model.id).execution_options(yield_per=BATCH_SIZE)
+        indexed = 0
+        for partition in db.execute(statement).partitions():
+            buckets = []
+            for id, *values in partition:
+                signature_values = signature(features(*values).shingles)
+                if signature_values:
+                    buckets.extend({"kind": kind, "bucket": key, "entity_id": id} for key in band_keys(signature_values))
+            if buckets:
+                db.execute(insert(NearDuplicateBucket), buckets)
+            indexed += len(partition)
+        return indexed
+
+    def remove(self, db: Session, model, ids: List[int]):
+        """Drop the buckets of deleted rows; the caller commits."""
+        if not ids:
+            return
+        db.execute(
+            delete(NearDuplicateBucket)
+            .where(NearDuplicateBucket.kind == model.__tablename__, NearDuplicateBucket.entity_id.in_(ids))
+            .execution_options(synchronize_session=False)
+        )
+
+    def find_duplicates(self, db: Session, model) -> List[List[int]]:
+        """
+        Rebuild the buckets of every row of `model` and group the stored near
+        duplicates, each group in id order so the oldest row comes first.
+
+        Pairs of rows sharing a bucket are read from the bucket index in bucket
+        order and confirmed with their features; groups join rows linked by
+        confirmed pairs when their oldest rows are the same item too.
+        """
+        started = time.perf_counter()
+        kind = model.__tablename__
+        db.execute(delete(NearDuplicateBucket).where(NearDuplicateBucket.kind == kind))
+        rows = self.index(db, model)
+        db.commit()
+
+        pairs = set()
+        statement = (
+            select(NearDuplicateBucket.bucket, NearDuplicateBucket.entity_id)
+            .where(NearDuplicateBucket.kind == kind)
+            .order_by(NearDuplicateBucket.bucket)
+            .execution_options(yield_per=BATCH_SIZE * 10)
+        )
+        for _, members in groupby(db.execute(statement), key=itemgetter(0)):
+            members = sorted({entity_id for _, entity_id in members})
+            if 1 < len(members) <= self.max_bucket:
+                pairs.update(combinations(members, 2))
+        stored = self._stored_features(db, model, {id for pair in pairs for id in pair})
+        parent = {}
+
+        def root(id):
+            while parent.get(id, id) != id:
+                id = parent[id]
+            return id
+
+        for first, second in sorted(pairs):
+            if not self.same_item(stored[first], stored[second]):
+                continue
+            low, high = sorted((root(first), root(second)))
+            # A copy without an issuer can match two different items; their groups stay apart
+            if low != high and self.same_item(stored[low], stored[high]):
+                parent[high] = low
+        groups = {}
+        for id in parent:
+            groups.setdefault(root(id), set()).add(id)
+        result = sorted((sorted(group | {keeper}) for keeper, group in groups.items()), key=lambda group: group[0])
+
+        self.last_dedupe = {
+            "kind": kind,
+            "rows": rows,
+            "candidate_pairs": len(pairs),
+            "groups": len(result),
+            "duplicates": sum(len(group) - 1 for group in result),
+            "seconds": round(time.perf_counter() - started, 2),
+            "finished_at": datetime.now(),
+        }
+        self.logger.info(f"Near-duplicate scan of {kind}: {self.last_dedupe}")
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "threshold": self.threshold,
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "last_dedupe": self.last_dedupe,
+            }
+
+
+near_duplicate_index = NearDuplicateIndex()
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+from .database import SessionLocal
+
+
+@dataclass
+class SiteReport:
+    site: str
+    status: str = "pending"  # "succeeded", "failed" or "skipped"
+    extracted: int = 0
+    inserted: int = 0
+    timings: Dict[str, float] = field(default_factory=dict)
+    unchanged: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class RunReport:
+    kind: str
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    sites: List[SiteReport] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        stages = defaultdict(list)
+        for site in self.sites:
+            for stage, seconds in site.timings.items():
+                stages[stage].append(seconds)
+
+        return {
+            "kind": self.kind,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "sites_attempted": sum(1 for s in self.sites if s.status != "skipped"),
+            "sites_succeeded": sum(1 for s in self.sites if s.status == "succeeded"),
+            "sites_failed": sum(1 for s in self.sites if s.status == "failed"),
+            "sites_skipped": sum(1 for s in self.sites if s.status == "skipped"),
+            "sites_unchanged": sum(1 for s in self.sites if s.unchanged),
+            "items_extracted": sum(s.extracted for s in self.sites),
+            "items_inserted": sum(s.inserted for s in self.sites),
+            "stage_latency": {
+                stage: {
+                    "total": round(sum(values), 3),
+                    "avg": round(sum(values) / len(values), 3),
+                    "max": round(max(values), 3),
+                }
+                for stage, values in stages.items()
+            },
+            "sites": [vars(s) for s in self.sites],
+        }
+
+
+class ScrapeOrchestrator:
+    """
+    Run a scrape function over many source URLs with bounded concurrency.
+
+    `max_concurrency` caps how many sites are scraped at once across all domains,
+    which is also the number of browsers/LLM calls in flight. `per_domain_limit`
+    caps concurrent requests to a single host and `max_sites` caps how many sites
+    a single run may scrape; the rest are reported as skipped. Every worker gets
+    its own database session.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        per_domain_limit: Optional[int] = None,
+        max_sites: Optional[int] = None,
+        session_factory: Callable = SessionLocal,
+    ):
+        self.max_concurrency = max_concurrency or int(os.getenv("SCRAPER_CONCURRENCY", 3))
+        self.per_domain_limit = per_domain_limit or int(os.getenv("SCRAPER_PER_DOMAIN_CONCURRENCY", 1))
+        if max_sites is None and os.getenv("SCRAPER_MAX_SITES_PER_RUN"):
+            max_sites = int(os.getenv("SCRAPER_MAX_SITES_PER_RUN"))
+        self.max_sites = max_sites
+        self.session_factory = session_factory
+        self.last_reports: Dict[str, Dict] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def _run_one(self, site: str, scrape_fn: Callable) -> SiteReport:
+        """Scrape a single site with a dedicated session (runs in a worker thread)."""
+        report = SiteReport(site=site)
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            result = scrape_fn(site, db) or {}
+            report.extracted = result.get("extracted", 0)
+            report.inserted = result.get("inserted", 0)
+            report.timings = dict(result.get("timings", {}))
+            report.unchanged = result.get("unchanged", False)
+            report.error = result.get("error")
+            report.status = "failed" if report.error else "succeeded"
+        except Exception as e:
+            self.logger.error(f"Scraping {site} failed: {e}")
+            report.status = "failed"
+            report.error = str(e)
+        finally:
+            db.close()
+        report.timings["total"] = time.perf_counter() - started
+        return report
+
+    async def run(self, sites: List[str], scrape_fn: Callable, kind: str) -> Dict:
+        """Scrape all sites and return the run report as a dict."""
+        run_report = RunReport(kind=kind, started_at=datetime.now())
+
+        # Drop duplicate URLs while keeping their order
+        sites = list(dict.fromkeys(sites))
+        if self.max_sites is not None and len(sites) > self.max_sites:
+            for site in sites[self.max_sites:]:
+                run_report.sites.append(SiteReport(site=site, status="skipped", error="Run budget exceeded"))
+            sites = sites[:self.max_sites]
+
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        domain_limits = defaultdict(lambda: asyncio.Semaphore(self.per_domain_limit))
+
+        async def worker(site):
+            domain = urlparse(site).netloc.lower()
+            async with domain_limits[domain]:
+                async with global_limit:
+                    return await asyncio.to_thread(self._run_one, site, scrape_fn)
+
+        self.logger.info(
+            f"Starting {kind} run over {len(sites)} sites "
+            f"(concurrency={self.max_concurrency}, per_domain={self.per_domain_limit})"
+        )
+        run_report.sites = list(await asyncio.gather(*(worker(site) for site in sites))) + run_report.sites
+        run_report.finished_at = datetime.now()
+
+        report = run_report.to_dict()
+        self.last_reports[kind] = report
+        self.logger.info(
+            f"Finished {kind} run: {report['sites_succeeded']}/{report['sites_attempted']} sites succeeded, "
+            f"{report['items_extracted']} items extracted, {report['items_inserted']} inserted"
+        )
+        return report
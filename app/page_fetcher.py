@@ -0,0 +1,129 @@
+import hashlib
+import logging
+import re
+import threading
+from datetime import datetime
+import requests
+from sqlalchemy.orm import Session
+from .models import PageValidator
+
+USER_AGENT = "Mozilla/5.0 (compatible; ScholarshipsScraper/1.0)"
+
+_IGNORED_BLOCKS = re.compile(r"<(script|style|noscript)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_html(html: str) -> str:
+    """Drop scripts, styles and comments and collapse whitespace, so that nonces and
+    tracking snippets that change on every request do not change the page hash."""
+    html = _IGNORED_BLOCKS.sub("", html)
+    html = _COMMENTS.sub("", html)
+    return _WHITESPACE.sub(" ", html).strip()
+
+
+def content_hash(html: str) -> str:
+    """Return the SHA-256 hex digest of the normalized page content."""
+    return hashlib.sha256(normalize_html(html).encode("utf-8")).hexdigest()
+
+
+def fetch_page(url: str, timeout: float = 15) -> dict:
+    """
+    Fetch the raw HTML of a page with a plain HTTP GET (no browser).
+
+    Raises requests.exceptions.RequestException on network or HTTP errors.
+    """
+    response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=timeout)
+    response.raise_for_status()
+    html = response.text
+    logging.info(f"Fetched {url} ({len(html)} characters)")
+    return {"url": url, "html": html, "content_hash": content_hash(html)}
+
+
+class FetchStats:
+    """Thread-safe counters for the conditional fetch stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            "conditional_requests": 0,
+            "not_modified": 0,
+            "unchanged_body": 0,
+            "changed": 0,
+            "browser_launches": 0,
+            "browser_launches_skipped": 0,
+        }
+
+    def record(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+fetch_stats = FetchStats()
+
+
+def conditional_fetch(db: Session, url: str, timeout: float = 15) -> dict:
+    """
+    Fetch a page with a conditional GET using the validators stored for its URL.
+
+    A 304 response, or a 200 whose normalized body hashes to the stored value, is
+    reported as unchanged; a 304 for a URL without a stored hash is fetched again
+    unconditionally. The returned dict has the keys url, html (None on a 304),
+    content_hash, changed and stored_key, the extraction cache key of the listing
+    last stored from the page. The validators are updated on every fetch.
+    Raises requests.exceptions.RequestException on network or HTTP errors.
+    """
+    validator = db.query(PageValidator).filter(PageValidator.url == url).first()
+
+    headers = {"User-Agent": USER_AGENT}
+    if validator and validator.content_hash:
+        if validator.etag:
+            headers["If-None-Match"] = validator.etag
+        if validator.last_modified:
+            headers["If-Modified-Since"] = validator.last_modified
+
+    fetch_stats.record("conditional_requests")
+    response = requests.get(url, headers=headers, timeout=timeout)
+    now = datetime.now()
+
+    if response.status_code == 304 and validator and validator.content_hash:
+        fetch_stats.record("not_modified")
+        validator.checked_at = now
+        db.commit()
+        logging.info(f"{url} not modified since {validator.changed_at}")
+        return {
+            "url": url, "html": None, "content_hash": validator.content_hash, "changed": False,
+            "stored_key": validator.stored_key,
+        }
+    if response.status_code == 304:
+        # Nothing stored to compare with, so a 304 (e.g. from a cache on the way) says nothing: ask for the page itself
+        fetch_stats.record("conditional_requests")
+        response = requests.get(url, headers={"User-Agent": USER_AGENT, "Cache-Control": "no-cache"}, timeout=timeout)
+        if response.status_code == 304:
+            raise requests.HTTPError(f"304 Not Modified for {url} without validators to compare with", response=response)
+
+    response.raise_for_status()
+    html = response.text
+    page_hash = content_hash(html)
+    changed = not validator or validator.content_hash != page_hash
+
+    if not validator:
+        validator = PageValidator(url=url)
+        db.add(validator)
+    validator.etag = response.headers.get("ETag")
+    validator.last_modified = response.headers.get("Last-Modified")
+    content_length = response.headers.get("Content-Length")
+    validator.content_length = int(content_length) if content_length and content_length.isdigit() else len(response.content)
+    validator.content_hash = page_hash
+    validator.checked_at = now
+    if changed:
+        validator.changed_at = now
+    db.commit()
+
+    fetch_stats.record("changed" if changed else "unchanged_body")
+    logging.info(f"Fetched {url} ({len(html)} characters, {'changed' if changed else 'unchanged'})")
+    return {"url": url, "html": html, "content_hash": page_hash, "changed": changed, "stored_key": validator.stored_key}
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(order: str, values: list) -> str:
+    """Encode the sort key of the last row of a page into an opaque cursor token."""
+    payload = {"o": order, "v": [v.isoformat() if isinstance(v, datetime) else v for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, order: str, types: List[type]) -> list:
+    """
+    Decode a cursor produced by encode_cursor for the given order.
+
+    Raises ValueError if the token is malformed or was issued for another order.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = payload["v"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if payload.get("o") != order or len(values) != len(types):
+        raise ValueError("Cursor does not match the requested order")
+    try:
+        return [
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(values, types)
+        ]
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def after(columns, values):
+    """Expand (c1, c2, ...) > (v1, v2, ...) into OR/AND terms that every database can
+    match against a composite index on the same columns."""
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal_prefix, column > values[i]))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, cursor_values: Optional[list], limit: int, offset: int = 0):
+    """
+    Return one page of `query` ordered by `columns` (which must end with a unique
+    column) starting after `cursor_values`, plus the sort key of the last row when
+    there is a next page. Cost does not depend on how deep the page is, unless the
+    legacy `offset` is used.
+    """
+    if cursor_values is not None:
+        query = query.filter(after(columns, cursor_values))
+    query = query.order_by(*columns)
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+
+    next_values = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_values = [getattr(last, column.key) for column in columns]
+    return rows, next_values
@@ -1,8 +1,9 @@
 from enum import Enum
-from datetime import datetime
-import uuid
 from typing import Dict, Optional
 import logging
+import os
+import threading
+from .rate_limiter import RateLimiter
 
 class JobStatus(Enum):
     PENDING = "pending"
@@ -10,62 +11,55 @@ class JobStatus(Enum):
     COMPLETED = "completed"
     FAILED = "failed"
 
+# Default "<limit>/<seconds>" per upstream API, overridable with RATE_LIMIT_<UPSTREAM>
+DEFAULT_RATE_LIMITS = {
+    "huggingface": "3/60",
+    "openai": "500/60",
+    "stub": "600/60",
+}
+
 class QueueManager:
-    def __init__(self):
-        self.jobs: Dict[str, Dict] = {}
-        self.last_request_times = []  # Store timestamps of last 3 requests
+    """
+    Rate limiters for the upstream APIs, one per upstream. Jobs themselves live in app.job_queue.
+
+    Each limit is read from RATE_LIMIT_<UPSTREAM> (e.g. RATE_LIMIT_HUGGINGFACE=3/60)
+    and RATE_LIMIT_<UPSTREAM>_BURST, falling back to DEFAULT_RATE_LIMITS.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, str]] = None):
+        self.limits = {**DEFAULT_RATE_LIMITS, **(limits or {})}
+        self.limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
         self.logger = logging.getLogger(__name__)
-        
-    def can_make_request(self) -> bool:
-        """Check if we can make a new request based on rate limits"""
-        now = datetime.now()
-        # Remove timestamps older than 1 minute
-        self.last_request_times = [t for t in self.last_request_times 
-                                 if (now - t).total_seconds() < 60]
-        
-        # If we have less than 3 requests in the last minute, we can proceed
-        return len(self.last_request_times) < 3
 
-    def record_request(self):
-        """Record a new request timestamp"""
-        self.last_request_times.append(datetime.now())
-        self.logger.info(f"Recorded new request. Total requests in last minute: {len(self.last_request_times)}")
+    def is_limited(self, upstream: str) -> bool:
+        return upstream in self.limits or f"RATE_LIMIT_{upstream.upper()}" in os.environ
+
+    def limiter(self, upstream: str) -> RateLimiter:
+        """Return the rate limiter of `upstream`, creating it on first use."""
+        with self._lock:
+            if upstream not in self.limiters:
+                env_name = f"RATE_LIMIT_{upstream.upper()}"
+                spec = os.getenv(env_name, self.limits.get(upstream))
+                if spec is None:
+                    raise KeyError(f"No rate limit configured for upstream '{upstream}'")
+                burst = int(os.getenv(f"{env_name}_BURST", 1))
+                self.limiters[upstream] = RateLimiter.from_spec(spec, burst=burst, name=upstream)
+                self.logger.info(f"Rate limit for {upstream}: {spec} (burst {burst})")
+            return self.limiters[upstream]
+
+    async def acquire(self, upstream: str):
+        """Wait for a request slot on `upstream`."""
+        await self.limiter(upstream).acquire()
 
-    def time_until_next_available(self) -> float:
-        """Calculate seconds until next request slot is available"""
-        if len(self.last_request_times) < 3:
-            return 0
-        
-        oldest_request = min(self.last_request_times)
-        seconds_since_oldest = (datetime.now() - oldest_request).total_seconds()
-        return max(60 - seconds_since_oldest, 0)
+    def acquire_blocking(self, upstream: str):
+        """Blocking version of acquire() for worker threads."""
+        self.limiter(upstream).acquire_blocking()
 
-    def create_job(self, scholarship_id: int) -> str:
-        job_id = str(uuid.uuid4())
-        self.jobs[job_id] = {
-            "scholarship_id": scholarship_id,
-            "status": JobStatus.PENDING,
-            "created_at": datetime.now(),
-            "completed_at": None,
-            "error": None,
-            "image_path": None
-        }
-        self.logger.info(f"Created new job {job_id} for scholarship {scholarship_id}")
-        return job_id
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = list(self.limiters.values())
+        return {limiter.name: limiter.snapshot() for limiter in limiters}
 
-    def update_job(self, job_id: str, status: JobStatus, image_path: Optional[str] = None, error: Optional[str] = None):
-        if job_id in self.jobs:
-            self.jobs[job_id]["status"] = status
-            if status in [JobStatus.COMPLETED, JobStatus.FAILED]:
-                self.jobs[job_id]["completed_at"] = datetime.now()
-            if image_path:
-                self.jobs[job_id]["image_path"] = image_path
-            if error:
-                self.jobs[job_id]["error"] = error
-            
-            self.logger.info(f"Updated job {job_id} - Status: {status.value}, Error: {error}, Image: {image_path}")
 
-    def get_job_status(self, job_id: str) -> Optional[Dict]:
-        status = self.jobs.get(job_id)
-        self.logger.debug(f"Retrieved status for job {job_id}: {status}")
-        return status 
\ No newline at end of file
+queue_manager = QueueManager()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    GCRA (generic cell rate algorithm) limiter: `limit` requests per `period` seconds,
+    with up to `burst` requests allowed back to back.
+
+    The whole state is one timestamp, the theoretical arrival time of the next
+    request. acquire() reserves the next free slot under a lock in O(1) and then
+    sleeps until that slot, without polling. Async callers also wait for the caller
+    before them to be released, so they wake in the order they called even when
+    their slots are microseconds apart. The same limiter can be used from asyncio
+    code (acquire) and from threads (acquire_blocking).
+    """
+
+    def __init__(self, limit: int, period: float, burst: int = 1, name: str = "default"):
+        if limit <= 0 or period <= 0 or burst <= 0:
+            raise ValueError("limit, period and burst must be positive")
+        self.name = name
+        self.limit = limit
+        self.period = period
+        self.burst = burst
+        self.interval = period / limit
+        self.tolerance = self.interval * (burst - 1)
+        self.stats = {"acquired": 0, "waited": 0, "cancelled": 0}
+        self._tat = 0.0
+        self._last_turn = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_spec(cls, spec: str, burst: int = 1, name: str = "default") -> "RateLimiter":
+        """Build a limiter from a "<limit>/<seconds>" string, e.g. "3/60"."""
+        try:
+            limit, period = spec.split("/")
+            return cls(int(limit), float(period), burst=burst, name=name)
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{spec}', expected '<limit>/<seconds>'")
+
+    def _reserve(self, now: float, turn=None):
+        """
+        Reserve the next slot. Returns the seconds to wait, the reservation's tat, and
+        the turn future of the previous async caller (when `turn` is given).
+        """
+        with self._lock:
+            tat = max(self._tat, now)
+            self._tat = tat + self.interval
+            self.stats["acquired"] += 1
+            wait = tat - self.tolerance - now
+            if wait > 0:
+                self.stats["waited"] += 1
+            previous = None
+            if turn is not None:
+                previous, self._last_turn = self._last_turn, turn
+            return max(wait, 0.0), self._tat, previous
+
+    def _release(self, reserved_tat: float):
+        """Give back a slot that was reserved but not used, if no later caller depends on it."""
+        with self._lock:
+            self.stats["cancelled"] += 1
+            if self._tat == reserved_tat:
+                self._tat -= self.interval
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now."""
+        now = time.monotonic()
+        with self._lock:
+            tat = max(self._tat, now)
+            if tat - self.tolerance > now:
+                return False
+            self._tat = tat + self.interval
+            self.stats["acquired"] += 1
+            return True
+
+    async def acquire(self):
+        """Wait for a slot. Callers are released in FIFO order."""
+        loop = asyncio.get_running_loop()
+        turn = loop.create_future()
+        wait, reserved_tat, previous = self._reserve(time.monotonic(), turn)
+        try:
+            if wait > 0:
+                self.logger.debug(f"Rate limit for {self.name} reached, waiting {wait:.2f}s")
+                await asyncio.sleep(wait)
+            if previous is not None and not previous.done() and previous.get_loop() is loop:
+                await asyncio.shield(previous)
+        except asyncio.CancelledError:
+            self._release(reserved_tat)
+            raise
+        finally:
+            turn.set_result(None)
+
+    def acquire_blocking(self):
+        """Blocking version of acquire() for worker threads."""
+        wait, _, _ = self._reserve(time.monotonic())
+        if wait > 0:
+            self.logger.debug(f"Rate limit for {self.name} reached, waiting {wait:.2f}s")
+            time.sleep(wait)
+
+    def time_until_available(self) -> float:
+        """Seconds until a new caller would get a slot."""
+        with self._lock:
+            return max(self._tat - self.tolerance - time.monotonic(), 0.0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "limit": f"{self.limit}/{self.period:g}s",
+                "burst": self.burst,
+                "seconds_until_available": round(max(self._tat - self.tolerance - time.monotonic(), 0.0), 3),
+                **self.stats,
+            }
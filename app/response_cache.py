@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from .cache_backends import CacheBackend, create_backend
+
+
+class CachedResponse:
+    """Serialized JSON body of an endpoint response, with its ETag and extra headers."""
+
+    def __init__(self, body: bytes, headers: Optional[Dict[str, str]] = None, etag: Optional[str] = None):
+        self.body = body
+        self.etag = etag or '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.headers = headers or {}
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Check an If-None-Match request header against this response's ETag."""
+        if not if_none_match:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == self.etag for tag in candidates)
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of serialized API responses on a pluggable CacheBackend.
+
+    Every entry is tagged with the rows it depends on: list responses with
+    "<namespace>:list" and detail responses with "<namespace>:<id>". Each tag has a
+    generation counter in the backend; writes bump the counters of the tags they
+    make stale, and an entry stored under older generations is treated as a miss.
+    Because the counters live in the backend, an invalidation in one worker is seen
+    by all workers sharing it. A counter found missing (a new tag, or one lost with
+    a Redis server's data) is created at the current time in microseconds rather
+    than 0, so entries stored under an earlier value of it can never match again.
+
+    Invalidated tags are also marked as written for RESPONSE_CACHE_WRITE_WINDOW
+    seconds (default 10): a response built in that window should be read from the
+    primary database, since a read replica may not have the write yet and the
+    stale body would be cached until the next write.
+
+    The cache fails open: when the backend cannot be reached, lookups are misses
+    and writes are skipped, and the errors are logged and counted.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl_seconds: Optional[float] = None):
+        self.backend = backend or create_backend(
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+        )
+        self.ttl = ttl_seconds or float(os.getenv("RESPONSE_CACHE_TTL", 300))
+        self.write_window = float(os.getenv("RESPONSE_CACHE_WRITE_WINDOW", 10))
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def make_key(path: str, params: Iterable) -> str:
+        """Build a cache key from the request path and its sorted query parameters."""
+        query = "&".join(f"{name}={value}" for name, value in sorted(params))
+        return f"{path}?{query}"
+
+    @staticmethod
+    def _expand(tags: Iterable[str]) -> List[str]:
+        """Add the namespace-wide tag ("<namespace>:*") to the entry's own tags."""
+        expanded = []
+        for tag in tags:
+            namespace_tag = tag.split(":", 1)[0] + ":*"
+            if namespace_tag not in expanded:
+                expanded.append(namespace_tag)
+            expanded.append(tag)
+        return expanded
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _error(self, action: str, error: Exception):
+        with self._lock:
+            self.errors += 1
+        self.logger.warning(f"Response cache {action} failed, continuing without the cache: {error!r}")
+
+    def get(self, key: str, tags: Iterable[str]) -> Tuple[Optional[CachedResponse], Optional[Dict[str, int]], bool]:
+        """
+        Look up `key` and read the current generations of its tags in one round trip.
+
+        Returns the cached response (None on a miss or a stale entry), the
+        generations to pass to set() when storing a freshly built response (None
+        when the backend failed) and whether one of the tags was written within
+        the write window, in which case the response should be built from the primary.
+        """
+        tags = self._expand(tags)
+        try:
+            values = self.backend.get_many(
+                [f"response:{key}"] + [f"generation:{tag}" for tag in tags] + [f"written:{tag}" for tag in tags]
+            )
+            recently_written = any(value is not None for value in values[1 + len(tags):])
+            generations = {}
+            for tag, value in zip(tags, values[1:1 + len(tags)]):
+                if value is None:
+                    value = self.backend.incr(f"generation:{tag}", time.time_ns() // 1000)
+                generations[tag] = int(value)
+        except Exception as e:
+            self._error("lookup", e)
+            self._count(hit=False)
+            return None, None, True
+
+        raw = values[0]
+        if raw is not None:
+            header, body = raw.split(b"\n", 1)
+            meta = json.loads(header)
+            if meta["generations"] == generations:
+                self._count(hit=True)
+                return CachedResponse(body, meta["headers"], meta["etag"]), generations, recently_written
+
+        self._count(hit=False)
+        return None, generations, recently_written
+
+    def set(self, key: str, response: CachedResponse, generations: Optional[Dict[str, int]]) -> CachedResponse:
+        """Store a response built after get(); skipped when the lookup failed."""
+        if generations is None:
+            return response
+        meta = {"etag": response.etag, "headers": response.headers, "generations": generations}
+        try:
+            self.backend.set(f"response:{key}", json.dumps(meta).encode() + b"\n" + response.body, self.ttl)
+        except Exception as e:
+            self._error("write", e)
+        return response
+
+    def invalidate(self, namespace: str, ids: Optional[Iterable[int]] = None):
+        """
+        Mark the entries of `namespace` made stale by a write.
+
+        List entries are always invalidated. With `ids`, the detail entries of those
+        rows are invalidated as well; with ids=None (e.g. a bulk delete) every entry
+        of the namespace goes.
+        """
+        if ids is None:
+            tags = [f"{namespace}:*"]
+        else:
+            tags = [f"{namespace}:list"] + [f"{namespace}:{entity_id}" for entity_id in ids]
+        for tag in tags:
+            try:
+                self.backend.incr(f"generation:{tag}")
+                if self.write_window:
+                    self.backend.set(f"written:{tag}", b"1", self.write_window)
+            except Exception as e:
+                # Entries of this tag may be served until they expire (RESPONSE_CACHE_TTL)
+                self._error(f"invalidation of {tag}", e)
+        self.logger.debug(f"Invalidated cached responses for {', '.join(tags)}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"backend": type(self.backend).__name__, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,229 @@
+import asyncio
+import logging
+import os
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import ScrapeSource
+from .orchestrator import ScrapeOrchestrator
+
+# Interval changes after a run: shorter when it found new items, longer when the page had not changed
+SHRINK_FACTOR = 0.5
+GROW_FACTOR = 1.5
+
+
+class ScrapeScheduler:
+    """
+    Scrapes the sources of the `scrape_sources` registry when they are due.
+
+    Every source has its own refresh interval, adapted after each run: halved when
+    the run found new items, grown by half when the page had not changed, and kept
+    when the page changed without new items. It stays between SCRAPE_MIN_INTERVAL
+    and SCRAPE_MAX_INTERVAL seconds (default 1 hour and 7 days); new sources start
+    at SCRAPE_DEFAULT_INTERVAL (default 6 hours). A failed run is retried after
+    SCRAPE_FAILURE_BACKOFF seconds (default 600), doubled per consecutive failure
+    and capped at the maximum interval.
+
+    Every SCRAPE_SCHEDULER_TICK seconds (default 60) the due sources are claimed,
+    by moving their next run SCRAPE_CLAIM_SECONDS (default 3600) ahead with a
+    conditional update, so API processes sharing the database never scrape the
+    same source twice, and then scraped through the orchestrator.
+    """
+
+    def __init__(
+        self,
+        orchestrator: ScrapeOrchestrator,
+        scrapers: Dict[str, Callable],
+        seeds: Optional[Dict[str, Iterable[str]]] = None,
+        session_factory=SessionLocal,
+    ):
+        self.orchestrator = orchestrator
+        self.scrapers = scrapers
+        self.seeds = seeds or {}
+        self.session_factory = session_factory
+        self.enabled = os.getenv("SCRAPE_SCHEDULER_ENABLED", "1") == "1"
+        self.tick = float(os.getenv("SCRAPE_SCHEDULER_TICK", 60))
+        self.default_interval = int(os.getenv("SCRAPE_DEFAULT_INTERVAL", 6 * 3600))
+        self.min_interval = int(os.getenv("SCRAPE_MIN_INTERVAL", 3600))
+        self.max_interval = int(os.getenv("SCRAPE_MAX_INTERVAL", 7 * 24 * 3600))
+        self.failure_backoff = int(os.getenv("SCRAPE_FAILURE_BACKOFF", 600))
+        self.claim_seconds = int(os.getenv("SCRAPE_CLAIM_SECONDS", 3600))
+        self.runs = 0
+        self.sources_scraped = 0
+        self._seeded = False
+        self._task = None
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, db: Session, url: str, kind: str, refresh_interval: Optional[int] = None) -> ScrapeSource:
+        """Add a source, due right away, or return the registered one with that URL."""
+        source = db.query(ScrapeSource).filter(ScrapeSource.url == url).first()
+        if source:
+            return source
+        now = datetime.now()
+        source = ScrapeSource(
+            url=url,
+            kind=kind,
+            enabled=True,
+            refresh_interval=self._clamp(refresh_interval or self.default_interval),
+            next_run_at=now,
+            consecutive_failures=0,
+            runs=0,
+            created_at=now,
+        )
+        db.add(source)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Registered by another process meanwhile
+            db.rollback()
+            source = db.query(ScrapeSource).filter(ScrapeSource.url == url).one()
+        return source
+
+    def register_seeds(self):
+        """Register the sources given at start-up that are not in the registry yet."""
+        if self._seeded:
+            return
+        db = self.session_factory()
+        try:
+            for kind, urls in self.seeds.items():
+                for url in urls:
+                    self.register(db, url, kind)
+        finally:
+            db.close()
+        self._seeded = True
+
+    def _clamp(self, interval: float) -> int:
+        return int(min(max(interval, self.min_interval), self.max_interval))
+
+    def claim(self, db: Session, kind: Optional[str] = None, force: bool = False) -> Dict[str, List[str]]:
+        """
+        Claim the enabled sources that are due (all of them with `force`), by URL per kind.
+
+        The claim moves a source's next run ahead only if no other process changed
+        it since it was read, so each source is claimed once.
+        """
+        now = datetime.now()
+        query = db.query(ScrapeSource.id, ScrapeSource.url, ScrapeSource.kind, ScrapeSource.next_run_at).filter(
+            ScrapeSource.enabled == True
+        )
+        if kind:
+            query = query.filter(ScrapeSource.kind == kind)
+        if not force:
+            query = query.filter(ScrapeSource.next_run_at <= now)
+        rows = query.order_by(ScrapeSource.next_run_at).all()
+
+        claimed = defaultdict(list)
+        for id, url, source_kind, next_run_at in rows:
+            updated = (
+                db.query(ScrapeSource)
+                .filter(ScrapeSource.id == id, ScrapeSource.next_run_at == next_run_at)
+                .update(
+                    {
+                        ScrapeSource.next_run_at: now + timedelta(seconds=self.claim_seconds),
+                        ScrapeSource.last_run_at: now,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                claimed[source_kind].append(url)
+        db.commit()
+        return dict(claimed)
+
+    def record(self, db: Session, report: dict):
+        """Reschedule the sources of a run report from the outcome of each one."""
+        now = datetime.now()
+        sites = {site["site"]: site for site in report["sites"]}
+        for source in db.query(ScrapeSource).filter(ScrapeSource.url.in_(list(sites))).all():
+            site = sites[source.url]
+            if site["status"] == "skipped":
+                # Left out by the run budget: due again on the next tick
+                source.next_run_at = now
+                continue
+
+            source.runs += 1
+            if site["status"] == "failed":
+                source.consecutive_failures += 1
+                source.last_error = site["error"]
+                backoff = self.failure_backoff * 2 ** (source.consecutive_failures - 1)
+                delay = min(backoff, self.max_interval)
+            else:
+                source.consecutive_failures = 0
+                source.last_error = None
+                source.last_success_at = now
+                if site["inserted"]:
+                    source.last_change_at = now
+                    source.refresh_interval = self._clamp(source.refresh_interval * SHRINK_FACTOR)
+                elif site["unchanged"]:
+                    source.refresh_interval = self._clamp(source.refresh_interval * GROW_FACTOR)
+                delay = source.refresh_interval
+            # Spread sources added together so they do not stay due at the same tick
+            source.next_run_at = now + timedelta(seconds=delay * random.uniform(0.95, 1.05))
+        db.commit()
+
+    async def run(self, kind: Optional[str] = None, force: bool = False) -> List[dict]:
+        """Scrape the due sources (every enabled source with `force`) and return the run reports."""
+        await asyncio.to_thread(self.register_seeds)
+        db = self.session_factory()
+        try:
+            claimed = await asyncio.to_thread(self.claim, db, kind, force)
+        finally:
+            db.close()
+
+        reports = []
+        for source_kind, urls in claimed.items():
+            report = await self.orchestrator.run(urls, self.scrapers[source_kind], kind=source_kind)
+            db = self.session_factory()
+            try:
+                await asyncio.to_thread(self.record, db, report)
+            finally:
+                db.close()
+            self.runs += 1
+            self.sources_scraped += report["sites_attempted"]
+            reports.append(report)
+        return reports
+
+    def start(self):
+        if not self.enabled:
+            self.logger.info("Scrape scheduler disabled (SCRAPE_SCHEDULER_ENABLED=0)")
+            return
+        self._task = asyncio.create_task(self._loop())
+        self.logger.info(f"Scrape scheduler started, checking for due sources every {self.tick:.0f}s")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run()
+            except Exception as e:
+                self.logger.error(f"Scheduled scrape failed: {str(e)}")
+            await asyncio.sleep(self.tick)
+
+    def stats(self, db: Session) -> dict:
+        now = datetime.now()
+        sources, due, failing, next_run_at = db.query(
+            func.count(ScrapeSource.id),
+            func.coalesce(func.sum(case((ScrapeSource.next_run_at <= now, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((ScrapeSource.consecutive_failures > 0, 1), else_=0)), 0),
+            func.min(ScrapeSource.next_run_at),
+        ).filter(ScrapeSource.enabled == True).one()
+        return {
+            "enabled": self.enabled,
+            "sources": sources,
+            "due": int(due),
+            "failing": int(failing),
+            "next_run_at": next_run_at,
+            "runs_since_start": self.runs,
+            "sources_scraped_since_start": self.sources_scraped,
+        }
@@ -1,7 +1,25 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict, Union
 from datetime import datetime
 
+
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    url: str
+
+
+class ImageVariants(BaseModel):
+    """
+    Smaller, better compressed copies of `image_url`: a square thumbnail and one
+    image per width, in WebP. The static server answers with AVIF instead when the
+    client accepts it and `formats` lists it.
+    """
+    thumbnail: ImageVariant
+    sizes: List[ImageVariant]
+    formats: List[str]
+
+
 class ScholarshipBase(BaseModel):
     id: int
     program_title: str
@@ -10,6 +28,7 @@ class ScholarshipBase(BaseModel):
     deadline: Optional[datetime] = None
     requirements: Optional[List[str]] = None
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
     description: Optional[str] = None
     degree_level: Optional[str] = None
     times_updated: Optional[int] = 0
@@ -25,10 +44,54 @@ class NewsBase(BaseModel):
     body:Optional[str] = None
     published_at: Optional[datetime] = None
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
     source: Optional[str] = None
     url: Optional[str] = None
     category: str
     times_updated: Optional[int] = 0
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class FieldRule(BaseModel):
+    selector: Optional[str] = None
+    attr: Optional[str] = None
+    pattern: Optional[str] = None
+    many: bool = False
+    date_format: Optional[str] = None
+    value: Optional[str] = None
+
+
+class ExtractionRules(BaseModel):
+    item: str
+    fields: Dict[str, Union[str, FieldRule]]
+    min_items: int = 1
+
+
+class ScrapeSourceCreate(BaseModel):
+    url: str
+    kind: Literal["scholarships", "news"]
+    refresh_interval: Optional[int] = None
+    extraction_rules: Optional[ExtractionRules] = None
+
+
+class ScrapeSourceBase(BaseModel):
+    id: int
+    url: str
+    kind: str
+    enabled: bool
+    refresh_interval: int
+    next_run_at: datetime
+    last_run_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_change_at: Optional[datetime] = None
+    consecutive_failures: int = 0
+    last_error: Optional[str] = None
+    runs: int = 0
+    extraction_rules: Optional[dict] = None
+    rule_hits: int = 0
+    rule_fallbacks: int = 0
+    last_fallback_reason: Optional[str] = None
+
+    class Config:
+        from_attributes = True
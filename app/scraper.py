@@ -1,5 +1,4 @@
 import time
-from datetime import datetime
 import random
 from requests.exceptions import RequestException
 from scrapegraphai.graphs import SmartScraperGraph
@@ -7,7 +6,16 @@ import logging
 import os
 from dotenv import load_dotenv
 from sqlalchemy.orm import Session
-from .models import Scholarship, News
+from .models import PageValidator, Scholarship, News
+from .ingestion import bulk_insert_scholarships, bulk_insert_news
+from .page_fetcher import conditional_fetch, fetch_stats
+from .html_reducer import reduce_for_extraction
+from .extraction_rules import rule_engine
+from .extraction_cache import extraction_cache
+from .browser_pool import browser_pool
+from .response_cache import response_cache
+from .search import search_index
+from .queue_manager import queue_manager
 
 # Load environment variables
 load_dotenv()
@@ -25,16 +33,111 @@ logging.basicConfig(
     ]
 )
 
-def parse_date(date_str):
+def run_smart_scraper(prompt, source, graph_config, db: Session, kind=None):
+    """
+    Run a SmartScraperGraph extraction behind a conditional HTTP fetch.
+
+    The page is first fetched with a cheap conditional GET. When the page content,
+    prompt and model match a cached extraction, the cached result is returned and
+    no browser is launched. Returns a (data, unchanged, extraction) tuple. Callers
+    pass `extraction` to save_extraction once they have committed what they stored
+    from the data: only then is the result cached and, for the listing of `kind`,
+    the page marked as stored in its page validator. `unchanged` is True (and data
+    None) when that listing was stored from the same page content with the same
+    prompt and model, so callers can skip storing it again; an extraction whose
+    storing failed is extracted and stored again on the next run.
+
+    On a cache miss, when `prompt` is the listing prompt of `kind` ('scholarships'
+    or 'news'), a source registered with extraction rules for that kind (see
+    extraction_rules) is extracted from the fetched page with its selectors; other
+    prompts, such as those of fetch_null_fields and fetch_body, pass no kind and
+    never get the listing the rules extract. Otherwise, or when the rules fail, the
+    page is rendered on a pooled browser, so no browser is started per URL, and
+    reduced to compact text (see html_reducer) before it is handed to
+    SmartScraperGraph.
+    """
+    model = graph_config["llm"]["model"]
+    extraction = {"url": source, "kind": kind, "cache_key": None, "result": None, "cached": False}
+    page_html = None
     try:
-        # Parse the string date in 'YYYY-MM-DD' format to a datetime object
-        return datetime.strptime(date_str, "%Y-%m-%d").date()  # Converts to YYYY-MM-DD format
-    except ValueError as e:
-        logging.error(f"Date parsing error: {e}")
-        return None
+        page = conditional_fetch(db, source)
+        extraction["cache_key"] = extraction_cache.make_key(source, page["content_hash"], prompt, model)
+        if kind and extraction["cache_key"] == page["stored_key"]:
+            fetch_stats.record("browser_launches_skipped")
+            return None, True, extraction
+        cached = extraction_cache.get(db, extraction["cache_key"])
+        if cached is not None:
+            fetch_stats.record("browser_launches_skipped")
+            extraction.update(result=cached, cached=True)
+            return cached, False, extraction
+        page_html = page["html"]
+    except RequestException as e:
+        logging.warning(f"Conditional fetch of {source} failed, falling back to the browser: {e}")
+
+    # Sources with selector rules are extracted from the fetched page without a browser or the LLM
+    rules_source = rule_engine.rules_for(db, source, kind) if page_html and kind else None
+    if rules_source is not None:
+        result = rule_engine.extract(db, rules_source, page_html)
+        if result is not None:
+            fetch_stats.record("browser_launches_skipped")
+            extraction["result"] = result
+            return result, False, extraction
+
+    fetch_stats.record("browser_launches")
+    graph_source = source
+    if browser_pool.enabled:
+        try:
+            graph_source = browser_pool.render(source)
+        except Exception as e:
+            logging.warning(f"Pooled browser could not render {source}, falling back to a fresh browser: {e}")
+    if graph_source != source:
+        graph_source = reduce_for_extraction(graph_source, base_url=source)
+
+    # Model names look like "<provider>/<model>"; the provider's rate limit applies
+    provider = model.split("/", 1)[0]
+    if queue_manager.is_limited(provider):
+        queue_manager.acquire_blocking(provider)
+    result = SmartScraperGraph(prompt=prompt, source=graph_source, config=graph_config).run()
+    extraction["result"] = result
+    return result, False, extraction
+
+
+def save_extraction(db: Session, extraction):
+    """
+    Cache the result of a run_smart_scraper extraction whose data the caller has
+    committed and, for a listing, mark its page as stored.
+    """
+    if not extraction["cache_key"] or not extraction["result"]:
+        return
+    if not extraction["cached"]:
+        extraction_cache.put(db, extraction["cache_key"], extraction["url"], extraction["result"])
+    if extraction["kind"]:
+        db.query(PageValidator).filter(PageValidator.url == extraction["url"]).update(
+            {PageValidator.stored_key: extraction["cache_key"]}, synchronize_session=False
+        )
+        db.commit()
+
+
+def new_scrape_result(site):
+    """Create the per-site result returned by scrape_site and scrape_news_site."""
+    return {
+        "site": site,
+        "extracted": 0,
+        "inserted": 0,
+        "timings": {},
+        "unchanged": False,
+        "error": None,
+    }
+
 
 def scrape_site(site, db: Session, retries=1):
-    """Scrape the given site and save the result to the database."""
+    """
+    Scrape the given site and save the result to the database.
+
+    Returns a result dict with the number of extracted and inserted items,
+    the time spent per stage and the last error, if any.
+    """
+    result = new_scrape_result(site)
     for attempt in range(retries):
         try:
             logging.info(f"Starting scraping process for {site} (Attempt {attempt + 1})")
@@ -51,31 +154,34 @@ def scrape_site(site, db: Session, retries=1):
                 "browser_type": "playwright"
             }
 
-            # Create the SmartScraperGraph instance
-            smart_scraper_graph = SmartScraperGraph(
-                prompt=(
-                    "Extract all scholarships available from the given site with their details, "
-                    "including Program title, Managed/Funded by (optional), Degree level, URL, Deadline, and Requirements (optional). "
-                    "Strictly reply only with a valid JSON list containing all scholarships on the page. "
-                    "Each JSON object should have the following structure: "
-                    "[{ "
-                    "\"program_title\": \"string\", "
-                    "\"funded_by\": \"string\", "
-                    "\"degree_level\": \"string\", "
-                    "\"url\": \"string\", "
-                    "\"deadline\": \"YYYY-MM-DD\", "
-                    "\"requirements\": [\"string1\", \"string2\", ...] "
-                    "}, ...]. "
-                    "Ensure that the 'degree_level' is either 'bachelor', 'master', or 'doctorate'. "
-                    "Include all scholarships on the page, and do not return only the first one. "
-                    "Do not add any extra text, explanations, or comments."
-                ),
-                source=site,
-                config=graph_config
+            prompt = (
+                "Extract all scholarships available from the given site with their details, "
+                "including Program title, Managed/Funded by (optional), Degree level, URL, Deadline, and Requirements (optional). "
+                "Strictly reply only with a valid JSON list containing all scholarships on the page. "
+                "Each JSON object should have the following structure: "
+                "[{ "
+                "\"program_title\": \"string\", "
+                "\"funded_by\": \"string\", "
+                "\"degree_level\": \"string\", "
+                "\"url\": \"string\", "
+                "\"deadline\": \"YYYY-MM-DD\", "
+                "\"requirements\": [\"string1\", \"string2\", ...] "
+                "}, ...]. "
+                "Ensure that the 'degree_level' is either 'bachelor', 'master', or 'doctorate'. "
+                "Include all scholarships on the page, and do not return only the first one. "
+                "Do not add any extra text, explanations, or comments."
             )
 
             # Run the scraping pipeline
-            scholarships_data = smart_scraper_graph.run()
+            started = time.perf_counter()
+            scholarships_data, unchanged, extraction = run_smart_scraper(prompt, site, graph_config, db, kind="scholarships")
+            result["timings"]["extract"] = time.perf_counter() - started
+
+            if unchanged:
+                logging.info(f"{site} has not changed since the last run, skipping")
+                result["unchanged"] = True
+                result["error"] = None
+                break
 
             logging.info(f"Raw scraped data: {scholarships_data}")
 
@@ -88,55 +194,40 @@ def scrape_site(site, db: Session, retries=1):
 
             logging.info(f"Normalized scholarships data: {scholarships_data}")
 
-            # Save data to the database
-            for scholarship in scholarships_data:
-                if not isinstance(scholarship, dict):
-                    logging.error(f"Invalid scholarship data format: {scholarship}")
-                    continue
-
-                # Check for duplicate scholarships
-                existing_scholarship = db.query(Scholarship).filter(
-                    Scholarship.program_title == scholarship.get('program_title')
-                ).first()
-
-                if not existing_scholarship:
-                    degree_level = scholarship.get('degree_level', None)  # If degree_level is missing or empty, set it to None
-
-                    # Ensure 'degree_level' is valid before inserting
-                    if degree_level not in ['bachelor', 'master', 'doctorate', None]:  # Accept 'None' as a valid value
-                        logging.warning(f"Invalid degree_level value '{degree_level}' for scholarship {scholarship.get('program_title')}")
-                        degree_level = None  # Set to None if invalid
-
-                    # Create a new Scholarship entry
-                    new_scholarship = Scholarship(
-                        program_title=scholarship.get('program_title'),
-                        funded_by=scholarship.get('funded_by'),
-                        degree_level=degree_level,
-                        url=scholarship.get('url'),
-                        deadline=parse_date(scholarship.get('deadline')),
-                        requirements=scholarship.get('requirements')
-                    )
-
-                    db.add(new_scholarship)
-                    logging.info(f"Added scholarship: {new_scholarship.program_title} from {site}")
-                else:
-                    logging.info(f"Scholarship already exists: {existing_scholarship.program_title} from {site}")
+            # Save data to the database in batches
+            started = time.perf_counter()
+            result["extracted"] = len(scholarships_data)
+            inserted = bulk_insert_scholarships(db, scholarships_data, site)
+            result["inserted"] = len(inserted)
 
             # Commit the transaction
             db.commit()
+            save_extraction(db, extraction)
+            if result["inserted"]:
+                response_cache.invalidate("scholarships", [])
+                search_index.refresh(db, Scholarship, inserted)
+            result["timings"]["store"] = time.perf_counter() - started
+            result["error"] = None
             logging.info(f"Successfully scraped and saved data from {site}")
+            break
 
         except RequestException as e:
             logging.error(f"Request error while scraping {site} on attempt {attempt + 1}: {e}")
+            result["error"] = str(e)
             time.sleep(random.uniform(1, 3))  # Delay before retry
 
         except Exception as e:
             logging.error(f"General error occurred while scraping {site}: {e}")
+            db.rollback()
+            result["error"] = str(e)
             break
 
+    return result
+
 
 def scrape_news_site(site, db: Session, retries=1):
-    """Scrape the given news site and save the result to the database."""
+    """Scrape the given news site and save the result to the database, returning a result dict."""
+    result = new_scrape_result(site)
     for attempt in range(retries):
         try:
             logging.info(f"Starting scraping process for {site} (Attempt {attempt+1})")
@@ -153,21 +244,24 @@ def scrape_news_site(site, db: Session, retries=1):
                 "browser_type": "playwright"
             }
 
-            # Create the SmartScraperGraph instance
-            smart_scraper_graph = SmartScraperGraph(
-                prompt=(
-                    "Extract all news articles from the given news site, including the title, description, published date, source, URL, and category. "
-                    "Respond strictly in a valid list of JSON objects with the following structure: "
-                    "[{ \"title\": \"string\", \"description\": \"string\", \"published_at\": \"YYYY-MM-DD\", \"source\": \"string\", \"url\": \"string\", \"category\": \"string\" }, ...]. "
-                    "Ensure that all articles on the page are included, and do not limit the response to just one article. "
-                    "Each JSON object must correspond to a unique article on the page."
-                ),
-                source=site,
-                config=graph_config
+            prompt = (
+                "Extract all news articles from the given news site, including the title, description, published date, source, URL, and category. "
+                "Respond strictly in a valid list of JSON objects with the following structure: "
+                "[{ \"title\": \"string\", \"description\": \"string\", \"published_at\": \"YYYY-MM-DD\", \"source\": \"string\", \"url\": \"string\", \"category\": \"string\" }, ...]. "
+                "Ensure that all articles on the page are included, and do not limit the response to just one article. "
+                "Each JSON object must correspond to a unique article on the page."
             )
 
             # Run the pipeline to scrape data
-            articles_data = smart_scraper_graph.run()
+            started = time.perf_counter()
+            articles_data, unchanged, extraction = run_smart_scraper(prompt, site, graph_config, db, kind="news")
+            result["timings"]["extract"] = time.perf_counter() - started
+
+            if unchanged:
+                logging.info(f"{site} has not changed since the last run, skipping")
+                result["unchanged"] = True
+                result["error"] = None
+                break
 
             logging.info(f"Scraped data: {articles_data}")
 
@@ -180,40 +274,35 @@ def scrape_news_site(site, db: Session, retries=1):
 
             # Process articles if the list is not empty
             if articles_data:
-                for article in articles_data:
-                    if not isinstance(article, dict):
-                        logging.error(f"Invalid article format: {article}. Skipping.")
-                        continue
-
-                    # Check for duplicate news articles
-                    existing_news = db.query(News).filter(News.title == article.get('title')).first()
-                    if not existing_news:
-                        news = News(
-                            title=article.get('title'),
-                            description=article.get('description'),
-                            published_at=parse_date(article.get('published_at')),
-                            source=article.get('source'),
-                            url=article.get('url'),
-                            category=article.get('category')
-                        )
-                        db.add(news)
-                        logging.info(f"Added news: {news.title} from {site}")
-                    else:
-                        logging.info(f"News already exists: {existing_news.title} from {site}")
-
+                started = time.perf_counter()
+                result["extracted"] = len(articles_data)
+                inserted = bulk_insert_news(db, articles_data, site)
+                result["inserted"] = len(inserted)
                 db.commit()
+                save_extraction(db, extraction)
+                if result["inserted"]:
+                    response_cache.invalidate("news", [])
+                    search_index.refresh(db, News, inserted)
+                result["timings"]["store"] = time.perf_counter() - started
                 logging.info(f"Successfully scraped and saved data from {site}")
             else:
                 logging.warning(f"No valid articles found from {site}.")
+            result["error"] = None
+            break
 
         except RequestException as e:
             logging.error(f"Request error while scraping {site} on attempt {attempt+1}: {e}")
+            result["error"] = str(e)
             time.sleep(random.uniform(1, 3))
 
         except Exception as e:
             logging.error(f"General error occurred while scraping {site}: {e}")
+            db.rollback()
+            result["error"] = str(e)
             break
 
+    return result
+
 def fetch_null_fields(url, db, scholarship_id, null_fields, retries=1):
     """
     Fetch the specified null fields from the given URL and save them to the database.
@@ -272,9 +361,8 @@ def fetch_null_fields(url, db, scholarship_id, null_fields, retries=1):
 
             logging.info(f"Fetching {', '.join(fields_to_extract)} data from {url} (Attempt {attempt + 1})")
 
-            # Create and run the SmartScraperGraph instance
-            smart_scraper_graph = SmartScraperGraph(prompt=prompt, source=url, config=graph_config)
-            description_data = smart_scraper_graph.run()
+            # Run the SmartScraperGraph extraction
+            description_data, _, extraction = run_smart_scraper(prompt, url, graph_config, db)
 
             # Extract data
             description = description_data.get("description", "").strip() if "description" in fields_to_extract else None
@@ -301,6 +389,9 @@ def fetch_null_fields(url, db, scholarship_id, null_fields, retries=1):
                     scholarship.times_updated += 1
 
                     db.commit()
+                    save_extraction(db, extraction)
+                    response_cache.invalidate("scholarships", [scholarship_id])
+                    search_index.refresh(db, Scholarship, [scholarship_id])
                     logging.info(f"Data saved for scholarship {scholarship_id}")
 
             return description_data
@@ -342,9 +433,8 @@ def fetch_body(url, db, news_id, retries=1):
 
             logging.info(f"Fetching data from {url} (Attempt {attempt + 1})")
 
-            # Create and run the SmartScraperGraph instance
-            smart_scraper_graph = SmartScraperGraph(prompt=prompt, source=url, config=graph_config)
-            body_data = smart_scraper_graph.run()
+            # Run the SmartScraperGraph extraction
+            body_data, _, extraction = run_smart_scraper(prompt, url, graph_config, db)
 
             # Extract data
             body = body_data.get("body", "").strip()
@@ -359,6 +449,9 @@ def fetch_body(url, db, news_id, retries=1):
                     news.times_updated += 1
                     
                     db.commit()
+                    save_extraction(db, extraction)
+                    response_cache.invalidate("news", [news_id])
+                    search_index.refresh(db, News, [news_id])
                     logging.info(f"Data saved for news article {news_id}")
 
             return body_data
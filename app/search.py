@@ -0,0 +1,395 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from .database import SessionLocal
+from .models import News, Scholarship
+
+# Columns read from each table to build its documents
+DOCUMENT_COLUMNS = {
+    Scholarship: ("id", "program_title", "funded_by", "description", "requirements", "url", "degree_level", "deadline"),
+    News: ("id", "title", "description", "body", "source", "url", "category", "published_at"),
+}
+KIND_BITS = {"scholarships": 0, "news": 1}
+# Title matches weigh more than matches in the rest of the text; the facet columns only filter
+RANK_WEIGHTS = "8.0, 1.0, 0.0, 0.0, 0.0"
+BATCH_SIZE = 1000
+SNIPPET_CHARS = 160
+# Words found in nearly every document: they would make a query rank most of the index
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the their this to was were will with".split()
+)
+
+_TERMS = re.compile(r"\w+", re.UNICODE)
+QUOTE = '"'
+
+
+def query_terms(text: str) -> List[str]:
+    """
+    The words of `text` to search for, without stopwords unless there is nothing else.
+
+    Raises ValueError when the text has no words.
+    """
+    terms = _TERMS.findall(text.lower())
+    if not terms:
+        raise ValueError("The query has no words to search for")
+    return [term for term in terms if term not in STOPWORDS] or terms
+
+
+def match_query(terms: List[str], prefix: bool = False) -> str:
+    """An FTS5 query matching documents with every term, with `prefix` the last one as a prefix."""
+    return " ".join(f'"{term}"' for term in terms) + ("*" if prefix else "")
+
+
+def highlight(text: Optional[str], terms: List[str]) -> Optional[str]:
+    """
+    About SNIPPET_CHARS characters of `text` from just before the first query term,
+    with the terms in <mark>, or None when no term is in the text.
+    """
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE)
+    found = pattern.search(text or "")
+    if not found:
+        return None
+    start = text.rfind(" ", 0, max(0, found.start() - SNIPPET_CHARS // 4)) + 1
+    end = start + SNIPPET_CHARS
+    if end < len(text):
+        # Cut at a word boundary, keeping the term found
+        end = max(text.rfind(" ", found.end(), end), found.end())
+    snippet = pattern.sub(lambda match: f"<mark>{match.group(0)}</mark>", text[start:end])
+    return ("…" if start else "") + snippet + ("…" if end < len(text) else "")
+
+
+def _date(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def document(model, row) -> tuple:
+    """The index row of a scholarship or news article read with DOCUMENT_COLUMNS."""
+    kind = model.__tablename__
+    if model is Scholarship:
+        id, title, funded_by, description, requirements, url, degree_level, deadline = row
+        if isinstance(requirements, list):
+            requirements = " ".join(str(requirement) for requirement in requirements)
+        body = " ".join(part for part in (funded_by, description, requirements) if isinstance(part, str))
+        return id * 2 + KIND_BITS[kind], title, body, kind, id, url, degree_level, None, _date(deadline)
+    id, title, description, body, source, url, category, published_at = row
+    text = " ".join(part for part in (description, body, source) if part)
+    return id * 2 + KIND_BITS[kind], title, text, kind, id, url, None, category, _date(published_at)
+
+
+class SearchIndex:
+    """
+    Full-text index of scholarships and news in an SQLite FTS5 file, ranked with BM25.
+
+    The index lives in SEARCH_INDEX_PATH (default search.db), next to the main
+    database, so it works whatever database holds the rows; every API process on
+    the host shares it. It is kept up to date by the write paths of those
+    processes: the rows a scrape inserted, enriched rows and deleted rows. The API
+    must therefore run on a single host: another host would keep its own index,
+    which misses the writes made elsewhere until its next rebuild. On start-up it
+    indexes the rows missing from the index and drops the deleted ones, or indexes
+    everything if the index is empty. When a write to the index fails, the rows
+    stay searchable as they were until the next start or rebuild
+    (POST /search/rebuild/).
+
+    Kind, degree level and category are indexed columns, so filtering on them is
+    part of the full-text match; what results show is kept in a small table beside
+    it. Queries matching more than SEARCH_MAX_CANDIDATES documents (default 2000,
+    0 for no limit) only rank the most recently added of them. A query matches that
+    many only when all its words are found in a large share of the index, and BM25
+    gives such words nearly no weight, so ranking every match would cost several
+    times the latency for results scored within a few percent of these.
+    """
+
+    def __init__(self, path: Optional[str] = None, session_factory=SessionLocal, max_candidates: Optional[int] = None):
+        self.path = path or os.getenv("SEARCH_INDEX_PATH", "search.db")
+        self.session_factory = session_factory
+        self.max_candidates = (
+            max_candidates if max_candidates is not None else int(os.getenv("SEARCH_MAX_CANDIDATES", "2000"))
+        )
+        self.searches = 0
+        self.latencies = deque(maxlen=1000)
+        self.last_rebuild = None
+        self._local = threading.local()
+        self._created = False
+        self._task = None
+        self.logger = logging.getLogger(__name__)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Opened on first use, so importing the module creates no file
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            if not self._created:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+                    "title, body, kind, degree_level, category, "
+                    "tokenize='porter unicode61 remove_diacritics 2', prefix='2 3')"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS search_documents (rowid INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+                    "entity_id INTEGER NOT NULL, title TEXT, url TEXT, degree_level TEXT, category TEXT, date TEXT)"
+                )
+                self._created = True
+            self._local.conn = conn
+        return conn
+
+    def _write(self, statements):
+        """Run `statements(conn)` in one write transaction."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            statements(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def upsert(self, model, rows: Iterable[tuple]):
+        """Index (or re-index) rows read with DOCUMENT_COLUMNS[model]."""
+        documents = [document(model, row) for row in rows]
+        if not documents:
+            return
+
+        def statements(conn):
+            rowids = [(doc[0],) for doc in documents]
+            conn.executemany("DELETE FROM search_index WHERE rowid = ?", rowids)
+            conn.executemany(
+                "INSERT INTO search_index (rowid, title, body, kind, degree_level, category) VALUES (?, ?, ?, ?, ?, ?)",
+                [(rowid, title, body, kind, degree_level, category)
+                 for rowid, title, body, kind, _, _, degree_level, category, _ in documents],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO search_documents (rowid, kind, entity_id, title, url, degree_level, category, date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(rowid, kind, entity_id, title, url, degree_level, category, date)
+                 for rowid, title, _, kind, entity_id, url, degree_level, category, date in documents],
+            )
+
+        self._write(statements)
+
+    def _read(self, db: Session, model, *criteria):
+        columns = [getattr(model, name) for name in DOCUMENT_COLUMNS[model]]
+        query = db.query(*columns).filter(*criteria).order_by(model.id).yield_per(BATCH_SIZE)
+        batch = []
+        for row in query:
+            batch.append(tuple(row))
+            if len(batch) == BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def index_new(self, db: Session, model) -> int:
+        """
+        Index the rows of `model` missing from the index and drop the rows deleted
+        from the table; returns how many were indexed.
+
+        The ids of the table and of the index are compared rather than looking past
+        the last id indexed, as rows do not commit in id order.
+        """
+        indexed = 0
+        try:
+            indexed_ids = {id for (id,) in self._connection().execute(
+                "SELECT entity_id FROM search_documents WHERE kind = ?", (model.__tablename__,)
+            )}
+            if not indexed_ids:
+                batches = self._read(db, model)
+            else:
+                ids = set(db.scalars(select(model.id)))
+                self.remove(model, sorted(indexed_ids - ids))
+                missing = sorted(ids - indexed_ids)
+                batches = (
+                    batch
+                    for start in range(0, len(missing), BATCH_SIZE)
+                    for batch in self._read(db, model, model.id.in_(missing[start:start + BATCH_SIZE]))
+                )
+            for batch in batches:
+                self.upsert(model, batch)
+                indexed += len(batch)
+        except Exception as e:
+            self.logger.error(f"Could not index new {model.__tablename__}: {str(e)}")
+        return indexed
+
+    def refresh(self, db: Session, model, ids: List[int]):
+        """Index new rows of `model` or re-index those whose text changed; ids no longer in the table are removed."""
+        try:
+            rows = [row for batch in self._read(db, model, model.id.in_(ids)) for row in batch]
+            self.upsert(model, rows)
+            found = {row[0] for row in rows}
+            self.remove(model, [id for id in ids if id not in found])
+        except Exception as e:
+            self.logger.error(f"Could not re-index {model.__tablename__} {ids}: {str(e)}")
+
+    def remove(self, model, ids: List[int]):
+        """Drop deleted rows of `model` from the index."""
+        if not ids or model not in DOCUMENT_COLUMNS:
+            return
+        bit = KIND_BITS[model.__tablename__]
+        rowids = [(id * 2 + bit,) for id in ids]
+
+        def statements(conn):
+            conn.executemany("DELETE FROM search_index WHERE rowid = ?", rowids)
+            conn.executemany("DELETE FROM search_documents WHERE rowid = ?", rowids)
+
+        try:
+            self._write(statements)
+        except Exception as e:
+            self.logger.error(f"Could not remove {model.__tablename__} from the index: {str(e)}")
+
+    def rebuild(self) -> dict:
+        """Index every scholarship and news article from scratch."""
+        started = time.perf_counter()
+
+        def clear(conn):
+            conn.execute("DELETE FROM search_index")
+            conn.execute("DELETE FROM search_documents")
+
+        self._write(clear)
+        db = self.session_factory()
+        try:
+            counts = {model.__tablename__: self.index_new(db, model) for model in DOCUMENT_COLUMNS}
+        finally:
+            db.close()
+        self._write(lambda conn: conn.execute("INSERT INTO search_index (search_index) VALUES ('optimize')"))
+        self.last_rebuild = datetime.now()
+        self.logger.info(f"Rebuilt the search index in {time.perf_counter() - started:.1f}s: {counts}")
+        return counts
+
+    def catch_up(self):
+        """Index what was added or deleted while the API was down, or everything into an empty index."""
+        if self._connection().execute("SELECT 1 FROM search_documents LIMIT 1").fetchone() is None:
+            self.rebuild()
+            return
+        db = self.session_factory()
+        try:
+            for model in DOCUMENT_COLUMNS:
+                self.index_new(db, model)
+        finally:
+            db.close()
+
+    def search(
+        self,
+        text: str,
+        kind: Optional[str] = None,
+        degree_level: Optional[str] = None,
+        category: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> List[dict]:
+        """
+        Ranked matches for `text`, best first.
+
+        `date_from`/`date_to` apply to scholarship deadlines and news publication dates.
+        Raises ValueError when the text has no words.
+        """
+        started = time.perf_counter()
+        terms = query_terms(text)
+        facets = "".join(
+            f' AND {column} : "{value.replace(QUOTE, QUOTE * 2)}"'
+            for column, value in (("kind", kind), ("degree_level", degree_level), ("category", category))
+            if value
+        )
+        conn = self._connection()
+        expression = match_query(terms) + facets
+        # Stemming matches other forms of whole words; a last word matching nothing is taken as
+        # half typed and searched as a prefix, which is slower on large indexes
+        if conn.execute("SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT 1", (expression,)).fetchone() is None:
+            expression = match_query(terms, prefix=True) + facets
+        joins, clauses, params = "", ["search_index MATCH ?"], [expression]
+        if date_from or date_to:
+            joins = " JOIN search_documents d ON d.rowid = search_index.rowid"
+        if date_from:
+            clauses.append("d.date >= ?")
+            params.append(date_from.isoformat())
+        if date_to:
+            # Dates are stored as ISO datetimes, which sort before the next day's date
+            clauses.append("d.date < ?")
+            params.append((date_to + timedelta(days=1)).isoformat())
+        if self.max_candidates:
+            # The rowid of the last of the newest `max_candidates` matches, read in rowid order without
+            # scoring them; the date filter is only joined in when the full-text match alone has that many
+            cutoff = conn.execute(
+                "SELECT rowid FROM search_index WHERE search_index MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+                (expression, self.max_candidates - 1),
+            ).fetchone()
+            if cutoff is not None and joins:
+                cutoff = conn.execute(
+                    f"SELECT search_index.rowid FROM search_index{joins} WHERE {' AND '.join(clauses)} "
+                    "ORDER BY search_index.rowid DESC LIMIT 1 OFFSET ?",
+                    (*params, self.max_candidates - 1),
+                ).fetchone()
+            if cutoff is not None:
+                clauses.append("search_index.rowid >= ?")
+                params.append(cutoff[0])
+        matches = f"FROM search_index{joins} WHERE {' AND '.join(clauses)}"
+
+        # Every candidate is scored; the sort only keeps the best `limit + offset` of them
+        ranked = conn.execute(
+            f"SELECT search_index.rowid, bm25(search_index, {RANK_WEIGHTS}) AS score {matches} "
+            "ORDER BY score LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+
+        # Snippets are cut from the page's documents only, outside the ranking query
+        placeholders = ", ".join("?" * len(ranked))
+        rowids = [rowid for rowid, _ in ranked]
+        shown = {row[0]: row[1:] for row in conn.execute(
+            "SELECT rowid, kind, entity_id, title, url, degree_level, category, date FROM search_documents "
+            f"WHERE rowid IN ({placeholders})", rowids,
+        )}
+        bodies = dict(conn.execute(f"SELECT rowid, body FROM search_index WHERE rowid IN ({placeholders})", rowids))
+        results = []
+        for rowid, score in ranked:
+            kind, id, title, url, degree_level, category, date_value = shown[rowid]
+            results.append({
+                "kind": kind,
+                "id": id,
+                "title": title,
+                "url": url,
+                "degree_level": degree_level,
+                "category": category,
+                "date": date_value,
+                "snippet": highlight(bodies.get(rowid), terms) or highlight(title, terms) or title,
+                "score": round(-score, 3),
+            })
+        self.searches += 1
+        self.latencies.append(time.perf_counter() - started)
+        return results
+
+    def start(self):
+        self._task = asyncio.create_task(asyncio.to_thread(self.catch_up))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # The catch-up runs in a thread and cannot be cancelled; let it finish
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        counts = dict(self._connection().execute("SELECT kind, count(*) FROM search_documents GROUP BY kind").fetchall())
+        latencies = sorted(self.latencies)
+        return {
+            "documents": counts,
+            "searches": self.searches,
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else 0.0,
+            "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2) if latencies else 0.0,
+            "last_rebuild": self.last_rebuild,
+        }
+
+
+search_index = SearchIndex()
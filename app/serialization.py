@@ -0,0 +1,45 @@
+from typing import Iterable, List, Optional, Sequence
+import orjson
+from .schemas import NewsBase, ScholarshipBase
+
+# Fields of the API schemas, in their order; responses are built from these columns
+SCHOLARSHIP_FIELDS = list(ScholarshipBase.model_fields)
+NEWS_FIELDS = list(NewsBase.model_fields)
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """
+    The fields named in a comma-separated `fields=` parameter, in schema order and
+    always with `id`, or every field when it is not given.
+
+    Raises ValueError for a field the schema does not have.
+    """
+    if not fields:
+        return list(allowed)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Available: {', '.join(allowed)}")
+    requested.add("id")
+    return [name for name in allowed if name in requested]
+
+
+def select_columns(model, fields: Sequence[str], extra: Iterable = ()) -> list:
+    """Columns of `model` for `fields`, followed by the `extra` columns (e.g. sort keys) not among them."""
+    columns = [getattr(model, name) for name in fields]
+    columns.extend(column for column in extra if column.key not in fields)
+    return columns
+
+
+def dump_rows(fields: Sequence[str], rows) -> bytes:
+    """
+    Serialize column tuples selected with select_columns to a JSON array of objects.
+
+    The values are encoded as read from the database, so the output matches the
+    API schemas without building ORM objects or validating every row.
+    """
+    return orjson.dumps([dict(zip(fields, row)) for row in rows])
+
+
+def dump_row(fields: Sequence[str], row) -> bytes:
+    return orjson.dumps(dict(zip(fields, row)))
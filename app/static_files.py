@@ -0,0 +1,216 @@
+import functools
+import hashlib
+import os
+import re
+import stat
+from mimetypes import guess_type
+from typing import Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+# Formats an image may be upgraded to, best first, for each extension requested
+NEGOTIABLE = {
+    ".png": ((".avif", "image/avif"), (".webp", "image/webp")),
+    ".webp": ((".avif", "image/avif"),),
+}
+
+# Text files that may have a gzipped sibling (<file>.gz) written next to them.
+# Images are not precompressed: PNG, WebP and AVIF are compressed already.
+PRECOMPRESSED = {".json", ".svg", ".css", ".js", ".txt", ".html"}
+
+# Files named <16 hex>-<16 hex content hash>[-<variant>].<ext> never change
+_IMMUTABLE_NAME_RE = re.compile(r"^[0-9a-f]{16}-([0-9a-f]{16})(-[a-z0-9]+)?\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+
+def accepted_types(accept: str) -> set:
+    """Media types (or codings) named in an Accept header, leaving out the ones refused with q=0."""
+    types = set()
+    for part in accept.split(","):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    pass
+        if quality > 0:
+            types.add(media_type.lower())
+    return types
+
+
+@functools.lru_cache(maxsize=4096)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:32]
+
+
+def strong_etag(full_path: str, stat_result: os.stat_result) -> str:
+    """
+    ETag derived from the file's content, so every server behind a CDN agrees on it.
+    Content-hashed files take it from their name; others are hashed once per version.
+    """
+    filename = os.path.basename(full_path)
+    if _IMMUTABLE_NAME_RE.match(filename):
+        return f'"{filename}"'
+    return f'"{_file_digest(str(full_path), stat_result.st_mtime_ns, stat_result.st_size)}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    First and last byte of a single `bytes=` range, or None when the whole file
+    should be sent (malformed or multiple ranges). Raises ValueError if the range
+    cannot be satisfied.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    start, separator, end = ranges.strip().partition("-")
+    if not separator or not (start.isdigit() or not start) or not (end.isdigit() or not end):
+        return None
+    if not start:
+        # Suffix range: the last `end` bytes
+        if not end:
+            return None
+        if int(end) == 0 or size == 0:
+            raise ValueError(f"Range {header} outside of {size} bytes")
+        return max(size - int(end), 0), size - 1
+    first = int(start)
+    last = int(end) if end else size - 1
+    if end and last < first:
+        return None
+    if first >= size:
+        raise ValueError(f"Range {header} outside of {size} bytes")
+    return first, min(last, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """206 Partial Content response carrying bytes `start`..`end` (inclusive) of a file."""
+
+    def __init__(self, path, start: int, end: int, stat_result: os.stat_result, **kwargs):
+        super().__init__(path, status_code=206, stat_result=stat_result, **kwargs)
+        self.start = start
+        self.end = end
+        self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class NegotiatingStaticFiles(StaticFiles):
+    """
+    Static files served for caches:
+
+    - images requested as .png or .webp are answered with their AVIF or WebP
+      sibling when the Accept header allows it, with `Vary: Accept`
+    - text files with a gzipped sibling are answered with it for clients accepting
+      gzip, with `Vary: Accept-Encoding`
+    - content-hashed files are `immutable` for a year, others must be revalidated
+    - ETags are strong and derived from the content; If-None-Match,
+      If-Modified-Since, Range and If-Range are honoured
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        extension = os.path.splitext(path)[1].lower()
+        vary = None
+        candidates = []
+        if extension in NEGOTIABLE:
+            vary = "Accept"
+            accepted = accepted_types(request_headers.get("accept", ""))
+            candidates = [
+                (path[: -len(extension)] + sibling_extension, {})
+                for sibling_extension, media_type in NEGOTIABLE[extension]
+                if media_type in accepted
+            ]
+        elif extension in PRECOMPRESSED:
+            vary = "Accept-Encoding"
+            codings = accepted_types(request_headers.get("accept-encoding", ""))
+            if "gzip" in codings or "*" in codings:
+                candidates = [(f"{path}.gz", {"content_encoding": "gzip", "media_type": guess_type(path)[0]})]
+
+        response = None
+        for candidate, options in candidates:
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, candidate)
+            if stat_result and stat.S_ISREG(stat_result.st_mode):
+                response = self.file_response(full_path, stat_result, scope, **options)
+                break
+
+        if response is None:
+            response = await super().get_response(path, scope)
+        if vary:
+            response.headers["Vary"] = vary
+        return response
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+        content_encoding: Optional[str] = None,
+        media_type: Optional[str] = None,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        filename = os.path.basename(full_path)
+        headers = {
+            "etag": strong_etag(full_path, stat_result),
+            "cache-control": IMMUTABLE_CACHE_CONTROL if _IMMUTABLE_NAME_RE.match(filename) else REVALIDATE_CACHE_CONTROL,
+            "accept-ranges": "bytes",
+        }
+        if content_encoding:
+            headers["content-encoding"] = content_encoding
+
+        response = FileResponse(
+            full_path, status_code=status_code, headers=headers, media_type=media_type, stat_result=stat_result
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        range_header = request_headers.get("range")
+        if status_code != 200 or not range_header:
+            return response
+        # A stale If-Range means the client's partial copy is outdated: send everything
+        if_range = request_headers.get("if-range")
+        if if_range and if_range.strip() != headers["etag"]:
+            return response
+        try:
+            byte_range = parse_range(range_header, stat_result.st_size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={"content-range": f"bytes */{stat_result.st_size}", "etag": headers["etag"]},
+            )
+        if byte_range is None:
+            return response
+        return RangeFileResponse(
+            full_path, *byte_range, stat_result=stat_result, headers=headers, media_type=media_type
+        )
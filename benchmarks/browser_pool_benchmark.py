@@ -0,0 +1,88 @@
+"""
+Compare pages/minute with a fresh browser per page against the pooled browsers.
+
+The HTML fixtures in benchmarks/fixtures are served by a local HTTP server, so no
+network access is needed. Requires Playwright and its Chromium build
+(`playwright install chromium`).
+
+Usage:
+    python -m benchmarks.browser_pool_benchmark [--pages 30] [--pool-size 2]
+"""
+import argparse
+import asyncio
+import functools
+import http.server
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.browser_pool import BrowserPool
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures():
+    """Serve the fixtures directory on a random local port and return (server, base_url)."""
+    handler = functools.partial(_QuietHandler, directory=FIXTURES_DIR)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def fixture_urls(base_url, count):
+    names = sorted(name for name in os.listdir(FIXTURES_DIR) if name.endswith(".html"))
+    return [f"{base_url}/{names[i % len(names)]}" for i in range(count)]
+
+
+async def _render_with_fresh_browser(url):
+    """What every SmartScraperGraph run did before the pool: launch, render, close."""
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(url, wait_until="domcontentloaded")
+        html = await page.content()
+        await browser.close()
+        return html
+
+
+def run(label, urls, render, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pages = list(executor.map(render, urls))
+    elapsed = time.perf_counter() - start
+    assert all(pages)
+    print(f"{label:<24} {len(urls):>4} pages {elapsed:>8.2f}s {len(urls) / elapsed * 60:>10.1f} pages/min")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=2)
+    args = parser.parse_args()
+
+    server, base_url = serve_fixtures()
+    urls = fixture_urls(base_url, args.pages)
+    try:
+        run("fresh browser per page", urls,
+            lambda url: asyncio.run(_render_with_fresh_browser(url)), args.pool_size)
+
+        pool = BrowserPool(size=args.pool_size)
+        try:
+            run(f"pool size={args.pool_size}", urls, pool.render, args.pool_size)
+            print(f"pool stats: {pool.stats}")
+        finally:
+            pool.close()
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
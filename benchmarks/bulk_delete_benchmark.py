@@ -0,0 +1,133 @@
+"""
+Benchmark removing outdated scholarships with the chunked bulk delete against the
+old path (load every row, filter in Python, delete row by row), on SQLite.
+
+Half of the rows are outdated and every fifth row has an image of its own in the
+image store, with a file on disk. Reports the time taken, the statements sent and
+the peak Python memory.
+
+Usage:
+    python -m benchmarks.bulk_delete_benchmark [--rows 50000] [--chunk-size 1000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Scholarship, StoredImage
+from app.bulk_delete import BulkDeleter
+from app.image_store import image_store, remove_image_files
+
+
+def seed(Session, rows, images_dir):
+    now = datetime.now()
+    scholarships, stored = [], []
+    for i in range(rows):
+        row = {
+            "program_title": f"Benchmark Scholarship {i}",
+            "url": f"https://example.org/scholarships/{i}",
+            "deadline": now + timedelta(days=-30 if i % 2 else 30, seconds=i),
+        }
+        if i % 5 == 0:
+            path = os.path.join(images_dir, f"{i}.png")
+            with open(path, "wb") as file:
+                file.write(b"png")
+            row["image_url"] = "/" + path
+            stored.append({
+                "prompt_key": str(i), "normalized_prompt": str(i), "provider": "benchmark",
+                "image_url": row["image_url"], "ref_count": 1, "reuses": 0,
+                "created_at": now, "last_used_at": now,
+            })
+        scholarships.append(row)
+    with Session() as db:
+        db.bulk_insert_mappings(Scholarship, scholarships)
+        db.bulk_insert_mappings(StoredImage, stored)
+        db.commit()
+
+
+def per_row_delete(db):
+    """The previous endpoint: every row loaded, filtered in Python and deleted one by one."""
+    scholarships = db.query(Scholarship).all()
+    image_paths = []
+    for scholarship in scholarships:
+        if scholarship.deadline and scholarship.deadline < datetime.now():
+            image_paths.append(image_store.release(db, scholarship.image_url))
+            db.delete(scholarship)
+    db.commit()
+    remove_image_files(image_paths)
+    return len(image_paths)
+
+
+def bulk_delete(chunk_size):
+    deleter = BulkDeleter(chunk_size=chunk_size)
+
+    def run(db):
+        result = deleter.delete(
+            db, Scholarship, Scholarship.deadline < datetime.now(), order_by=[Scholarship.deadline, Scholarship.id]
+        )
+        deleter.close()
+        return result["deleted"]
+
+    return run
+
+
+def run(label, rows, delete):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        images_dir = os.path.join("static", "images")
+        os.makedirs(images_dir)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, rows, images_dir)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+        tracemalloc.start()
+        start = time.perf_counter()
+        with Session() as db:
+            delete(db)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        with Session() as db:
+            remaining = db.query(Scholarship).count()
+            images = db.query(StoredImage).count()
+        files = len(os.listdir(images_dir))
+        assert remaining == rows - rows // 2, remaining
+        assert images == files, (images, files)
+        print(
+            f"{label:<28} {elapsed * 1000:>9.1f} ms  {len(statements):>7} statements  "
+            f"peak {peak / 1024 / 1024:>7.1f} MiB  {remaining} rows and {files} images left"
+        )
+        engine.dispose()
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    cwd = os.getcwd()
+    try:
+        run("per-row delete", args.rows, per_row_delete)
+        run(f"bulk delete, chunks of {args.chunk_size}", args.rows, bulk_delete(args.chunk_size))
+    finally:
+        os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,66 @@
+"""
+Measure response cache lookup latency (entry plus tag generations) for each cache backend.
+
+The Redis backend talks to the in-process fake server from
+benchmarks/fake_redis_server.py unless --redis-url points at a real server.
+
+Usage:
+    python -m benchmarks.cache_backend_benchmark [--entries 1000] [--lookups 10000]
+"""
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.cache_backends import MemoryBackend, SQLiteBackend, create_backend
+from app.response_cache import CachedResponse, ResponseCache
+from benchmarks.fake_redis_server import FakeRedisServer
+
+
+def bench(label, backend, entries, lookups):
+    cache = ResponseCache(backend=backend)
+    body = b'{"id": 1, "program_title": "Benchmark Scholarship", "requirements": ["GPA 3.0"]}'
+    for i in range(entries):
+        _, generations, _ = cache.get(f"/scholarships/{i}?", [f"scholarships:{i}"])
+        cache.set(f"/scholarships/{i}?", CachedResponse(body), generations)
+
+    latencies = []
+    for _ in range(lookups):
+        i = random.randrange(entries)
+        start = time.perf_counter()
+        cached, _, _ = cache.get(f"/scholarships/{i}?", [f"scholarships:{i}"])
+        latencies.append((time.perf_counter() - start) * 1e6)
+        assert cached is not None
+
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<10} p50 {statistics.median(latencies):>8.1f} us   p99 {p99:>8.1f} us")
+    backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    bench("memory", MemoryBackend(), args.entries, args.lookups)
+    with tempfile.TemporaryDirectory() as tmp:
+        bench("sqlite", SQLiteBackend(os.path.join(tmp, "cache.db")), args.entries, args.lookups)
+
+    if args.redis_url:
+        bench("redis", create_backend(args.redis_url), args.entries, args.lookups)
+    else:
+        server = FakeRedisServer()
+        port = server.start()
+        bench("redis", create_backend(f"redis://127.0.0.1:{port}/0"), args.entries, args.lookups)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
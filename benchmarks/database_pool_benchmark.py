@@ -0,0 +1,142 @@
+"""
+Benchmark the database layer on two SQLite files standing in for a primary and
+its read replica.
+
+- routing: rows written after the replica was copied are seen by the sessions of
+  the write path but not by the read-only sessions, unless the response cache
+  reports a recent write to the rows, while writes made through a read-only
+  session land on the primary
+- pool: queries/sec and wait for a connection (p50/p95/max) of threads holding a
+  connection for a few milliseconds, for several pool sizes
+- stale connections: queries failing after every idle connection was dropped (as
+  a MySQL server does past wait_timeout), with and without the pre-ping
+
+Usage:
+    python -m benchmarks.database_pool_benchmark [--rows 1000] [--threads 32] [--queries 50]
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import event, func, text
+from sqlalchemy.exc import DBAPIError
+
+from app.cache_backends import MemoryBackend
+from app.database import Database, database, use_primary
+from app.models import Scholarship
+from app.response_cache import ResponseCache
+
+
+def scholarship(i):
+    return Scholarship(program_title=f"Benchmark Scholarship {i}", url=f"https://example.org/scholarships/{i}", times_updated=0)
+
+
+def count(session_factory):
+    with session_factory() as db:
+        return db.query(func.count(Scholarship.id)).scalar()
+
+
+def routing(tmp, rows):
+    primary, replica = os.path.join(tmp, "primary.db"), os.path.join(tmp, "replica.db")
+    db_layer = Database(f"sqlite:///{primary}", f"sqlite:///{replica}")
+    db_layer.create_all()
+    with db_layer.session() as db:
+        db.add_all([scholarship(i) for i in range(rows)])
+        db.commit()
+    db_layer.dispose()
+    shutil.copy(primary, replica)
+
+    # Rows the replica has not received yet
+    with db_layer.session() as db:
+        db.add_all([scholarship(rows + i) for i in range(10)])
+        db.commit()
+    with db_layer.read_session() as db:
+        db.add(scholarship(rows + 10))
+        db.commit()
+    print(f"routing: primary session sees {count(db_layer.session)} rows, "
+          f"read-only session sees {count(db_layer.read_session)} (replica copied at {rows}, "
+          f"11 rows written since, 1 through the read-only session)")
+
+    cache = ResponseCache(MemoryBackend())
+    cache.invalidate("scholarships", [rows + 10])
+    _, _, recently_written = cache.get("/scholarships/?", ["scholarships:list"])
+    with db_layer.read_session() as db:
+        if recently_written:
+            use_primary(db)
+        seen = db.query(func.count(Scholarship.id)).scalar()
+    print(f"routing: cache miss right after a write reads {seen} rows")
+    db_layer.dispose()
+
+
+def load(url, pool_size, max_overflow, threads, queries, hold):
+    db_layer = Database(url, pool_size=pool_size, max_overflow=max_overflow, pool_timeout=60, create_tables=False)
+
+    def worker():
+        for _ in range(queries):
+            with db_layer.read_session() as db:
+                db.query(Scholarship.id, Scholarship.program_title).order_by(Scholarship.id).limit(20).all()
+                time.sleep(hold)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = db_layer.stats()["primary"]
+    print(f"pool {pool_size:>3}+{max_overflow:<3} {threads * queries / elapsed:>8.0f} queries/s  "
+          f"wait p50 {stats['wait_p50_ms']:>7.2f} ms  p95 {stats['wait_p95_ms']:>7.2f} ms  max {stats['wait_max_ms']:>7.1f} ms  timeouts {stats['timeouts']}")
+    db_layer.dispose()
+
+
+def stale_connections(url, pre_ping, queries):
+    db_layer = Database(url, pool_size=4, max_overflow=0, pre_ping=pre_ping, create_tables=False)
+
+    @event.listens_for(db_layer.engine, "checkin")
+    def drop(dbapi_connection, record):
+        # Drop every connection as it goes back to the pool
+        if dbapi_connection is not None:
+            dbapi_connection.close()
+
+    errors = 0
+    for _ in range(queries):
+        try:
+            with db_layer.session() as db:
+                db.execute(text("SELECT count(*) FROM scholarships")).scalar()
+        except DBAPIError:
+            errors += 1
+    stats = db_layer.stats()["primary"]
+    print(f"stale connections, pre-ping {'on ' if pre_ping else 'off'}: {errors}/{queries} queries failed, "
+          f"{stats['invalidated']} connections invalidated")
+    db_layer.dispose()
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--hold-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print(f"engines built on import: {len(database._engines)}")
+    with tempfile.TemporaryDirectory() as tmp:
+        routing(tmp, args.rows)
+        url = f"sqlite:///{os.path.join(tmp, 'primary.db')}"
+        for pool_size, max_overflow in [(2, 0), (5, 10), (10, 20), (args.threads, 0)]:
+            load(url, pool_size, max_overflow, args.threads, args.queries, args.hold_ms / 1000)
+        stale_connections(url, False, 20)
+        stale_connections(url, True, 20)
+
+
+if __name__ == "__main__":
+    benchmark()
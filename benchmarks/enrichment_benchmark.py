@@ -0,0 +1,125 @@
+"""
+Measure tokens per enriched row and rows per minute of the scholarship enrichment
+with one LLM call per scholarship and with batched calls, against a stubbed LLM.
+
+The detail page fixture in benchmarks/fixtures is served by a local HTTP server.
+The stub LLM waits --llm-latency seconds per call plus --per-token-ms per prompt
+token, so the runs show what the fixed cost of a call and the per-call prompt
+overhead amount to. A last run points some rows at a missing page and reports how
+many runs pick them before they are skipped.
+
+Usage:
+    python -m benchmarks.enrichment_benchmark [--rows 60] [--llm-latency 0.5] [--per-token-ms 0.05]
+"""
+import argparse
+import functools
+import http.server
+import logging
+import os
+import sys
+import tempfile
+import threading
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Scholarship
+from app.enrichment import BatchEnricher, EnrichmentItem, StubLLM
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class _QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_fixtures():
+    """Serve the fixtures directory on a random local port and return (server, base_url)."""
+    handler = functools.partial(_QuietHandler, directory=FIXTURES_DIR)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def run(label, rows, base_url, llm, **options):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.bulk_insert_mappings(Scholarship, [
+                {"program_title": f"Scholarship {i}", "url": f"{base_url}/scholarship_detail.html?id={i}", "times_updated": 0}
+                for i in range(rows)
+            ])
+            db.commit()
+            items = [
+                EnrichmentItem(id, url, ["description", "requirements", "degree_level"])
+                for id, url in db.query(Scholarship.id, Scholarship.url).all()
+            ]
+
+        enricher = BatchEnricher(llm=llm, session_factory=Session, **options)
+        report = enricher.run(items)
+        with Session() as db:
+            missing = db.query(Scholarship).filter(Scholarship.description == None).count()
+        assert missing == 0, missing
+        print(
+            f"{label:<22} {report['batches']:>6} calls  {report['tokens_per_enriched_row']:>8} tokens/row  "
+            f"{report['rows_per_minute']:>8} rows/min  ({report['enriched']} rows in {report['seconds']:.1f}s)"
+        )
+        engine.dispose()
+
+
+def missing_pages(rows, base_url, llm, runs=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            db.bulk_insert_mappings(Scholarship, [
+                {"program_title": f"Scholarship {i}", "url": f"{base_url}/missing.html?id={i}", "times_updated": 0}
+                for i in range(rows)
+            ])
+            db.commit()
+
+        enricher = BatchEnricher(llm=llm, session_factory=Session)
+        picked = []
+        for _ in range(runs):
+            with Session() as db:
+                # The selection of POST /fetch-null-fields/
+                items = [
+                    EnrichmentItem(id, url, ["description", "requirements", "degree_level"])
+                    for id, url, times_updated in db.query(Scholarship.id, Scholarship.url, Scholarship.times_updated)
+                    if not (times_updated and times_updated > 2)
+                ]
+            picked.append(len(items))
+            if items:
+                enricher.run(items)
+        print(f"{'missing pages':<22} {rows} rows picked by each of {runs} runs: {picked}")
+        engine.dispose()
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=60)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--per-token-ms", type=float, default=0.05)
+    parser.add_argument("--token-budget", type=int, default=8000)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    server, base_url = serve_fixtures()
+    llm = StubLLM(latency=args.llm_latency, per_token_ms=args.per_token_ms)
+    try:
+        run("one call per row", args.rows, base_url, llm, max_batch_items=1)
+        run(f"batched ({args.token_budget} tokens)", args.rows, base_url, llm, token_budget=args.token_budget)
+        missing_pages(10, base_url, llm)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
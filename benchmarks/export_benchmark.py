@@ -0,0 +1,118 @@
+"""
+Benchmark exporting the whole scholarships table on SQLite: the streaming NDJSON and
+CSV export against paging through it with skip/limit, as clients of
+`/scholarships/` do (ORM objects validated through ScholarshipBase per page).
+
+Each path is timed, then run again under tracemalloc for its peak Python memory.
+The export is also run on a tenth of the table to show that its memory does not
+grow with the number of rows.
+
+Usage:
+    python -m benchmarks.export_benchmark [--rows 100000] [--page-size 1000] [--batch-size 1000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.export import DatasetExporter
+from app.models import Base, Scholarship
+from app.schemas import ScholarshipBase
+from app.serialization import SCHOLARSHIP_FIELDS
+
+
+def seed(Session, rows):
+    now = datetime.now()
+    with Session() as db:
+        for start in range(0, rows, 10000):
+            db.bulk_insert_mappings(Scholarship, [
+                {
+                    "program_title": f"Benchmark Scholarship {i}",
+                    "funded_by": "Benchmark Foundation",
+                    "url": f"https://example.org/scholarships/{i}",
+                    "deadline": now + timedelta(days=i % 365),
+                    "requirements": ["Canadian citizen or permanent resident", f"Minimum GPA of {i % 4}.0"],
+                    "description": "Supports students in their first year of study with a stipend and mentoring.",
+                    "degree_level": ("bachelor", "master", "doctorate")[i % 3],
+                    "times_updated": 0,
+                }
+                for i in range(start, min(start + 10000, rows))
+            ])
+        db.commit()
+
+
+def paged(Session, page_size):
+    adapter = TypeAdapter(list[ScholarshipBase])
+
+    def run():
+        size = skip = 0
+        with Session() as db:
+            while True:
+                page = db.query(Scholarship).offset(skip).limit(page_size).all()
+                if not page:
+                    return size
+                size += len(adapter.dump_json(adapter.validate_python(page, from_attributes=True)))
+                skip += page_size
+                db.expunge_all()
+
+    return run
+
+
+def exported(exporter, format, criteria=()):
+    def run():
+        stream = exporter.ndjson if format == "ndjson" else exporter.csv
+        return sum(len(chunk) for chunk in stream(Scholarship, SCHOLARSHIP_FIELDS, criteria))
+
+    return run
+
+
+def measure(label, rows, run):
+    start = time.perf_counter()
+    size = run()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<28} {rows:>7} rows  {elapsed:>7.2f} s  {rows / elapsed:>9.0f} rows/s  "
+        f"{size / 1024 / 1024:>7.1f} MiB out  peak {peak / 1024 / 1024:>7.1f} MiB"
+    )
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, args.rows)
+        exporter = DatasetExporter(session_factory=Session, batch_size=args.batch_size)
+        tenth = [Scholarship.id > args.rows - args.rows // 10]
+
+        measure(f"skip/limit pages of {args.page_size}", args.rows, paged(Session, args.page_size))
+        measure("export ndjson", args.rows, exported(exporter, "ndjson"))
+        measure("export csv", args.rows, exported(exporter, "csv"))
+        measure("export ndjson, tenth", args.rows // 10, exported(exporter, "ndjson", tenth))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    benchmark()
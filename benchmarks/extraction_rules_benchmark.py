@@ -0,0 +1,81 @@
+"""
+Benchmark the selector rules extraction on the listing fixtures in benchmarks/fixtures.
+
+For each page it reports the time the rules take per page, the items they extract
+and the tokens of the reduced text the LLM extraction would have been sent
+instead. Each page is then run again with the card class renamed, as when a site
+changes its layout, to check that the rules fail validation and fall back to the
+LLM instead of storing partial items.
+
+The rules below also serve as examples for `PUT /sources/{source_id}/rules`.
+
+Usage:
+    python -m benchmarks.extraction_rules_benchmark [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from app.extraction_rules import RuleError, apply_rules, validate_rules
+from app.html_reducer import reduce_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+BASE_URL = "https://www.example.org/scholarships/list"
+
+RULES = {
+    "scholarship_listing.html": ("scholarships", "scholarship-card", {
+        "item": ".scholarship-card",
+        "fields": {
+            "program_title": ".card-title a",
+            "url": {"selector": ".card-title a", "attr": "href"},
+            "funded_by": {"selector": ".funder", "pattern": "Funded by (.+)"},
+            "degree_level": {"selector": ".level", "pattern": r"Level: (\w+)"},
+            "deadline": {"selector": ".deadline", "pattern": r"(\d{4}-\d{2}-\d{2})"},
+            "requirements": {"selector": ".requirements li", "many": True},
+        },
+    }),
+    "news_listing.html": ("news", "news-item", {
+        "item": "article.news-item",
+        "fields": {
+            "title": "h2 a",
+            "url": {"selector": "h2 a", "attr": "href"},
+            "published_at": {"selector": "time", "attr": "datetime"},
+            "description": ".summary",
+            "source": ".source",
+        },
+    }),
+}
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'page':<26} {'items':>6} {'rules ms':>9} {'LLM tokens':>11}  layout changed")
+    for name, (kind, card_class, rules) in RULES.items():
+        validate_rules(rules, kind)
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as file:
+            page_html = file.read()
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            items = apply_rules(rules, page_html, BASE_URL, kind)
+        ms = (time.perf_counter() - started) * 1000 / args.repeat
+        assert all(item["url"].startswith("https://www.example.org/") for item in items)
+
+        try:
+            apply_rules(rules, page_html.replace(card_class, "card-v2"), BASE_URL, kind)
+            changed = "rules still matched"
+        except RuleError as e:
+            changed = f"falls back to the LLM ({e})"
+        tokens = reduce_html(page_html, base_url=BASE_URL).tokens
+        print(f"{name:<26} {len(items):>6} {ms:>9.2f} {tokens:>11}  {changed}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,98 @@
+"""
+A tiny in-memory server speaking the subset of the Redis protocol used by
+app.cache_backends.RedisBackend, for local testing and benchmarks.
+
+Usage:
+    python -m benchmarks.fake_redis_server [--port 6379]
+"""
+import argparse
+import socketserver
+import threading
+import time
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 0)):
+        super().__init__(address, _Handler)
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Serve in a background thread and return the bound port."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.server_address[1]
+
+    def _get(self, key):
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at < time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command, args):
+        with self.lock:
+            if command in (b"PING", b"SELECT", b"AUTH"):
+                return b"+OK\r\n" if command != b"PING" else b"+PONG\r\n"
+            if command == b"GET":
+                return _bulk(self._get(args[0]))
+            if command == b"MGET":
+                values = [self._get(key) for key in args]
+                return b"*%d\r\n" % len(values) + b"".join(_bulk(v) for v in values)
+            if command == b"SET":
+                expires_at = None
+                if len(args) >= 4 and args[2].upper() == b"PX":
+                    expires_at = time.monotonic() + int(args[3]) / 1000
+                elif len(args) >= 4 and args[2].upper() == b"EX":
+                    expires_at = time.monotonic() + int(args[3])
+                self.data[args[0]] = (args[1], expires_at)
+                return b"+OK\r\n"
+            if command == b"DEL":
+                removed = sum(1 for key in args if self.data.pop(key, None) is not None)
+                return b":%d\r\n" % removed
+            if command in (b"INCR", b"INCRBY"):
+                value = int(self._get(args[0]) or 0) + (int(args[1]) if command == b"INCRBY" else 1)
+                self.data[args[0]] = (str(value).encode(), None)
+                return b":%d\r\n" % value
+            if command == b"FLUSHDB":
+                self.data.clear()
+                return b"+OK\r\n"
+            return b"-ERR unknown command '%s'\r\n" % command
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            count = int(line[1:-2])
+            parts = []
+            for _ in range(count):
+                length = int(self.rfile.readline()[1:-2])
+                parts.append(self.rfile.read(length + 2)[:-2])
+            self.wfile.write(self.server.execute(parts[0].upper(), parts[1:]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    server = FakeRedisServer(("127.0.0.1", args.port))
+    print(f"Fake Redis server listening on 127.0.0.1:{server.server_address[1]}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark the HTML-to-text reduction that runs before LLM extraction, over the
+saved pages in benchmarks/fixtures.
+
+For each page it reports the tokens of the raw HTML (what SmartScraperGraph got
+before), of the page text with only scripts, styles and tags removed, and of the
+reduced text, plus the time the reduction takes. The plain text is shorter but
+loses the link targets, which the extraction needs for the URL of each item. Parity is the share of the facts
+on the page (titles, URLs, funders, levels, deadlines, requirements, summaries...)
+that are still present in the text handed to the LLM.
+
+Usage:
+    python -m benchmarks.html_reducer_benchmark [--repeat 20]
+"""
+import argparse
+import html
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from bs4 import BeautifulSoup
+
+from app.html_reducer import estimate_tokens, reduce_html
+from app.page_fetcher import normalize_html
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+BASE_URL = "https://www.example.org/scholarships/list"
+
+# Fields of each fixture, as (item selector, [field selectors]); "a@href" is a link target
+FACTS = {
+    "scholarship_listing.html": (".scholarship-card", [".card-title a", "a@href", ".funder", ".level", ".deadline", ".requirements li"]),
+    "news_listing.html": ("article.news-item", ["h2 a", "a@href", "time", ".summary", ".source"]),
+    "scholarship_detail.html": ("article", ["h1", ".funder", ".description p", "ul li"]),
+}
+
+
+def squash(text: str) -> str:
+    return " ".join(html.unescape(text).split())
+
+
+def page_facts(name: str, page_html: str):
+    """Every value the extraction should find on the page, read with the fixture's selectors."""
+    item_selector, selectors = FACTS[name]
+    soup = BeautifulSoup(page_html, "html.parser")
+    facts = []
+    for item in soup.select(item_selector):
+        for selector in selectors:
+            if selector.endswith("@href"):
+                link = item.select_one(selector[: -len("@href")])
+                facts.append(urljoin(BASE_URL, link["href"]))
+            else:
+                facts.extend(squash(element.get_text()) for element in item.select(selector))
+    return facts
+
+
+def plain_text(page_html: str) -> str:
+    """The page with only scripts, styles, comments and tags removed."""
+    return squash(re.sub(r"<[^>]+>", " ", normalize_html(page_html)))
+
+
+def parity(facts, text: str) -> float:
+    text = squash(text)
+    return sum(fact in text for fact in facts) / len(facts) if facts else 1.0
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(
+        f"{'page':<26} {'html':>7} {'text':>7} {'reduced':>8} {'saved':>7} {'cards':>6} "
+        f"{'ms/page':>8} {'parity (text)':>14} {'parity (reduced)':>17}"
+    )
+    totals = [0, 0, 0]
+    for name in sorted(FACTS):
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as file:
+            page_html = file.read()
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            page = reduce_html(page_html, base_url=BASE_URL)
+        ms = (time.perf_counter() - started) * 1000 / args.repeat
+
+        facts = page_facts(name, page_html)
+        text_tokens = estimate_tokens(plain_text(page_html))
+        totals[0] += page.original_tokens
+        totals[1] += text_tokens
+        totals[2] += page.tokens
+        print(
+            f"{name:<26} {page.original_tokens:>7} {text_tokens:>7} {page.tokens:>8} {page.reduction:>7.0%} {page.cards:>6} "
+            f"{ms:>8.2f} {parity(facts, plain_text(page_html)):>14.0%} {parity(facts, page.text):>17.0%}"
+        )
+    print(
+        f"{'total':<26} {totals[0]:>7} {totals[1]:>7} {totals[2]:>8} {1 - totals[2] / totals[0]:>7.0%}"
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
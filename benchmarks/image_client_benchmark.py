@@ -0,0 +1,171 @@
+"""
+Load test: API latency while images are generated, with the previous blocking
+image request and with the async pooled client.
+
+A local stub stands in for the Hugging Face API: it waits --render-seconds and
+returns a small PNG. The API runs under uvicorn on a SQLite database in a temporary
+directory, and GET /health/ is sampled while the image jobs run.
+
+Usage:
+    python -m benchmarks.image_client_benchmark [--images 8] [--render-seconds 1]
+"""
+import argparse
+import http.server
+import io
+import json
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+WORK_DIR = tempfile.mkdtemp(prefix="image-client-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'bench.db')}"
+os.environ.setdefault("HF_API_TOKEN", "benchmark")
+os.environ["IMAGE_PROVIDER"] = "huggingface"
+os.environ.setdefault("RATE_LIMIT_HUGGINGFACE", "1000/1")
+os.environ.setdefault("IMAGE_WORKER_CONCURRENCY", "4")
+sys.path.insert(0, os.getcwd())
+os.chdir(WORK_DIR)
+
+import httpx
+import uvicorn
+from PIL import Image
+
+import main
+from app import image_generator, image_worker
+from app.database import SessionLocal
+from app.models import Scholarship
+
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (40, 90, 160)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def serve_stub(render_seconds):
+    """Serve a fake inference API on a random local port and return (server, url)."""
+    body = png_bytes()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(render_seconds)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/models/stub"
+
+
+async def blocking_generate_image(prompt, name, provider):
+    """The previous behaviour: a synchronous HTTP request inside the async job."""
+    request = urllib.request.Request(
+        provider.api_url,
+        data=json.dumps({"inputs": prompt}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        content = response.read()
+    filename = image_generator._save_image(content, image_generator.IMAGES_DIR, name)
+    return f"/static/images/{filename}"
+
+
+def start_api():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def reset_rows(count, label):
+    db = SessionLocal()
+    try:
+        db.query(Scholarship).delete()
+        for i in range(count):
+            # Distinct titles per run, so no image is reused from the image store
+            db.add(Scholarship(program_title=f"{label} scholarship {i}", url="https://example.org"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def sample_health(client, base_url, until):
+    latencies = []
+    while not until():
+        start = time.perf_counter()
+        client.get(f"{base_url}/health/")
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.01)
+    return latencies
+
+
+def report(label, latencies, elapsed=None):
+    latencies = sorted(latencies)
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)]
+    line = f"{label:<22} /health/ p50 {statistics.median(latencies):>8.1f} ms  p99 {p99:>8.1f} ms  max {latencies[-1]:>8.1f} ms"
+    if elapsed is not None:
+        line += f"  images done in {elapsed:.1f}s"
+    print(line)
+
+
+def run(label, client, base_url, images):
+    reset_rows(images, label)
+    start = time.perf_counter()
+    jobs = client.post(f"{base_url}/generate-images/scholarships/").json()
+
+    def finished():
+        stats = main.job_queue.stats()
+        return stats["pending"] + stats["processing"] == 0
+
+    latencies = sample_health(client, base_url, finished)
+    report(label, latencies, time.perf_counter() - start)
+    statuses = {client.get(f"{base_url}/image-generation-status/{job['job_id']}").json()["status"] for job in jobs}
+    assert statuses == {"completed"}, statuses
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=8)
+    parser.add_argument("--render-seconds", type=float, default=1)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    stub, stub_url = serve_stub(args.render_seconds)
+    image_worker.image_worker.provider.api_url = stub_url
+    server, base_url = start_api()
+    try:
+        with httpx.Client(timeout=60) as client:
+            idle_until = time.perf_counter() + 2
+            report("idle", sample_health(client, base_url, lambda: time.perf_counter() > idle_until))
+
+            original = image_worker.generate_image
+            image_worker.generate_image = blocking_generate_image
+            run("blocking request", client, base_url, args.images)
+            image_worker.generate_image = original
+            run("async pooled client", client, base_url, args.images)
+    finally:
+        server.should_exit = True
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,102 @@
+"""
+Measure what the image variants save: bytes per list page when a client loads the
+thumbnails or the smallest width instead of the original PNGs, in WebP and AVIF,
+and the encoding throughput of the process pool.
+
+The sample images in `images/` are copied to a temporary directory and cycled to
+fill the pages.
+
+Usage:
+    python -m benchmarks.image_variants_benchmark [--page-size 10] [--images 32] [--workers 1 2 4]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.getcwd())
+
+from app.image_variants import VariantEncoder, encode_variants, VARIANT_WIDTHS, THUMBNAIL_SIZE
+
+
+def copy_samples(source_dir, work_dir, count):
+    samples = sorted(name for name in os.listdir(source_dir) if name.endswith(".png"))
+    if not samples:
+        raise SystemExit(f"No PNG samples in {source_dir}")
+    paths = []
+    for i in range(count):
+        path = os.path.join(work_dir, f"sample_{i}.png")
+        shutil.copyfile(os.path.join(source_dir, samples[i % len(samples)]), path)
+        paths.append(path)
+    return paths
+
+
+def page_bytes(paths, suffix):
+    return sum(os.path.getsize(os.path.splitext(path)[0] + suffix) for path in paths)
+
+
+def report_page(paths, page_size):
+    page = paths[:page_size]
+    original = page_bytes(page, ".png")
+    print(f"{'list page of ' + str(len(page)):<24} {'bytes':>10} {'vs PNG':>8}")
+    print(f"{'original PNG':<24} {original:>10,} {1:>7.1f}x")
+    smallest = min(VARIANT_WIDTHS)
+    for label, suffix in [
+        ("full-size WebP", ".webp"),
+        ("full-size AVIF", ".avif"),
+        (f"{smallest}px WebP", f"-{smallest}.webp"),
+        (f"{smallest}px AVIF", f"-{smallest}.avif"),
+        ("thumbnail WebP", "-thumb.webp"),
+        ("thumbnail AVIF", "-thumb.avif"),
+    ]:
+        size = page_bytes(page, suffix)
+        print(f"{label:<24} {size:>10,} {original / size:>7.1f}x")
+
+
+async def encode_all(encoder, paths):
+    await asyncio.gather(*(encoder.encode("/" + path) for path in paths))
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", default="images")
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="image-variants-benchmark-")
+    source_dir = os.path.abspath(args.samples)
+    os.chdir(work_dir)
+    paths = copy_samples(source_dir, ".", max(args.images, args.page_size))
+    paths = [os.path.normpath(path) for path in paths]
+
+    formats = ("webp", "avif")
+    start = time.perf_counter()
+    for path in paths:
+        encode_variants(path, VARIANT_WIDTHS, THUMBNAIL_SIZE, formats)
+    elapsed = time.perf_counter() - start
+    report_page(paths, args.page_size)
+    print()
+    print(f"{'encoding':<24} {'images/s':>10}")
+    print(f"{'in process, serial':<24} {len(paths) / elapsed:>10.1f}")
+
+    for workers in args.workers:
+        encoder = VariantEncoder(workers=workers)
+        encoder.formats = formats
+        # Start the pool outside the measurement
+        asyncio.run(encode_all(encoder, paths[:workers]))
+        start = time.perf_counter()
+        asyncio.run(encode_all(encoder, paths))
+        elapsed = time.perf_counter() - start
+        encoder.close()
+        print(f"{f'process pool, {workers} workers':<24} {len(paths) / elapsed:>10.1f}")
+
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    benchmark()
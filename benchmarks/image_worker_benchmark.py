@@ -0,0 +1,93 @@
+"""
+Measure image worker throughput in images/minute for each provider and level of
+parallelism, on a SQLite database in a temporary directory.
+
+The stub provider waits --stub-latency seconds per image and is limited by
+RATE_LIMIT_STUB (default here 1200/60), so the runs show where the rate limit,
+rather than parallelism, becomes the bound. The placeholder provider renders
+locally and has no limit. The images are written under a temporary directory
+that the script changes into; the setup runs in main() only, since the variant
+encoder's spawned processes import this module again.
+
+Usage:
+    python -m benchmarks.image_worker_benchmark [--images 200] [--concurrency 1 4 16 32]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("RATE_LIMIT_STUB", "1200/60")
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Scholarship
+from app.job_queue import JobQueue
+from app.image_providers import StubProvider, PlaceholderProvider
+from app.image_worker import ImageWorker
+
+
+def session_factory(path, concurrency):
+    # A connection per job in flight, plus the claims, lease extensions and stats polls
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"timeout": 30}, pool_size=concurrency + 4, max_overflow=concurrency
+    )
+
+    @event.listens_for(engine, "connect")
+    def _wal(conn, _):
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+async def run(work_dir, label, provider, concurrency, images):
+    path = os.path.join(work_dir, f"bench-{provider.name}-{concurrency}.db")
+    Session = session_factory(path, concurrency)
+    with Session() as db:
+        db.add_all(Scholarship(program_title=f"Benchmark Scholarship {i}", url="https://example.org") for i in range(images))
+        db.commit()
+        ids = [id for (id,) in db.query(Scholarship.id).all()]
+
+    queue = JobQueue(Session)
+    worker = ImageWorker(queue, provider=provider, session_factory=Session, concurrency=concurrency)
+    queue.enqueue("scholarship", ids)
+
+    start = time.perf_counter()
+    worker.start()
+    while True:
+        await asyncio.sleep(0.05)
+        stats = await asyncio.to_thread(queue.stats)
+        if stats["pending"] + stats["processing"] == 0:
+            break
+    elapsed = time.perf_counter() - start
+    await worker.stop()
+    assert stats["completed"] == images, stats
+    print(f"{label:<14} concurrency {worker.worker.concurrency:>3} {images:>5} images {elapsed:>7.2f}s {images / elapsed * 60:>9.0f} images/min")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--stub-latency", type=float, default=0.5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    work_dir = tempfile.mkdtemp(prefix="image-worker-benchmark-")
+    os.chdir(work_dir)
+
+    for concurrency in args.concurrency:
+        images = min(args.images, 20 * concurrency)
+        await run(work_dir, "stub", StubProvider(latency=args.stub_latency), concurrency, images)
+    for concurrency in args.concurrency:
+        await run(work_dir, "placeholder", PlaceholderProvider(), concurrency, args.images)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""
+Benchmark the batched scholarship ingestion against the old per-row path on SQLite.
+
+Usage:
+    python -m benchmarks.ingestion_benchmark [--rows 5000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Scholarship
+from app.ingestion import bulk_insert_scholarships, parse_date
+
+
+def make_items(count, offset=0):
+    return [
+        {
+            # Zero-padded, so no number reads as a year, which near-duplicate titles ignore
+            "program_title": f"Benchmark Scholarship {offset + i:05d}",
+            "funded_by": "Benchmark Foundation",
+            "degree_level": ["bachelor", "master", "doctorate"][i % 3],
+            "url": f"https://example.org/scholarships/{offset + i}",
+            "deadline": "2030-01-31",
+            "requirements": ["Canadian citizen", "GPA 3.0"],
+        }
+        for i in range(count)
+    ]
+
+
+def per_row_insert(db, items):
+    """The previous ingestion path: one SELECT and one add() per item."""
+    for item in items:
+        existing = db.query(Scholarship).filter(Scholarship.program_title == item["program_title"]).first()
+        if not existing:
+            db.add(Scholarship(
+                program_title=item["program_title"],
+                funded_by=item["funded_by"],
+                degree_level=item["degree_level"],
+                url=item["url"],
+                deadline=parse_date(item["deadline"]),
+                requirements=item["requirements"],
+            ))
+    db.commit()
+
+
+def run(label, rows, insert):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        # A fifth of the batch already exists, as on a typical re-scrape
+        with Session() as db:
+            bulk_insert_scholarships(db, make_items(rows // 5), "seed")
+            db.commit()
+
+        items = make_items(rows)
+        with Session() as db:
+            start = time.perf_counter()
+            insert(db, items)
+            elapsed = time.perf_counter() - start
+        engine.dispose()
+    print(f"{label:<22} {rows:>7} rows {elapsed:>8.3f}s {rows / elapsed:>12.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    run("per-row (old)", args.rows, per_row_insert)
+    for batch_size in (10, 50, 100, 500, 1000):
+        def batched(db, items, batch_size=batch_size):
+            bulk_insert_scholarships(db, items, "benchmark", batch_size=batch_size)
+            db.commit()
+        run(f"batched size={batch_size}", args.rows, batched)
+
+
+if __name__ == "__main__":
+    main()
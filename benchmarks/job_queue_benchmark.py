@@ -0,0 +1,152 @@
+"""
+Measure the durable image job queue on a SQLite file: throughput with several
+worker processes claiming from the same table, and recovery after a worker is
+killed in the middle of its jobs.
+
+Image generation is replaced by a sleep of --work-ms per job.
+
+Usage:
+    python -m benchmarks.job_queue_benchmark [--jobs 2000] [--workers 1 2 4] [--work-ms 5]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, ImageJob
+from app.job_queue import JobQueue, JobWorker
+
+
+def session_factory(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def _wal(conn, _):
+        conn.execute("PRAGMA journal_mode=WAL")
+
+    return sessionmaker(bind=engine)
+
+
+def make_queue(path, lease_seconds):
+    return JobQueue(session_factory(path), lease_seconds=lease_seconds, retry_delay_seconds=0)
+
+
+def worker_process(path, lease_seconds, work_ms, concurrency, hang=False):
+    """Run one JobWorker until the queue is drained. With `hang`, jobs never finish."""
+    logging.disable(logging.WARNING)
+    queue = make_queue(path, lease_seconds)
+
+    async def handler(job):
+        await asyncio.sleep(3600 if hang else work_ms / 1000)
+        return f"images/{job.entity_type}_{job.entity_id}.png"
+
+    async def main():
+        worker = JobWorker(queue, handler, concurrency=concurrency, poll_interval=0.05)
+        worker.start()
+        while True:
+            await asyncio.sleep(0.1)
+            stats = await asyncio.to_thread(queue.stats)
+            if stats["pending"] + stats["processing"] == 0:
+                break
+        await worker.stop()
+
+    asyncio.run(main())
+
+
+def setup(path, jobs):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    make_queue(path, 60).enqueue("scholarship", list(range(jobs)))
+
+
+def wait_drained(path, timeout=300):
+    queue = make_queue(path, 60)
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        stats = queue.stats()
+        if stats["pending"] + stats["processing"] == 0:
+            return stats
+        time.sleep(0.05)
+    raise TimeoutError(f"Queue not drained after {timeout}s: {queue.stats()}")
+
+
+def check_all_completed(path, jobs):
+    Session = session_factory(path)
+    with Session() as db:
+        completed = db.query(ImageJob).filter(ImageJob.status == "completed").count()
+        retried = db.query(ImageJob).filter(ImageJob.attempts > 1).count()
+    assert completed == jobs, f"{completed} of {jobs} jobs completed"
+    return retried
+
+
+def bench_throughput(jobs, workers, work_ms, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.db")
+        setup(path, jobs)
+        start = time.perf_counter()
+        processes = [
+            multiprocessing.Process(target=worker_process, args=(path, 60, work_ms, concurrency))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        check_all_completed(path, jobs)
+        print(f"{workers} worker(s) x {concurrency:<3} {jobs:>6} jobs {elapsed:>8.2f}s {jobs / elapsed:>10.1f} jobs/s")
+
+
+def bench_crash_recovery(jobs, lease_seconds, work_ms, concurrency):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.db")
+        setup(path, jobs)
+
+        # A worker claims a batch of jobs and is killed before finishing any of them
+        crashed = multiprocessing.Process(target=worker_process, args=(path, lease_seconds, work_ms, concurrency, True))
+        crashed.start()
+        queue = make_queue(path, lease_seconds)
+        while queue.stats()["processing"] == 0:
+            time.sleep(0.01)
+        time.sleep(0.2)
+        os.kill(crashed.pid, signal.SIGKILL)
+        crashed.join()
+        print(f"killed a worker holding {queue.stats()['processing']} leased jobs (lease {lease_seconds}s)")
+
+        start = time.perf_counter()
+        survivor = multiprocessing.Process(target=worker_process, args=(path, lease_seconds, work_ms, concurrency))
+        survivor.start()
+        wait_drained(path)
+        survivor.join()
+        elapsed = time.perf_counter() - start
+        retried = check_all_completed(path, jobs)
+        print(f"all {jobs} jobs completed {elapsed:.2f}s after the crash, {retried} needed a second attempt")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--work-ms", type=float, default=5)
+    parser.add_argument("--lease-seconds", type=float, default=2)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    for workers in args.workers:
+        bench_throughput(args.jobs, workers, args.work_ms, args.concurrency)
+    bench_crash_recovery(min(args.jobs, 200), args.lease_seconds, args.work_ms, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark the near-duplicate detection on a SQLite file of 100k scholarships, a
+share of which are copies of others as an aggregator would list them: another
+URL, a plural or singular title, a year or academic year added, the funder left
+out or punctuation changed. Copies leaving the funder out are on another site than
+their original, so they are not expected to be found. Pairs of listings of one
+scholarship on two aggregators, neither naming the funder but both giving its
+deadline, must be grouped. A share of the other rows are distinct items of the
+same funder and site as another row (another award type, "Graduate" and
+"Undergraduate"), which must not be grouped.
+
+Reports the time of the batch dedupe (index rebuild and grouping) with its recall
+and precision on the planted copies, then the time to check a scraped batch of 50
+items at ingestion through the LSH buckets, against comparing each item with
+every stored row.
+
+Usage:
+    python -m benchmarks.near_duplicate_benchmark [--rows 100000] [--copies 2000] [--listings 500] [--siblings 2000]
+"""
+import argparse
+import logging
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, Scholarship
+from app.near_duplicates import NearDuplicateIndex, features
+
+PROVINCES = ["Ontario", "Quebec", "Alberta", "Manitoba", "Nova Scotia", "British Columbia", "Saskatchewan"]
+FIELDS = ["Engineering", "Nursing", "Computer Science", "Biology", "Law", "Music", "Education", "Medicine",
+          "Architecture", "Agriculture", "Economics", "Journalism", "Mathematics", "Psychology", "Forestry"]
+AWARDS = ["Scholarship", "Bursary", "Award", "Fellowship", "Grant", "Entrance Award"]
+HOSTS = ["scholarshipscanada.com", "yconic.com", "scholarshipca.com", "studentawards.com"]
+
+
+def name(rng):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 9))).title()
+
+
+def original(rng, i):
+    donor = name(rng)
+    title = f"{donor} {rng.choice(PROVINCES)} {rng.choice(FIELDS)} {rng.choice(AWARDS)}"
+    return {
+        "program_title": title,
+        "funded_by": f"{donor} Foundation",
+        "url": f"https://{donor.lower()}.org/awards/{i}",
+        "deadline": date(2026, 1, 1) + timedelta(days=rng.randrange(365)),
+        "degree_level": rng.choice(["bachelor", "master", "doctorate"]),
+    }
+
+
+def sibling(rng, item):
+    """Another scholarship of the same funder listed on the same site."""
+    title = item["program_title"]
+    award = next(award for award in sorted(AWARDS, key=len, reverse=True) if title.endswith(award))
+    if rng.random() < 0.5:
+        title = title[:-len(award)] + rng.choice([other for other in AWARDS if other != award])
+    else:
+        title = title[:-len(award)] + "Undergraduate " + award
+    return dict(item, program_title=title, url=item["url"] + "-2")
+
+
+def copy(rng, item):
+    title = item["program_title"]
+    change = rng.randrange(4)
+    if change == 0:
+        title = title + "s" if not title.endswith("s") else title[:-1]
+    elif change == 1:
+        title = f"{title} {rng.choice(['2025', '2025-2026', '(2026/27)'])}"
+    elif change == 2:
+        title = title.replace(" ", " - ", 1)
+    funder = None if rng.random() < 0.3 else item["funded_by"]
+    slug = "-".join(title.lower().split())
+    return dict(item, program_title=title, funded_by=funder, url=f"https://{rng.choice(HOSTS)}/scholarship/{slug}")
+
+
+def listings(rng, item):
+    """The same scholarship on two aggregators, neither naming its funder, one leaving out the degree level."""
+    first, second = rng.sample(HOSTS, 2)
+    return [
+        dict(copy(rng, item), funded_by=None, url=f"https://{first}/scholarship/{rng.randrange(10 ** 6)}"),
+        dict(copy(rng, item), funded_by=None, url=f"https://{second}/scholarship/{rng.randrange(10 ** 6)}", degree_level=None),
+    ]
+
+
+def check_cross_site(index):
+    """The headline case: one scholarship on two aggregators without a funder is one item, unless the deadlines differ."""
+    listing = features("Global Leaders Scholarship", None, "https://yconic.com/s/1", date(2026, 3, 1), "master")
+    same = features("Global Leaders Scholarships 2026", None, "https://studentawards.com/s/2", date(2026, 3, 1), None)
+    other = features("Global Leaders Scholarship", None, "https://studentawards.com/s/3", date(2026, 9, 1), "master")
+    undated = features("Global Leaders Scholarship", None, "https://studentawards.com/s/4", None, "master")
+    assert index.same_item(listing, same), "listings of one scholarship on two aggregators were not matched"
+    assert not index.same_item(listing, other), "listings with other deadlines were matched"
+    assert not index.same_item(listing, undated), "a listing without a deadline was matched across sites"
+
+
+def seed(Session, rows, copies, pairs, siblings, rng):
+    items, planted = [], set()
+    for i in range(rows - copies - 2 * pairs - siblings):
+        items.append(original(rng, i))
+    for _ in range(siblings):
+        items.append(sibling(rng, items[rng.randrange(len(items))]))
+    for _ in range(copies):
+        source = rng.randrange(len(items))
+        items.append(copy(rng, items[source]))
+        if items[-1]["funded_by"]:
+            planted.add((source + 1, len(items)))
+    for _ in range(pairs):
+        items.extend(listings(rng, items[rng.randrange(rows - copies - 2 * pairs - siblings)]))
+        planted.add((len(items) - 1, len(items)))
+    with Session() as db:
+        for start in range(0, len(items), 10000):
+            db.bulk_insert_mappings(Scholarship, [dict(item, times_updated=0) for item in items[start:start + 10000]])
+        db.commit()
+    return items, planted
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--copies", type=int, default=2000)
+    parser.add_argument("--listings", type=int, default=500)
+    parser.add_argument("--siblings", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    rng = random.Random(11)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        items, planted = seed(Session, args.rows, args.copies, args.listings, args.siblings, rng)
+        index = NearDuplicateIndex()
+        check_cross_site(index)
+
+        with Session() as db:
+            started = time.perf_counter()
+            groups = index.find_duplicates(db, Scholarship)
+            elapsed = time.perf_counter() - started
+        found = {(group[0], id) for group in groups for id in group[1:]}
+        recall = len(found & planted) / len(planted)
+        precision = len(found & planted) / len(found) if found else 1.0
+        pairs = {(len(items) - 2 * i - 1, len(items) - 2 * i) for i in range(args.listings)}
+        print(f"batch dedupe of {args.rows} rows: {elapsed:.1f} s, {len(groups)} groups, "
+              f"recall {recall:.1%}, precision {precision:.1%} on {len(planted)} planted copies "
+              f"({len(found & pairs)}/{len(pairs)} aggregator pairs without a funder)")
+
+        batch = [copy(rng, rng.choice(items[:args.rows - args.copies - 2 * args.listings - args.siblings]))
+                 for _ in range(args.batch // 2)]
+        batch += [original(rng, args.rows + i) for i in range(args.batch - len(batch))]
+        with Session() as db:
+            started = time.perf_counter()
+            kept = index.filter_new(db, Scholarship, [dict(item) for item in batch], "benchmark")
+            lsh = time.perf_counter() - started
+
+            started = time.perf_counter()
+            stored = [features(*row) for row in db.query(
+                Scholarship.program_title, Scholarship.funded_by, Scholarship.url, Scholarship.deadline, Scholarship.degree_level
+            )]
+            scanned = [item for item in batch
+                       if not any(index.same_item(features(*item.values()), other) for other in stored)]
+            scan = time.perf_counter() - started
+        print(f"ingestion check of {args.batch} items: LSH buckets {lsh * 1000:.1f} ms ({len(batch) - len(kept)} dropped), "
+              f"full scan {scan * 1000:.0f} ms ({len(batch) - len(scanned)} dropped)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,139 @@
+"""
+Measure the overhead of RateLimiter.acquire() with many concurrent waiters, and
+compare it with the previous sliding-window limiter that polled with asyncio.sleep.
+
+The rate is set high enough that the run takes about a second, so the numbers
+show the cost of the limiter itself rather than the configured rate.
+
+Usage:
+    python -m benchmarks.rate_limiter_benchmark [--waiters 10000] [--rate 10000]
+"""
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+from datetime import datetime
+
+from app.rate_limiter import RateLimiter
+
+
+class SlidingWindowLimiter:
+    """The previous QueueManager limiter: a list of timestamps rebuilt on every check."""
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self.last_request_times = []
+
+    def can_make_request(self):
+        now = datetime.now()
+        self.last_request_times = [t for t in self.last_request_times
+                                   if (now - t).total_seconds() < self.period]
+        return len(self.last_request_times) < self.limit
+
+    def record_request(self):
+        self.last_request_times.append(datetime.now())
+
+    def time_until_next_available(self):
+        if len(self.last_request_times) < self.limit:
+            return 0
+        oldest_request = min(self.last_request_times)
+        return max(self.period - (datetime.now() - oldest_request).total_seconds(), 0)
+
+    async def acquire(self):
+        while not self.can_make_request():
+            await asyncio.sleep(self.time_until_next_available())
+        self.record_request()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def run_waiters(limiter, waiters):
+    """Start `waiters` tasks at once; return (elapsed seconds, whether they were released in FIFO order)."""
+    released = []
+
+    async def waiter(i):
+        await limiter.acquire()
+        released.append(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(waiter(i) for i in range(waiters)))
+    elapsed = time.perf_counter() - start
+    return elapsed, released == sorted(released)
+
+
+def bench_uncontended(calls):
+    limiter = RateLimiter(limit=10**9, period=1, burst=10**9)
+    start = time.perf_counter()
+    for _ in range(calls):
+        limiter.try_acquire()
+    per_call = (time.perf_counter() - start) / calls * 1e9
+    print(f"{'try_acquire (free slot)':<32} {per_call:>10.0f} ns/call")
+
+
+def bench_async(label, limiter, waiters, rate):
+    loop_lag = []
+
+    async def main():
+        # Measure how late the event loop runs a 1 ms timer while the waiters queue up
+        async def probe(stop):
+            while not stop.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                loop_lag.append((time.perf_counter() - start - 0.001) * 1000)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(stop))
+        result = await run_waiters(limiter, waiters)
+        stop.set()
+        await probe_task
+        return result
+
+    elapsed, fifo = asyncio.run(main())
+    ideal = waiters / rate
+    print(
+        f"{label:<32} {waiters:>6} waiters {elapsed:>7.2f}s (ideal {ideal:.2f}s) "
+        f"overhead {(elapsed - ideal) / waiters * 1e6:>8.1f} us/acquire  "
+        f"loop lag p50 {statistics.median(loop_lag):.2f} ms p99 {percentile(loop_lag, 0.99):.2f} ms  FIFO {fifo}"
+    )
+
+
+def bench_threads(threads, per_thread, rate):
+    limiter = RateLimiter(limit=rate, period=1)
+
+    def worker():
+        for _ in range(per_thread):
+            limiter.acquire_blocking()
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    total = threads * per_thread
+    print(f"{'acquire_blocking':<32} {threads:>3} threads x {per_thread} {elapsed:>7.2f}s (ideal {total / rate:.2f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--waiters", type=int, default=10000)
+    parser.add_argument("--rate", type=int, default=10000, help="requests/second allowed during the run")
+    parser.add_argument("--legacy-waiters", type=int, default=2000,
+                        help="waiters for the polling limiter, which is quadratic in the number of waiters")
+    args = parser.parse_args()
+
+    bench_uncontended(1_000_000)
+    bench_async("RateLimiter.acquire", RateLimiter(limit=args.rate, period=1), args.waiters, args.rate)
+    # The sliding window lets `limit` requests through per period; a 0.1s window gives the same rate
+    bench_async("sliding window + polling", SlidingWindowLimiter(args.rate // 10, 0.1), args.legacy_waiters, args.rate)
+    bench_threads(100, 20, args.rate // 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Load test of the list endpoints' read path: ORM entities validated through the
+response schemas (the previous path) against column tuples encoded with orjson,
+with and without a `fields=` projection.
+
+A small app serving both paths over a SQLite file runs under uvicorn in a thread,
+and a pool of concurrent httpx clients requests pages of 50 rows for a fixed time.
+The response cache is left out, so every request reads and serializes the rows
+(cache hits skip both paths alike).
+
+Usage:
+    python -m benchmarks.read_path_benchmark [--rows 2000] [--concurrency 16] [--seconds 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Response
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, News, Scholarship
+from app.pagination import keyset_page
+from app.schemas import NewsBase, ScholarshipBase
+from app.serialization import NEWS_FIELDS, SCHOLARSHIP_FIELDS, dump_rows, parse_fields, select_columns
+
+LIST_FIELDS = "title,published_at,image_url,source,url,category"
+
+
+def seed(Session, rows):
+    now = datetime.now()
+    with Session() as db:
+        db.bulk_insert_mappings(Scholarship, [
+            {
+                "program_title": f"Benchmark Scholarship {i}",
+                "funded_by": "Benchmark Foundation",
+                "url": f"https://example.org/scholarships/{i}",
+                "deadline": now + timedelta(days=i % 365),
+                "requirements": ["Canadian citizen or permanent resident", f"Minimum GPA of {i % 4}.0"],
+                "description": "Supports students in their first year of study with a stipend and mentoring. " * 4,
+                "degree_level": ("bachelor", "master", "doctorate")[i % 3],
+                "times_updated": 0,
+            }
+            for i in range(rows)
+        ])
+        db.bulk_insert_mappings(News, [
+            {
+                "title": f"Study in Canada program update {i}",
+                "description": "Canadian institutions have until November 10 to submit applications. " * 3,
+                "body": "The program supports international students with funding and mentoring. " * 60,
+                "published_at": now - timedelta(days=i % 365),
+                "source": "Global Affairs Canada",
+                "url": f"https://example.org/news/{i}",
+                "category": ("visa", "blog")[i % 2],
+                "times_updated": 0,
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def build_app(Session) -> FastAPI:
+    app = FastAPI()
+    adapters = {Scholarship: TypeAdapter(list[ScholarshipBase]), News: TypeAdapter(list[NewsBase])}
+    schema_fields = {Scholarship: SCHOLARSHIP_FIELDS, News: NEWS_FIELDS}
+    models = {"scholarships": Scholarship, "news": News}
+
+    @app.get("/orm/{table}")
+    def orm_page(table: str, limit: int = 50):
+        model = models[table]
+        with Session() as db:
+            rows, _ = keyset_page(db.query(model), [model.id], None, limit)
+            adapter = adapters[model]
+            return Response(adapter.dump_json(adapter.validate_python(rows, from_attributes=True)), media_type="application/json")
+
+    @app.get("/lean/{table}")
+    def lean_page(table: str, limit: int = 50, fields: Optional[str] = None):
+        model = models[table]
+        selected = parse_fields(fields, schema_fields[model])
+        with Session() as db:
+            rows, _ = keyset_page(db.query(*select_columns(model, selected, [model.id])), [model.id], None, limit)
+            return Response(dump_rows(selected, rows), media_type="application/json")
+
+    return app
+
+
+def serve(app):
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+async def load(url, concurrency, seconds):
+    latencies = []
+    size = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker(client):
+        nonlocal size
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+            size = len(response.content)
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency)) as client:
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+    return len(latencies) / seconds, statistics.median(latencies) * 1000, size
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, args.rows)
+        server, thread, base_url = serve(build_app(Session))
+        try:
+            for label, path in [
+                ("scholarships, ORM + schema", "/orm/scholarships"),
+                ("scholarships, lean", "/lean/scholarships"),
+                ("news, ORM + schema", "/orm/news"),
+                ("news, lean", "/lean/news"),
+                ("news, lean, list fields", f"/lean/news?fields={LIST_FIELDS}"),
+            ]:
+                rate, p50, size = asyncio.run(load(base_url + path, args.concurrency, args.seconds))
+                print(f"{label:<30} {rate:>8.0f} req/s  p50 {p50:>7.1f} ms  {size / 1024:>7.1f} KiB/response")
+        finally:
+            server.should_exit = True
+            thread.join()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    benchmark()
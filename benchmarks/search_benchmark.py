@@ -0,0 +1,180 @@
+"""
+Benchmark the full-text search index on 100k documents: the time to build it from
+the database, the latency of a mix of queries (single words, phrases of several
+words, prefixes as typed in a search box, with and without filters) and the time
+to index a batch of newly scraped rows.
+
+The rows are split between scholarships and news articles and their text is drawn
+from a fixed vocabulary, so common words match a large share of the index and rare
+ones a handful of documents. The target is a p95 under 20 ms over all queries.
+Queries matching more than SEARCH_MAX_CANDIDATES documents only rank the newest of
+them; for each query the benchmark also reports its p95 when every match is ranked,
+and the BM25 score of its capped top 20 as a share of the uncapped top 20's.
+
+Usage:
+    python -m benchmarks.search_benchmark [--documents 100000] [--queries 2000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+sys.path.insert(0, os.getcwd())
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Base, News, Scholarship
+from app.search import KIND_BITS, RANK_WEIGHTS, SearchIndex, match_query, query_terms
+
+FIELDS = ["engineering", "nursing", "computer science", "biology", "law", "music", "education", "medicine",
+          "architecture", "agriculture", "economics", "journalism", "mathematics", "psychology", "forestry"]
+PROVINCES = ["Ontario", "Quebec", "Alberta", "Manitoba", "Nova Scotia", "British Columbia", "Saskatchewan"]
+AWARDS = ["Scholarship", "Bursary", "Award", "Fellowship", "Grant", "Entrance Award"]
+WORDS = ("students study program funding application university college research tuition graduate "
+         "international indigenous women leadership community volunteer merit financial need renewable "
+         "permit visa immigration deadline eligible citizen resident mentoring stipend").split()
+QUERIES = [
+    {"text": "engineering"},
+    {"text": "nursing bursary"},
+    {"text": "computer science scholarship ontario"},
+    {"text": "indigenous women leadership"},
+    {"text": "schol"},
+    {"text": "forestry grant alb"},
+    {"text": "study permit"},
+    {"text": "grants for women in engineering"},
+    {"text": "music", "kind": "scholarships", "degree_level": "master"},
+    {"text": "visa", "kind": "news", "category": "visa"},
+    {"text": "medicine", "date_from": date.today(), "date_to": date.today() + timedelta(days=60)},
+]
+
+
+def text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(Session, documents, rng, start=0):
+    now = datetime.now()
+    with Session() as db:
+        for first in range(start, start + documents, 10000):
+            ids = range(first, min(first + 10000, start + documents))
+            db.bulk_insert_mappings(Scholarship, [
+                {
+                    "program_title": f"{rng.choice(PROVINCES)} {rng.choice(FIELDS).title()} {rng.choice(AWARDS)} {i}",
+                    "funded_by": f"{rng.choice(PROVINCES)} Foundation",
+                    "url": f"https://example.org/scholarships/{i}",
+                    "deadline": now + timedelta(days=i % 365),
+                    "requirements": [text(rng, 6), text(rng, 6)],
+                    "description": f"Open to {rng.choice(FIELDS)} students. " + text(rng, 40),
+                    "degree_level": ("bachelor", "master", "doctorate")[i % 3],
+                    "times_updated": 0,
+                }
+                for i in ids if i % 2 == 0
+            ])
+            db.bulk_insert_mappings(News, [
+                {
+                    "title": f"{rng.choice(PROVINCES)} changes {rng.choice(WORDS)} rules for {rng.choice(FIELDS)} {i}",
+                    "description": text(rng, 20),
+                    "body": text(rng, 200),
+                    "published_at": now - timedelta(days=i % 365),
+                    "source": "Global Affairs Canada",
+                    "url": f"https://example.org/news/{i}",
+                    "category": ("visa", "blog")[i // 2 % 2],
+                    "times_updated": 0,
+                }
+                for i in ids if i % 2 == 1
+            ])
+        db.commit()
+
+
+def percentile(values, fraction):
+    return sorted(values)[int(len(values) * fraction)] * 1000
+
+
+def timed(index, query, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        results = index.search(**query)
+        timings.append(time.perf_counter() - started)
+    return results, timings
+
+
+def score(index, text, results):
+    """The total BM25 score of `results`, unrounded, as the search computed it."""
+    if not results:
+        return 0.0
+    conn = index._connection()
+    terms = query_terms(text)
+    expression = match_query(terms)
+    if conn.execute("SELECT 1 FROM search_index WHERE search_index MATCH ? LIMIT 1", (expression,)).fetchone() is None:
+        expression = match_query(terms, prefix=True)
+    rowids = [result["id"] * 2 + KIND_BITS[result["kind"]] for result in results]
+    return -sum(value for (value,) in conn.execute(
+        f"SELECT bm25(search_index, {RANK_WEIGHTS}) FROM search_index WHERE search_index MATCH ? "
+        f"AND rowid IN ({', '.join('?' * len(rowids))})", (expression, *rowids),
+    ))
+
+
+def benchmark():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+        seed(Session, args.documents, rng)
+        index = SearchIndex(path=os.path.join(tmp, "search.db"), session_factory=Session)
+        uncapped = SearchIndex(path=index.path, session_factory=Session, max_candidates=0)
+
+        started = time.perf_counter()
+        counts = index.rebuild()
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(index.path) / 1024 / 1024
+        print(f"rebuild: {sum(counts.values())} documents {counts} in {elapsed:.1f} s, {size:.0f} MiB")
+
+        for query in QUERIES:
+            index.search(**query)
+            uncapped.search(**query)
+        print(f"max candidates: {index.max_candidates}")
+        print(f"{'query':<48} {'results':>7} {'p50 ms':>8} {'p95 ms':>8} {'uncapped p95':>12} {'top score':>9}")
+        latencies = []
+        runs = args.queries // len(QUERIES)
+        for query in QUERIES:
+            results, timings = timed(index, query, runs)
+            every, every_timings = timed(uncapped, query, max(runs // 10, 1))
+            latencies.extend(timings)
+            label = ", ".join(f"{key}={value}" for key, value in query.items())
+            kept = score(index, query["text"], results) / score(index, query["text"], every) if every else 1.0
+            print(f"{label[:48]:<48} {len(results):>7} {percentile(timings, 0.5):>8.2f} {percentile(timings, 0.95):>8.2f} "
+                  f"{percentile(every_timings, 0.95):>12.2f} {kept:>9.1%}")
+        p95 = percentile(latencies, 0.95)
+        print(f"{'all queries':<48} {'':>7} {percentile(latencies, 0.5):>8.2f} {p95:>8.2f}")
+        print(f"p95 target of 20 ms at {args.documents} documents: {'met' if p95 < 20 else 'missed'}")
+
+        seed(Session, 1000, rng, start=args.documents)
+        with Session() as db:
+            new = {model: list(db.scalars(select(model.id).order_by(model.id.desc()).limit(500))) for model in (Scholarship, News)}
+            started = time.perf_counter()
+            for model, ids in new.items():
+                index.refresh(db, model, ids)
+            print(f"refresh: {sum(map(len, new.values()))} inserted documents in {(time.perf_counter() - started) * 1000:.0f} ms")
+            seed(Session, 1000, rng, start=args.documents + 1000)
+            started = time.perf_counter()
+            added = index.index_new(db, Scholarship) + index.index_new(db, News)
+        print(f"index_new: {added} documents missing from the index in {(time.perf_counter() - started) * 1000:.0f} ms")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -1,27 +1,65 @@
 import asyncio
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query, Request, Response
 from sqlalchemy.orm import Session
 from concurrent.futures import ThreadPoolExecutor
-from app.database import get_db
+from app.database import database, get_db, get_read_db, use_primary
 from app.scraper import scrape_site, scrape_news_site, fetch_null_fields, fetch_body
-from app.models import Scholarship, News
-from app.schemas import ScholarshipBase, NewsBase
+from app.models import Scholarship, News, ScrapeSource
+from app.schemas import ScholarshipBase, NewsBase, ScrapeSourceBase, ScrapeSourceCreate, ExtractionRules
 import logging
-from app.image_generator import generate_image
 import os
-from app.queue_manager import QueueManager, JobStatus
+from app.queue_manager import queue_manager
+from app.job_queue import job_queue
+from app.image_worker import image_worker
+from app.image_store import image_store, remove_image_files
+from app.image_manifest import image_manifest
+from app.bulk_delete import bulk_deleter
+from app.enrichment import batch_enricher, EnrichmentItem
+from app.orchestrator import ScrapeOrchestrator
+from app.scheduler import ScrapeScheduler
+from app.extraction_cache import extraction_cache
+from app.page_fetcher import fetch_stats
+from app.html_reducer import reducer_stats
+from app.extraction_rules import rule_engine
+from app.export import dataset_exporter
+from app.search import search_index
+from app.near_duplicates import near_duplicate_index
+from app.serialization import SCHOLARSHIP_FIELDS, NEWS_FIELDS, parse_fields, select_columns, dump_rows, dump_row
+from app.browser_pool import browser_pool
+import orjson
 import time
-from typing import List
-from fastapi.staticfiles import StaticFiles
-from datetime import datetime
+from typing import List, Literal, Optional
+from app.static_files import NegotiatingStaticFiles
+from datetime import datetime, date, timedelta
+from app.pagination import encode_cursor, decode_cursor, keyset_page
+from app.response_cache import response_cache, CachedResponse
 
 
 # Create necessary directories at startup
 os.makedirs("static/images", exist_ok=True)
 
-app = FastAPI()
-queue_manager = QueueManager()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if database.create_tables:
+        await asyncio.to_thread(database.create_all)
+    image_worker.start()
+    image_manifest.start()
+    scheduler.start()
+    search_index.start()
+    yield
+    await scheduler.stop()
+    await search_index.stop()
+    await image_worker.stop()
+    await image_manifest.stop()
+    await asyncio.to_thread(bulk_deleter.close)
+    # Close the pooled browsers on shutdown
+    await asyncio.to_thread(browser_pool.close)
+    await asyncio.to_thread(database.dispose)
+
+app = FastAPI(lifespan=lifespan)
+orchestrator = ScrapeOrchestrator()
 
 # List of websites to scrape
 websites = [
@@ -42,18 +80,22 @@ news_websites = [
     'https://www.educanada.ca/scholarships-bourses/index.aspx?lang=eng',
 ]
 
-def run_scraper():
-    """Run the scraper for all sites and use a DB session."""
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        db: Session = next(get_db())  # Create a DB session
-        executor.map(lambda site: scrape_site(site, db), websites)
+# The lists above seed the source registry; sources are then scraped when due
+scheduler = ScrapeScheduler(
+    orchestrator,
+    {"scholarships": scrape_site, "news": scrape_news_site},
+    seeds={"scholarships": websites, "news": news_websites},
+)
 
 
-def run_news_scraper():
-    """Run the news scraper for all sites and use a DB session."""
-    with ThreadPoolExecutor(max_workers=3) as executor:
-        db: Session = next(get_db())  # Create a DB session
-        executor.map(lambda site: scrape_news_site(site, db), news_websites)
+async def run_scraper():
+    """Scrape every registered scholarship source now, each worker using its own DB session."""
+    return await scheduler.run("scholarships", force=True)
+
+
+async def run_news_scraper():
+    """Scrape every registered news source now, each worker using its own DB session."""
+    return await scheduler.run("news", force=True)
 
 def run_fetch_description(url):
     """ Run the scraper to get the descritions. """
@@ -72,19 +114,127 @@ def health_check():
         "message": "API is healthy!",
         "status": "ok"
     }
+def paginate(query, order: str, columns, types, cursor: Optional[str], limit: int, skip: int = 0):
+    """
+    Return one keyset page of `query` and the cursor of the next page, if any.
+
+    `skip` is only honoured without a cursor, for clients still using offset paging.
+    """
+    try:
+        cursor_values = decode_cursor(cursor, order, types) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    offset = skip if cursor_values is None else 0
+    rows, next_values = keyset_page(query, columns, cursor_values, limit, offset)
+    return rows, encode_cursor(order, next_values) if next_values else None
+
+
+def requested_fields(fields: Optional[str], allowed: List[str]) -> List[str]:
+    """Parse a `fields=` projection, answering 400 for unknown fields."""
+    try:
+        return parse_fields(fields, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def cached_json_response(request: Request, db: Session, tags: List[str], build) -> Response:
+    """
+    Serve a JSON response from the response cache, building it with `build()` on a miss.
+
+    `build` returns the JSON body and extra headers, read through `db`; right
+    after a write to the tags it reads the primary, not a replica that may lag.
+    Clients sending a matching If-None-Match header get a 304 without the
+    database being touched.
+    """
+    key = response_cache.make_key(request.url.path, request.query_params.multi_items())
+    cached, generations, recently_written = response_cache.get(key, tags)
+    if cached is None:
+        if recently_written:
+            use_primary(db)
+        body, headers = build()
+        cached = response_cache.set(key, CachedResponse(body, headers), generations)
+
+    headers = {"ETag": cached.etag, **cached.headers}
+    if cached.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
 @app.get("/scholarships/", response_model=list[ScholarshipBase])
-def get_scholarships(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Retrieve a list of scholarships with optional pagination."""
-    scholarships = db.query(Scholarship).offset(skip).limit(limit).all()
-    return scholarships
+def get_scholarships(
+    request: Request,
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    order: Literal["id", "deadline"] = "id",
+    degree_level: Optional[Literal["bachelor", "master", "doctorate"]] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    fields: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Retrieve a page of scholarships, optionally filtered by degree level and deadline range.
+
+    Pass the X-Next-Cursor response header back as `cursor` to get the next page.
+    Ordering by deadline leaves out scholarships without a deadline. `fields` is a
+    comma-separated list of the fields to return (id is always included).
+    """
+    selected = requested_fields(fields, SCHOLARSHIP_FIELDS)
+    sort_columns = [Scholarship.deadline, Scholarship.id] if order == "deadline" else [Scholarship.id]
+
+    def build():
+        query = db.query(*select_columns(Scholarship, selected, sort_columns))
+        if degree_level:
+            query = query.filter(Scholarship.degree_level == degree_level)
+        if deadline_from:
+            query = query.filter(Scholarship.deadline >= datetime.combine(deadline_from, datetime.min.time()))
+        if deadline_to:
+            query = query.filter(Scholarship.deadline < datetime.combine(deadline_to + timedelta(days=1), datetime.min.time()))
+
+        if order == "deadline":
+            query = query.filter(Scholarship.deadline != None)
+            rows, next_cursor = paginate(query, order, sort_columns, [datetime, int], cursor, limit, skip)
+        else:
+            rows, next_cursor = paginate(query, order, sort_columns, [int], cursor, limit, skip)
+        return dump_rows(selected, rows), {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return cached_json_response(request, db, ["scholarships:list"], build)
+
+@app.get("/export/scholarships")
+def export_scholarships(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    degree_level: Optional[Literal["bachelor", "master", "doctorate"]] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    after_id: int = Query(0, ge=0),
+):
+    """
+    Stream every scholarship matching the filters as NDJSON or CSV, in id order.
+
+    Pass the id of the last row received as `after_id` to resume an interrupted export.
+    """
+    criteria = [Scholarship.id > after_id]
+    if degree_level:
+        criteria.append(Scholarship.degree_level == degree_level)
+    if deadline_from:
+        criteria.append(Scholarship.deadline >= datetime.combine(deadline_from, datetime.min.time()))
+    if deadline_to:
+        criteria.append(Scholarship.deadline < datetime.combine(deadline_to + timedelta(days=1), datetime.min.time()))
+    return dataset_exporter.response(Scholarship, SCHOLARSHIP_FIELDS, criteria, format, "scholarships")
 
 @app.get("/scholarships/{scholarship_id}", response_model=ScholarshipBase)
-async def get_scholarship(scholarship_id: int, db: Session = Depends(get_db)):
+async def get_scholarship(scholarship_id: int, request: Request, db: Session = Depends(get_read_db)):
     logger.info(f"Fetching scholarship {scholarship_id}")
-    scholarship = db.query(Scholarship).filter(Scholarship.id == scholarship_id).first()
-    if not scholarship:
-        raise HTTPException(status_code=404, detail="Scholarship not found")
-    return scholarship
+
+    def build():
+        scholarship = db.query(*select_columns(Scholarship, SCHOLARSHIP_FIELDS)).filter(Scholarship.id == scholarship_id).first()
+        if not scholarship:
+            raise HTTPException(status_code=404, detail="Scholarship not found")
+        return dump_row(SCHOLARSHIP_FIELDS, scholarship), {}
+
+    return cached_json_response(request, db, [f"scholarships:{scholarship_id}"], build)
 
 @app.get("/start-scraping-scholarships/")
 def start_scraping(background_tasks: BackgroundTasks):
@@ -92,8 +242,95 @@ def start_scraping(background_tasks: BackgroundTasks):
     background_tasks.add_task(run_scraper)
     return {"message": "Scraping started for scholarships in the background."}
 
+@app.get("/scraping-reports/")
+def get_scraping_reports():
+    """Return the report of the last scholarship and news scraping runs."""
+    return orchestrator.last_reports
+
+@app.get("/scraping-stats/")
+def get_scraping_stats(db: Session = Depends(get_db)):
+    """Return the extraction cache and conditional fetch counters."""
+    return {
+        "extraction_cache": extraction_cache.stats(),
+        "page_fetch": fetch_stats.snapshot(),
+        "html_reducer": reducer_stats.snapshot(),
+        "browser_pool": browser_pool.stats,
+        "response_cache": response_cache.stats(),
+        "image_jobs": job_queue.stats(),
+        "image_worker": image_worker.stats(),
+        "image_store": image_store.stats(db),
+        "rate_limits": queue_manager.stats(),
+        "scheduler": scheduler.stats(db),
+        "enrichment": batch_enricher.stats(),
+        "extraction_rules": rule_engine.stats(db),
+        "search": search_index.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "database": database.stats(),
+    }
+
+
+@app.get("/sources/", response_model=list[ScrapeSourceBase])
+def get_sources(db: Session = Depends(get_db)):
+    """List the registered scrape sources with their refresh interval and next run."""
+    return db.query(ScrapeSource).order_by(ScrapeSource.id).all()
+
+
+@app.post("/sources/", response_model=ScrapeSourceBase)
+def add_source(source: ScrapeSourceCreate, db: Session = Depends(get_db)):
+    """Register a scrape source; it is scraped on the next scheduler tick."""
+    registered = scheduler.register(db, source.url, source.kind, source.refresh_interval)
+    if source.extraction_rules is not None:
+        set_source_rules(db, registered, source.extraction_rules)
+    return registered
+
+
+def set_source_rules(db: Session, source: ScrapeSource, rules: Optional[ExtractionRules]) -> ScrapeSource:
+    try:
+        return rule_engine.set_rules(db, source, rules.model_dump(exclude_none=True) if rules else None)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.put("/sources/{source_id}/rules", response_model=ScrapeSourceBase)
+def put_source_rules(source_id: int, rules: ExtractionRules, db: Session = Depends(get_db)):
+    """Set the selector rules that extract the source's items without the LLM."""
+    source = db.query(ScrapeSource).filter(ScrapeSource.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return set_source_rules(db, source, rules)
+
+
+@app.delete("/sources/{source_id}/rules", response_model=ScrapeSourceBase)
+def delete_source_rules(source_id: int, db: Session = Depends(get_db)):
+    """Remove the selector rules of a source; it goes back to LLM extraction."""
+    source = db.query(ScrapeSource).filter(ScrapeSource.id == source_id).first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source not found")
+    return set_source_rules(db, source, None)
+
+
+@app.delete("/sources/{source_id}")
+def delete_source(source_id: int, db: Session = Depends(get_db)):
+    """Remove a scrape source from the registry. Items already scraped from it stay."""
+    deleted = db.query(ScrapeSource).filter(ScrapeSource.id == source_id).delete(synchronize_session=False)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Source not found")
+    db.commit()
+    return {"message": "Source deleted successfully."}
+
 @app.post("/fetch-scholarship/null-fields/")
-def fetch_scholarship_null_fields(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+def fetch_scholarship_null_fields(
+    background_tasks: BackgroundTasks,
+    batched: bool = True,
+    db: Session = Depends(get_db),
+):
+    """
+    Fill in missing descriptions, requirements and degree levels in the background.
+
+    By default the scholarships are enriched in batches, many per LLM call; with
+    `batched=false` every scholarship gets its own scrape and LLM call.
+    """
     # Get all scholarships without descriptions, requirements, or degree levels
     scholarships = db.query(Scholarship).filter(
         (Scholarship.description == None) | 
@@ -104,6 +341,7 @@ def fetch_scholarship_null_fields(background_tasks: BackgroundTasks, db: Session
     logger.info(f"Found {len(scholarships)} scholarships with missing fields")
 
     # Process each scholarship in the background
+    items = []
     for scholarship in scholarships:
         # Check if the number of times updated is greater than 3
         if scholarship.times_updated and scholarship.times_updated > 2:
@@ -121,7 +359,9 @@ def fetch_scholarship_null_fields(background_tasks: BackgroundTasks, db: Session
             null_fields.append("degree_level")
 
         # Call fetch_null_fields with the appropriate null_fields list
-        if null_fields:
+        if null_fields and batched:
+            items.append(EnrichmentItem(scholarship.id, scholarship.url, null_fields))
+        elif null_fields:
             background_tasks.add_task(
                 fetch_null_fields, 
                 scholarship.url, 
@@ -130,131 +370,39 @@ def fetch_scholarship_null_fields(background_tasks: BackgroundTasks, db: Session
                 null_fields
             )
 
+    if items:
+        background_tasks.add_task(batch_enricher.run, items)
     return {"message": "Fetching missing fields started in the background."}
 
-async def process_image_generation(job_id: str, type: str, id: int, db: Session):
-    """
-    Process image generation for scholarships or news articles.
-    """
-    async def generate_and_update_image(entity, prompt, entity_type):
-        """Generate an image and update the entity with the image URL."""
-        try:
-            # Wait until we can make a request
-            while not queue_manager.can_make_request():
-                wait_time = queue_manager.time_until_next_available()
-                logger.info(f"Rate limit reached. Waiting {wait_time:.2f} seconds before next request")
-                await asyncio.sleep(wait_time + 1)  # Add 1 second buffer
-            
-            # Record this request
-            queue_manager.record_request()
-            logger.info(f"Generating image for {entity_type} {id}")
-            
-            # Generate the image
-            image_url = generate_image(prompt, id)
-            
-            # Update entity with the generated image URL
-            entity.image_url = image_url
-            db.commit()
-            logger.info(f"Successfully generated image for {entity_type} {id}")
-            
-            # Update the job status to completed
-            queue_manager.update_job(job_id, JobStatus.COMPLETED, image_path=image_url)
-        except Exception as e:
-            logger.error(f"Error generating image for {entity_type} {id}: {str(e)}")
-            raise e
-
-    logger.info(f"Starting image generation process for job {job_id} ({type.capitalize()} {id})")
-    
-    try:
-        queue_manager.update_job(job_id, JobStatus.PROCESSING)
-        
-        # Fetch the entity based on type
-        if type == "scholarship":
-            entity = db.query(Scholarship).filter(Scholarship.id == id).first()
-            if not entity:
-                raise Exception(f"Scholarship {id} not found")
-            prompt = (
-                f"An image representing the title \"{entity.program_title}\". "
-                "Images should not contain any text or logos. If the image or title is not relevant, "
-                "you can just generate a random college student or group of students."
-            )
-            await generate_and_update_image(entity, prompt, "scholarship")
-        
-        elif type == "news":
-            entity = db.query(News).filter(News.id == id).first()
-            if not entity:
-                raise Exception(f"News article {id} not found")
-            prompt = (
-                f"An image representing the title \"{entity.title}\". "
-                "Images should not contain any text or logos. If the image or title is not relevant, "
-                "you can just generate a random news image."
-            )
-            await generate_and_update_image(entity, prompt, "news")
-        
-        else:
-            raise Exception(f"Invalid type '{type}'")
-    
-    except Exception as e:
-        logger.error(f"Job {job_id} failed: {str(e)}")
-        queue_manager.update_job(job_id, JobStatus.FAILED, error=str(e))
-
 @app.post("/generate-images/scholarships/")
-async def generate_images_for_scholarships(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-) -> List[dict]:
+async def generate_images_for_scholarships(db: Session = Depends(get_db)) -> List[dict]:
     logger.info("Received request to generate images for scholarships")
     
     # Get scholarships without images
-    scholarships = db.query(Scholarship).filter(Scholarship.image_url == None).all()
-    logger.info(f"Found {len(scholarships)} scholarships without images")
-    
-    job_ids = []
-    for scholarship in scholarships:
-        job_id = queue_manager.create_job(scholarship.id)
-        background_tasks.add_task(
-            process_image_generation,
-            job_id,
-            "scholarship",
-            scholarship.id,
-            db
-        )
-        job_ids.append({"scholarship_id": scholarship.id, "job_id": job_id})
-        logger.info(f"Queued job {job_id} for scholarship {scholarship.id}")
+    scholarship_ids = [id for (id,) in db.query(Scholarship.id).filter(Scholarship.image_url == None).all()]
+    logger.info(f"Found {len(scholarship_ids)} scholarships without images")
     
-    return job_ids
+    job_ids = await asyncio.to_thread(job_queue.enqueue, "scholarship", scholarship_ids)
+    image_worker.notify()
+    return [{"scholarship_id": id, "job_id": job_ids[id]} for id in scholarship_ids]
 
 
 @app.post("/generate-images/news/")
-async def generate_images_for_news(
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-) -> List[dict]:
+async def generate_images_for_news(db: Session = Depends(get_db)) -> List[dict]:
     logger.info("Received request to generate images for news articles")
     
     # Get news articles without images
-    news = db.query(News).filter(News.image_url == None).all()
-    logger.info(f"Found {len(news)} news articles without images")
-    
-    job_ids = []
-    for article in news:
-        job_id = queue_manager.create_job(article.id)
-        background_tasks.add_task(
-            process_image_generation,
-            job_id,
-            "news",
-            article.id,
-            db
-        )
-        job_ids.append({"news_id": article.id, "job_id": job_id})
-        logger.info(f"Queued job {job_id} for news article {article.id}")
+    news_ids = [id for (id,) in db.query(News.id).filter(News.image_url == None).all()]
+    logger.info(f"Found {len(news_ids)} news articles without images")
     
-    return job_ids
+    job_ids = await asyncio.to_thread(job_queue.enqueue, "news", news_ids)
+    image_worker.notify()
+    return [{"news_id": id, "job_id": job_ids[id]} for id in news_ids]
 
 @app.get("/image-generation-status/{job_id}")
 async def get_generation_status(job_id: str):
     logger.info(f"Checking status for job {job_id}")
-    job_status = queue_manager.get_job_status(job_id)
+    job_status = await asyncio.to_thread(job_queue.get, job_id)
     if not job_status:
         logger.warning(f"Job {job_id} not found")
         raise HTTPException(status_code=404, detail="Job not found")
@@ -262,36 +410,122 @@ async def get_generation_status(job_id: str):
 
 
 @app.delete('/remove/outdated-scholarships/')
-async def remove_outdated_scholarships(db: Session = Depends(get_db)):
-    """Remove scholarships that are outdated."""
-    scholarships = db.query(Scholarship).all()
-    for scholarship in scholarships:
-        if scholarship.deadline and scholarship.deadline < datetime.now():
-            # Check if the scholarship has an image and delete it
-            if scholarship.image_url:
-                image_path = os.path.join("static", scholarship.image_url)
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-            db.delete(scholarship)
+def remove_outdated_scholarships(db: Session = Depends(get_db)):
+    """Remove scholarships whose deadline has passed."""
+    result = bulk_deleter.delete(
+        db,
+        Scholarship,
+        Scholarship.deadline < datetime.now(),
+        order_by=[Scholarship.deadline, Scholarship.id],
+    )
+    response_cache.invalidate("scholarships")
+    image_manifest.mark_dirty()
+    return {"message": "Outdated scholarships removed successfully", **result}
+
+
+@app.post('/remove/near-duplicates/{kind}')
+def remove_near_duplicates(kind: Literal["scholarships", "news"], dry_run: bool = True, db: Session = Depends(get_db)):
+    """
+    Find the stored scholarships or news articles that are near duplicates of one
+    another and, with `dry_run=false`, delete all but the oldest row of each group.
 
-    db.commit()
-    return {"message": "Outdated scholarships removed successfully"}
+    Rebuilds the near-duplicate index of the table on the way, e.g. after an upgrade.
+    """
+    model = Scholarship if kind == "scholarships" else News
+    groups = near_duplicate_index.find_duplicates(db, model)
+    duplicates = [id for group in groups for id in group[1:]]
+    result = {"groups": len(groups), "duplicates": len(duplicates), "examples": groups[:20], "dry_run": dry_run}
+    if dry_run or not duplicates:
+        return result
+    result.update(bulk_deleter.delete(db, model, model.id.in_(duplicates)))
+    response_cache.invalidate(kind)
+    image_manifest.mark_dirty()
+    return result
 
 
 @app.get("/news/", response_model=list[NewsBase])
-def get_news(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
-    """Retrieve a list of news articles with optional pagination."""
-    news = db.query(News).offset(skip).limit(limit).all()
-    return news
+def get_news(
+    request: Request,
+    limit: int = Query(10, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    category: Optional[Literal["visa", "blog"]] = None,
+    fields: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Retrieve a page of news articles, optionally filtered by category (see get_scholarships
+    for cursors and `fields`). List views can leave out `body` with `fields`.
+    """
+    selected = requested_fields(fields, NEWS_FIELDS)
+
+    def build():
+        query = db.query(*select_columns(News, selected, [News.id]))
+        if category:
+            query = query.filter(News.category == category)
+        rows, next_cursor = paginate(query, "id", [News.id], [int], cursor, limit, skip)
+        return dump_rows(selected, rows), {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return cached_json_response(request, db, ["news:list"], build)
+
+
+@app.get("/export/news")
+def export_news(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    category: Optional[Literal["visa", "blog"]] = None,
+    after_id: int = Query(0, ge=0),
+):
+    """Stream every news article, optionally of one category, as NDJSON or CSV (see export_scholarships)."""
+    criteria = [News.id > after_id]
+    if category:
+        criteria.append(News.category == category)
+    return dataset_exporter.response(News, NEWS_FIELDS, criteria, format, "news")
+
+
+@app.get("/search/")
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    kind: Optional[Literal["scholarships", "news"]] = None,
+    degree_level: Optional[Literal["bachelor", "master", "doctorate"]] = None,
+    category: Optional[Literal["visa", "blog"]] = None,
+    deadline_from: Optional[date] = None,
+    deadline_to: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Search the titles and text of scholarships and news articles, best matches first.
+
+    Every word of `q` must match, in any form (a search for "engineer" finds
+    "engineering"); a last word that matches nothing is completed as a prefix, so the
+    endpoint can back a search-as-you-type box. `deadline_from`/`deadline_to` filter
+    scholarships by deadline and news articles by publication date.
+    """
+    try:
+        results = search_index.search(q, kind, degree_level, category, deadline_from, deadline_to, limit, offset)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(orjson.dumps(results), media_type="application/json")
+
+
+@app.post("/search/rebuild/")
+def rebuild_search_index(background_tasks: BackgroundTasks):
+    """Re-index every scholarship and news article in the background."""
+    background_tasks.add_task(search_index.rebuild)
+    return {"message": "Search index rebuild started in the background."}
 
 
 @app.get("/news/{news_id}", response_model=NewsBase)
-async def get_news_article(news_id: int, db: Session = Depends(get_db)):
+async def get_news_article(news_id: int, request: Request, db: Session = Depends(get_read_db)):
     logger.info(f"Fetching news article {news_id}")
-    news = db.query(News).filter(News.id == news_id).first()
-    if not news:
-        raise HTTPException(status_code=404, detail="News article not found")
-    return news
+
+    def build():
+        news = db.query(*select_columns(News, NEWS_FIELDS)).filter(News.id == news_id).first()
+        if not news:
+            raise HTTPException(status_code=404, detail="News article not found")
+        return dump_row(NEWS_FIELDS, news), {}
+
+    return cached_json_response(request, db, [f"news:{news_id}"], build)
 
 
 @app.get("/start-news-scraping/")
@@ -319,18 +553,12 @@ def fetch_news_body(background_tasks: BackgroundTasks, db: Session = Depends(get
 
 
 @app.delete('/scholarships/')
-async def delete_scholarships(db: Session = Depends(get_db)):
+def delete_scholarships(db: Session = Depends(get_db)):
     """Delete all scholarships."""
-    scholarships = db.query(Scholarship).all()
-    for scholarship in scholarships:
-        # Check if the scholarship has an image and delete it
-        if scholarship.image_url:
-            image_path = os.path.join("static", scholarship.image_url)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-        db.delete(scholarship)
-    db.commit()
-    return {"message": "All scholarships deleted successfully."}
+    result = bulk_deleter.delete(db, Scholarship)
+    response_cache.invalidate("scholarships")
+    image_manifest.mark_dirty()
+    return {"message": "All scholarships deleted successfully.", **result}
 
 
 @app.delete('/scholarships/{scholarship_id}')
@@ -339,28 +567,24 @@ async def delete_scholarship(scholarship_id: int, db: Session = Depends(get_db))
     scholarship = db.query(Scholarship).filter(Scholarship.id == scholarship_id).first()
     if not scholarship:
         raise HTTPException(status_code=404, detail="Scholarship not found")
-    if scholarship.image_url:
-        image_path = os.path.join("static", scholarship.image_url)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    image_path = image_store.release(db, scholarship.image_url)
+    near_duplicate_index.remove(db, Scholarship, [scholarship_id])
     db.delete(scholarship)
     db.commit()
+    remove_image_files([image_path])
+    image_manifest.mark_dirty()
+    response_cache.invalidate("scholarships", [scholarship_id])
+    search_index.remove(Scholarship, [scholarship_id])
     return {"message": "Scholarship deleted successfully."}
 
 
 @app.delete('/news/')
-async def delete_news(db: Session = Depends(get_db)):
+def delete_news(db: Session = Depends(get_db)):
     """Delete all news articles."""
-    news = db.query(News).all()
-    for article in news:
-        # Check if the news article has an image and delete it
-        if article.image_url:
-            image_path = os.path.join("static", article.image_url)
-            if os.path.exists(image_path):
-                os.remove(image_path)
-        db.delete(article)
-    db.commit()
-    return {"message": "All news articles deleted successfully."}
+    result = bulk_deleter.delete(db, News)
+    response_cache.invalidate("news")
+    image_manifest.mark_dirty()
+    return {"message": "All news articles deleted successfully.", **result}
 
 
 @app.delete('/news/{news_id}')
@@ -369,12 +593,14 @@ async def delete_news_article(news_id: int, db: Session = Depends(get_db)):
     news = db.query(News).filter(News.id == news_id).first()
     if not news:
         raise HTTPException(status_code=404, detail="News article not found")
-    if news.image_url:
-        image_path = os.path.join("static", news.image_url)
-        if os.path.exists(image_path):
-            os.remove(image_path)
+    image_path = image_store.release(db, news.image_url)
+    near_duplicate_index.remove(db, News, [news_id])
     db.delete(news)
     db.commit()
+    remove_image_files([image_path])
+    image_manifest.mark_dirty()
+    response_cache.invalidate("news", [news_id])
+    search_index.remove(News, [news_id])
     return {"message": "News article deleted successfully."}
 
 
@@ -394,7 +620,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", NegotiatingStaticFiles(directory="static"), name="static")
 
 # Start Uvicorn server
 if __name__ == "__main__":
@@ -0,0 +1,26 @@
+"""Add stored_key to page_validators
+
+Revision ID: a3f6c8e2d915
+Revises: b7d2e9c4f1a8
+Create Date: 2026-10-18 09:41:26.507318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f6c8e2d915'
+down_revision: Union[str, None] = 'b7d2e9c4f1a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('page_validators', sa.Column('stored_key', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('page_validators', 'stored_key')
@@ -0,0 +1,43 @@
+"""Create image_store table
+
+Revision ID: a6b3e9f05c71
+Revises: f2c8d1e7a304
+Create Date: 2026-10-17 13:22:40.771023
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6b3e9f05c71'
+down_revision: Union[str, None] = 'f2c8d1e7a304'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('image_store',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('prompt_key', sa.String(length=64), nullable=False),
+    sa.Column('normalized_prompt', sa.Text(), nullable=False),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('image_url', sa.String(length=500), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('reuses', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_image_store_id'), 'image_store', ['id'], unique=False)
+    op.create_index(op.f('ix_image_store_prompt_key'), 'image_store', ['prompt_key'], unique=True)
+    op.create_index(op.f('ix_image_store_image_url'), 'image_store', ['image_url'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_image_store_image_url'), table_name='image_store')
+    op.drop_index(op.f('ix_image_store_prompt_key'), table_name='image_store')
+    op.drop_index(op.f('ix_image_store_id'), table_name='image_store')
+    op.drop_table('image_store')
@@ -0,0 +1,30 @@
+"""Add image variants columns
+
+Revision ID: b3e1f7a9d042
+Revises: a6b3e9f05c71
+Create Date: 2026-10-17 15:04:12.518307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e1f7a9d042'
+down_revision: Union[str, None] = 'a6b3e9f05c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scholarships', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('news', sa.Column('image_variants', sa.JSON(), nullable=True))
+    op.add_column('image_store', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('image_store', 'variants')
+    op.drop_column('news', 'image_variants')
+    op.drop_column('scholarships', 'image_variants')
@@ -0,0 +1,37 @@
+"""Collapse whitespace in titles
+
+Revision ID: b7d2e9c4f1a8
+Revises: e8c4f2b9d153
+Create Date: 2026-10-17 23:12:40.218334
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9c4f1a8'
+down_revision: Union[str, None] = 'e8c4f2b9d153'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ingestion stores titles with their whitespace collapsed and looks up existing ones on that form
+    connection = op.get_bind()
+    for table, column in (('scholarships', 'program_title'), ('news', 'title')):
+        rows = connection.execute(sa.text(f"SELECT id, {column} FROM {table}")).fetchall()
+        updates = [
+            {"id": id, "title": " ".join(title.split())}
+            for id, title in rows
+            if title is not None and " ".join(title.split()) != title
+        ]
+        if updates:
+            connection.execute(sa.text(f"UPDATE {table} SET {column} = :title WHERE id = :id"), updates)
+
+
+def downgrade() -> None:
+    # The original spacing is not kept
+    pass
@@ -0,0 +1,41 @@
+"""Create extraction_cache table
+
+Revision ID: c3d9e4f1a2b7
+Revises: a42eda2c0de8
+Create Date: 2026-10-17 09:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e4f1a2b7'
+down_revision: Union[str, None] = 'a42eda2c0de8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('extraction_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cache_key', sa.String(length=64), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_extraction_cache_id'), 'extraction_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_extraction_cache_cache_key'), 'extraction_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_extraction_cache_last_used_at'), 'extraction_cache', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_extraction_cache_last_used_at'), table_name='extraction_cache')
+    op.drop_index(op.f('ix_extraction_cache_cache_key'), table_name='extraction_cache')
+    op.drop_index(op.f('ix_extraction_cache_id'), table_name='extraction_cache')
+    op.drop_table('extraction_cache')
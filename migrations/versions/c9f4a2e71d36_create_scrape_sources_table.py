@@ -0,0 +1,47 @@
+"""Create scrape_sources table
+
+Revision ID: c9f4a2e71d36
+Revises: b3e1f7a9d042
+Create Date: 2026-10-17 17:41:09.213554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f4a2e71d36'
+down_revision: Union[str, None] = 'b3e1f7a9d042'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scrape_sources',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('kind', sa.Enum('scholarships', 'news', name='scrape_source_kind'), nullable=False),
+    sa.Column('enabled', sa.Boolean(), nullable=False),
+    sa.Column('refresh_interval', sa.Integer(), nullable=False),
+    sa.Column('next_run_at', sa.DateTime(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.Column('last_success_at', sa.DateTime(), nullable=True),
+    sa.Column('last_change_at', sa.DateTime(), nullable=True),
+    sa.Column('consecutive_failures', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('runs', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scrape_sources_id'), 'scrape_sources', ['id'], unique=False)
+    op.create_index(op.f('ix_scrape_sources_url'), 'scrape_sources', ['url'], unique=True)
+    op.create_index('ix_scrape_sources_enabled_next_run_at', 'scrape_sources', ['enabled', 'next_run_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scrape_sources_enabled_next_run_at', table_name='scrape_sources')
+    op.drop_index(op.f('ix_scrape_sources_url'), table_name='scrape_sources')
+    op.drop_index(op.f('ix_scrape_sources_id'), table_name='scrape_sources')
+    op.drop_table('scrape_sources')
@@ -0,0 +1,32 @@
+"""Add extraction rules to scrape_sources
+
+Revision ID: d5b8e3f1a627
+Revises: c9f4a2e71d36
+Create Date: 2026-10-17 19:26:44.806115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5b8e3f1a627'
+down_revision: Union[str, None] = 'c9f4a2e71d36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scrape_sources', sa.Column('extraction_rules', sa.JSON(none_as_null=True), nullable=True))
+    op.add_column('scrape_sources', sa.Column('rule_hits', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scrape_sources', sa.Column('rule_fallbacks', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('scrape_sources', sa.Column('last_fallback_reason', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('scrape_sources', 'last_fallback_reason')
+    op.drop_column('scrape_sources', 'rule_fallbacks')
+    op.drop_column('scrape_sources', 'rule_hits')
+    op.drop_column('scrape_sources', 'extraction_rules')
@@ -0,0 +1,40 @@
+"""Create page_validators table
+
+Revision ID: d81f0b6a5c2e
+Revises: c3d9e4f1a2b7
+Create Date: 2026-10-17 10:03:17.204566
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f0b6a5c2e'
+down_revision: Union[str, None] = 'c3d9e4f1a2b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('page_validators',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('url', sa.String(length=500), nullable=False),
+    sa.Column('etag', sa.String(length=255), nullable=True),
+    sa.Column('last_modified', sa.String(length=64), nullable=True),
+    sa.Column('content_length', sa.Integer(), nullable=True),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('checked_at', sa.DateTime(), nullable=True),
+    sa.Column('changed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_page_validators_id'), 'page_validators', ['id'], unique=False)
+    op.create_index(op.f('ix_page_validators_url'), 'page_validators', ['url'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_page_validators_url'), table_name='page_validators')
+    op.drop_index(op.f('ix_page_validators_id'), table_name='page_validators')
+    op.drop_table('page_validators')
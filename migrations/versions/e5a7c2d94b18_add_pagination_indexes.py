@@ -0,0 +1,31 @@
+"""Add pagination indexes
+
+Revision ID: e5a7c2d94b18
+Revises: d81f0b6a5c2e
+Create Date: 2026-10-17 11:26:08.931457
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c2d94b18'
+down_revision: Union[str, None] = 'd81f0b6a5c2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_scholarships_deadline_id', 'scholarships', ['deadline', 'id'], unique=False)
+    op.create_index('ix_scholarships_degree_level_id', 'scholarships', ['degree_level', 'id'], unique=False)
+    op.create_index('ix_scholarships_degree_level_deadline_id', 'scholarships', ['degree_level', 'deadline', 'id'], unique=False)
+    op.create_index('ix_news_category_id', 'news', ['category', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_news_category_id', table_name='news')
+    op.drop_index('ix_scholarships_degree_level_deadline_id', table_name='scholarships')
+    op.drop_index('ix_scholarships_degree_level_id', table_name='scholarships')
+    op.drop_index('ix_scholarships_deadline_id', table_name='scholarships')
@@ -0,0 +1,36 @@
+"""Create near_duplicate_buckets table
+
+Revision ID: e8c4f2b9d153
+Revises: d5b8e3f1a627
+Create Date: 2026-10-17 21:04:12.530718
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8c4f2b9d153'
+down_revision: Union[str, None] = 'd5b8e3f1a627'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('near_duplicate_buckets',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.Enum('scholarships', 'news', name='near_duplicate_kind'), nullable=False),
+    sa.Column('bucket', sa.BigInteger(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_near_duplicate_buckets_kind_bucket', 'near_duplicate_buckets', ['kind', 'bucket'], unique=False)
+    op.create_index('ix_near_duplicate_buckets_kind_entity_id', 'near_duplicate_buckets', ['kind', 'entity_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_near_duplicate_buckets_kind_entity_id', table_name='near_duplicate_buckets')
+    op.drop_index('ix_near_duplicate_buckets_kind_bucket', table_name='near_duplicate_buckets')
+    op.drop_table('near_duplicate_buckets')
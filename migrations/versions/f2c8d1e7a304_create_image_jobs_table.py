@@ -0,0 +1,53 @@
+"""Create image_jobs table
+
+Revision ID: f2c8d1e7a304
+Revises: e5a7c2d94b18
+Create Date: 2026-10-17 12:41:52.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8d1e7a304'
+down_revision: Union[str, None] = 'e5a7c2d94b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('image_jobs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('entity_type', sa.Enum('scholarship', 'news', name='image_job_entity_type'), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('pending', 'processing', 'completed', 'failed', name='image_job_status'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('lease_token', sa.String(length=36), nullable=True),
+    sa.Column('locked_by', sa.String(length=255), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('image_path', sa.String(length=500), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('completed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_image_jobs_status_available_at', 'image_jobs', ['status', 'available_at'], unique=False)
+    op.create_index('ix_image_jobs_status_lease_expires_at', 'image_jobs', ['status', 'lease_expires_at'], unique=False)
+    op.create_index('ix_image_jobs_status_completed_at', 'image_jobs', ['status', 'completed_at'], unique=False)
+    op.create_index('ix_image_jobs_entity', 'image_jobs', ['entity_type', 'entity_id'], unique=False)
+    op.create_index('ix_image_jobs_lease_token', 'image_jobs', ['lease_token'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_jobs_lease_token', table_name='image_jobs')
+    op.drop_index('ix_image_jobs_entity', table_name='image_jobs')
+    op.drop_index('ix_image_jobs_status_completed_at', table_name='image_jobs')
+    op.drop_index('ix_image_jobs_status_lease_expires_at', table_name='image_jobs')
+    op.drop_index('ix_image_jobs_status_available_at', table_name='image_jobs')
+    op.drop_table('image_jobs')